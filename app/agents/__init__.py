@@ -1,22 +1,47 @@
 """
 Agents module initialization.
+
+Các class agent được import lazy (PEP 562) để `import agents` không nạp mọi module agent.
 """
+import importlib
+from typing import Any
+
 from .base import BaseAgent
-from .ai_engineer_agent import AiEngineerAgent
-from .ui_designer_agent import UiDesignerAgent
-from .content_creator_agent import ContentCreatorAgent
-from .backend_architect_agent import BackendArchitectAgent
-from .frontend_developer_agent import FrontendDeveloperAgent
-from .rapid_prototyper_agent import RapidPrototyperAgent
-from .growth_hacker_agent import GrowthHackerAgent
-from .trend_researcher_agent import TrendResearcherAgent
-from .devops_automator_agent import DevopsAutomatorAgent
-from .test_writer_fixer_agent import TestWriterFixerAgent
-from .project_shipper_agent import ProjectShipperAgent
+from .profile import AgentProfile
+
+_LAZY_ATTRIBUTES = {
+    "ProfileAgent": ".profile_agent",
+    "AgentRegistry": ".registry",
+    "AiEngineerAgent": ".ai_engineer_agent",
+    "UiDesignerAgent": ".ui_designer_agent",
+    "ContentCreatorAgent": ".content_creator_agent",
+    "BackendArchitectAgent": ".backend_architect_agent",
+    "FrontendDeveloperAgent": ".frontend_developer_agent",
+    "RapidPrototyperAgent": ".rapid_prototyper_agent",
+    "GrowthHackerAgent": ".growth_hacker_agent",
+    "TrendResearcherAgent": ".trend_researcher_agent",
+    "DevopsAutomatorAgent": ".devops_automator_agent",
+    "TestWriterFixerAgent": ".test_writer_fixer_agent",
+    "ProjectShipperAgent": ".project_shipper_agent",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
+
 
 __all__ = [
-    "BaseAgent", "AiEngineerAgent", "UiDesignerAgent", "ContentCreatorAgent", 
-    "BackendArchitectAgent", "FrontendDeveloperAgent", "RapidPrototyperAgent", 
-    "GrowthHackerAgent", "TrendResearcherAgent", "DevopsAutomatorAgent", 
+    "BaseAgent", "AgentProfile", "ProfileAgent", "AgentRegistry", "AiEngineerAgent", "UiDesignerAgent",
+    "ContentCreatorAgent", "BackendArchitectAgent", "FrontendDeveloperAgent", "RapidPrototyperAgent",
+    "GrowthHackerAgent", "TrendResearcherAgent", "DevopsAutomatorAgent",
     "TestWriterFixerAgent", "ProjectShipperAgent"
-]
\ No newline at end of file
+]
@@ -1,15 +1,11 @@
 """AI Engineer Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class AiEngineerAgent(BaseAgent):
-    """Agent chuyên về AI/ML implementation."""
-    
-    def get_system_prompt(self) -> str:
-        return """You are an expert AI engineer specializing in practical machine learning implementation and AI integration for production applications. Your expertise spans large language models, computer vision, recommendation systems, and intelligent automation. You excel at choosing the right AI solution for each problem and implementing it efficiently within rapid development cycles.
+PROFILE = AgentProfile(
+    agent_type="aiengineer",
+    description="AI/ML features, LLM integration, computer vision, recommendation systems, general programming",
+    system_prompt="""You are an expert AI engineer specializing in practical machine learning implementation and AI integration for production applications. Your expertise spans large language models, computer vision, recommendation systems, and intelligent automation. You excel at choosing the right AI solution for each problem and implementing it efficiently within rapid development cycles.
 
 Your primary responsibilities:
 
@@ -62,25 +58,10 @@ Your primary responsibilities:
    - Building anomaly detection systems
 
 Your goal is to democratize AI within applications, making intelligent features accessible and valuable to users while maintaining performance and cost efficiency. You understand that in rapid development, AI features must be quick to implement but robust enough for production use. You balance cutting-edge capabilities with practical constraints, ensuring AI enhances rather than complicates the user experience."""
+)
+
+
+class AiEngineerAgent(ProfileAgent):
+    """Agent chuyên về AI/ML implementation."""
     
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_AIENGINEER
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response=response_text,
-                metadata={"model": self.get_model_name()},
-                success=True
-            )
-        except Exception as e:
-            logger.error(f"Lỗi AI Engineer: {e}")
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response="",
-                success=False,
-                error=str(e)
-            )
\ No newline at end of file
+    profile = PROFILE
@@ -1,13 +1,11 @@
 """Backend Architect Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class BackendArchitectAgent(BaseAgent):
-    def get_system_prompt(self) -> str:
-        return """You are a master backend architect with deep expertise in designing scalable, secure, and maintainable server-side systems. Your experience spans microservices, monoliths, serverless architectures, and everything in between. You excel at making architectural decisions that balance immediate needs with long-term scalability.
+PROFILE = AgentProfile(
+    agent_type="backendarchitect",
+    description="API design, database architecture, server systems, scalability",
+    system_prompt="""You are a master backend architect with deep expertise in designing scalable, secure, and maintainable server-side systems. Your experience spans microservices, monoliths, serverless architectures, and everything in between. You excel at making architectural decisions that balance immediate needs with long-term scalability.
 
 Your primary responsibilities:
 
@@ -36,14 +34,8 @@ Your primary responsibilities:
    - Designing for horizontal scaling
 
 Your goal is to create backend systems that can handle millions of users while remaining maintainable and cost-effective. You understand that in rapid development cycles, the backend must be both quickly deployable and robust enough to handle production traffic."""
-    
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_BACKENDARCHITECT
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(agent_type=self.agent_type, response=response_text, success=True)
-        except Exception as e:
-            return AgentResponse(agent_type=self.agent_type, response="", success=False, error=str(e))
\ No newline at end of file
+)
+
+
+class BackendArchitectAgent(ProfileAgent):
+    profile = PROFILE
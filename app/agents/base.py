@@ -1,12 +1,14 @@
 """
 Base class cho tất cả các agent.
 """
+import hashlib
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
 from core.ollama_client import OllamaClient
 from core.schemas import AgentRequest, AgentResponse, OllamaRequest
+from core.token_budget import TokenBudget
 
 logger = logging.getLogger(__name__)
 
@@ -14,24 +16,14 @@ logger = logging.getLogger(__name__)
 class BaseAgent(ABC):
     """Base class cho agent."""
     
+    # Subclass có thể khai báo agent_type; mặc định suy ra từ tên class (AiEngineerAgent → aiengineer)
+    agent_type: str = ""
+    
     def __init__(self, ollama_client: OllamaClient):
         self.ollama_client = ollama_client
-        # Use explicit agent_type mapping for reliability
-        class_name = self.__class__.__name__
-        agent_type_map = {
-            'AiEngineerAgent': 'aiengineer',
-            'BackendArchitectAgent': 'backendarchitect', 
-            'FrontendDeveloperAgent': 'frontenddeveloper',
-            'RapidPrototyperAgent': 'rapidprototyper',
-            'DevopsAutomatorAgent': 'devopsautomator',
-            'TestWriterFixerAgent': 'testwriterfixer',
-            'UiDesignerAgent': 'uidesigner',
-            'ContentCreatorAgent': 'contentcreator',
-            'GrowthHackerAgent': 'growthhacker',
-            'TrendResearcherAgent': 'trendresearcher',
-            'ProjectShipperAgent': 'projectshipper'
-        }
-        self.agent_type = agent_type_map.get(class_name, class_name.lower().replace('agent', ''))
+        self.token_budget = TokenBudget.from_settings()
+        if not self.agent_type:
+            self.agent_type = self.__class__.__name__.lower().replace('agent', '')
     
     @abstractmethod
     async def process(self, request: AgentRequest) -> AgentResponse:
@@ -48,21 +40,52 @@ class BaseAgent(ABC):
         """Lấy tên model Ollama sử dụng."""
         pass
     
-    async def call_ollama(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
-        """Gọi Ollama với prompt."""
-        logger.debug(f"Agent {self.agent_type} calling Ollama with model: {self.get_model_name()}")
+    def fingerprint(self) -> str:
+        """Hash cấu hình quyết định output (model, system prompt); đổi cấu hình thì cache cũ mất hiệu lực."""
+        return hashlib.sha256(f"{self.get_model_name()}\0{self.get_system_prompt()}".encode("utf-8")).hexdigest()
+    
+    async def call_ollama(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        keep_alive: Optional[Union[str, int]] = None
+    ) -> str:
+        """Gọi Ollama với prompt (tùy chọn generation options và JSON schema cho output).
+
+        num_ctx và num_predict được tính theo độ dài prompt nếu caller không truyền.
+        """
+        logger.debug("Agent %s calling Ollama with model: %s", self.agent_type, self.get_model_name())
         system_prompt = self.get_system_prompt()
         full_prompt = f"{system_prompt}\n\nUser: {prompt}"
+        options = self.token_budget.apply(full_prompt, self.agent_type, options)
         
         ollama_request = OllamaRequest(
             model=self.get_model_name(),
-            prompt=full_prompt
+            prompt=full_prompt,
+            options=options,
+            format=format,
+            keep_alive=keep_alive
         )
         
         response = await self.ollama_client.generate(ollama_request)
-        logger.debug(f"Agent {self.agent_type} received response from Ollama")
+        logger.debug("Agent %s received response from Ollama", self.agent_type)
+        self._check_token_usage(response, options)
         return response.response
     
+    def _check_token_usage(self, response, options: Dict[str, Any]):
+        """Cảnh báo khi prompt có thể bị cắt hoặc output chạm giới hạn num_predict."""
+        num_ctx = options.get("num_ctx")
+        if num_ctx and isinstance(response.prompt_eval_count, int) and response.prompt_eval_count >= num_ctx:
+            logger.warning(
+                f"Agent {self.agent_type}: prompt dùng {response.prompt_eval_count} tokens, "
+                f"đã chạm num_ctx={num_ctx} và có thể bị cắt"
+            )
+        num_predict = options.get("num_predict")
+        if num_predict and isinstance(response.eval_count, int) and response.eval_count >= num_predict:
+            logger.info("Agent %s: output bị dừng ở num_predict=%s", self.agent_type, num_predict)
+    
     def can_handle(self, request: AgentRequest) -> bool:
         """Kiểm tra agent có thể xử lý request không."""
         return request.agent_type == self.agent_type
\ No newline at end of file
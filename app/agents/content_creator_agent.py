@@ -1,15 +1,11 @@
 """Content Creator Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class ContentCreatorAgent(BaseAgent):
-    """Agent chuyên về content creation."""
-    
-    def get_system_prompt(self) -> str:
-        return """You are a Content Creator specializing in cross-platform content generation, from long-form articles to video scripts and social media content. You excel at adapting messages across formats while maintaining brand voice and maximizing platform-specific impact.
+PROFILE = AgentProfile(
+    agent_type="contentcreator",
+    description="Blog posts, marketing content, social media, SEO content",
+    system_prompt="""You are a Content Creator specializing in cross-platform content generation, from long-form articles to video scripts and social media content. You excel at adapting messages across formats while maintaining brand voice and maximizing platform-specific impact.
 
 Core Responsibilities:
 
@@ -45,25 +41,10 @@ Expertise Areas:
 - Content Strategy: Planning, calendars, repurposing systems
 
 Your goal is to create content that drives engagement, builds brand authority, and converts audiences across all platforms while maintaining efficiency through smart repurposing strategies."""
+)
+
+
+class ContentCreatorAgent(ProfileAgent):
+    """Agent chuyên về content creation."""
     
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_CONTENTCREATOR
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response=response_text,
-                metadata={"model": self.get_model_name()},
-                success=True
-            )
-        except Exception as e:
-            logger.error(f"Lỗi Content Creator: {e}")
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response="",
-                success=False,
-                error=str(e)
-            )
\ No newline at end of file
+    profile = PROFILE
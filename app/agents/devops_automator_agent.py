@@ -1,13 +1,11 @@
 """DevOps Automator Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class DevopsAutomatorAgent(BaseAgent):
-    def get_system_prompt(self) -> str:
-        return """You are a DevOps Automator specializing in continuous deployment and infrastructure automation. You excel at creating reliable, scalable deployment pipelines that enable rapid development cycles.
+PROFILE = AgentProfile(
+    agent_type="devopsautomator",
+    description="CI/CD, Docker, Kubernetes, infrastructure automation",
+    system_prompt="""You are a DevOps Automator specializing in continuous deployment and infrastructure automation. You excel at creating reliable, scalable deployment pipelines that enable rapid development cycles.
 
 Core Responsibilities:
 - Design and implement CI/CD pipelines
@@ -18,14 +16,8 @@ Core Responsibilities:
 - Ensure security and compliance in deployments
 
 Your goal is to eliminate deployment friction and enable teams to ship code confidently and frequently."""
-    
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_DEVOPSAUTOMATOR
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(agent_type=self.agent_type, response=response_text, success=True)
-        except Exception as e:
-            return AgentResponse(agent_type=self.agent_type, response="", success=False, error=str(e))
\ No newline at end of file
+)
+
+
+class DevopsAutomatorAgent(ProfileAgent):
+    profile = PROFILE
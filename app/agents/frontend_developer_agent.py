@@ -1,13 +1,11 @@
 """Frontend Developer Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class FrontendDeveloperAgent(BaseAgent):
-    def get_system_prompt(self) -> str:
-        return """You are an elite frontend development specialist with deep expertise in modern JavaScript frameworks, responsive design, and user interface implementation. Your mastery spans React, Vue, Angular, and vanilla JavaScript, with a keen eye for performance, accessibility, and user experience.
+PROFILE = AgentProfile(
+    agent_type="frontenddeveloper",
+    description="UI/UX implementation, React/Vue, responsive design, frontend performance",
+    system_prompt="""You are an elite frontend development specialist with deep expertise in modern JavaScript frameworks, responsive design, and user interface implementation. Your mastery spans React, Vue, Angular, and vanilla JavaScript, with a keen eye for performance, accessibility, and user experience.
 
 Your primary responsibilities:
 
@@ -36,14 +34,8 @@ Your primary responsibilities:
    - Monitoring Core Web Vitals
 
 Your goal is to create frontend experiences that are blazing fast, accessible to all users, and delightful to interact with. You understand that in the 6-day sprint model, frontend code needs to be both quickly implemented and maintainable."""
-    
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_FRONTENDDEVELOPER
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(agent_type=self.agent_type, response=response_text, success=True)
-        except Exception as e:
-            return AgentResponse(agent_type=self.agent_type, response="", success=False, error=str(e))
\ No newline at end of file
+)
+
+
+class FrontendDeveloperAgent(ProfileAgent):
+    profile = PROFILE
@@ -1,13 +1,11 @@
 """Growth Hacker Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class GrowthHackerAgent(BaseAgent):
-    def get_system_prompt(self) -> str:
-        return """You are a Growth Hacker specializing in rapid user acquisition, viral mechanics, and data-driven experimentation. You combine marketing creativity with analytical rigor to identify and exploit growth opportunities that drive exponential business growth.
+PROFILE = AgentProfile(
+    agent_type="growthhacker",
+    description="User acquisition, viral mechanics, growth experiments, analytics",
+    system_prompt="""You are a Growth Hacker specializing in rapid user acquisition, viral mechanics, and data-driven experimentation. You combine marketing creativity with analytical rigor to identify and exploit growth opportunities that drive exponential business growth.
 
 Core Responsibilities:
 
@@ -43,14 +41,8 @@ The AARRR Framework (Pirate Metrics):
 - Revenue: Monetizing user base
 
 Your goal is to create scalable, sustainable growth systems that drive exponential user acquisition and engagement through creative, data-driven approaches."""
-    
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_GROWTHHACKER
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(agent_type=self.agent_type, response=response_text, success=True)
-        except Exception as e:
-            return AgentResponse(agent_type=self.agent_type, response="", success=False, error=str(e))
\ No newline at end of file
+)
+
+
+class GrowthHackerAgent(ProfileAgent):
+    profile = PROFILE
@@ -0,0 +1,95 @@
+"""
+Profile khai báo cho agent: prompt, model, generation options và giới hạn output.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError
+
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class AgentProfile(BaseModel):
+    """Cấu hình của một agent chạy bằng ProfileAgent."""
+    agent_type: str = Field(..., min_length=1)
+    system_prompt: str = Field(..., min_length=1)
+    description: str = ""
+    model: Optional[str] = Field(None, description="Mặc định lấy từ settings MODEL_<AGENT_TYPE>")
+    options: Dict[str, Any] = Field(default_factory=dict, description="Ollama options: temperature, stop, num_thread, ...")
+    num_predict: Optional[int] = Field(None, description="Giới hạn token output, ưu tiên hơn OLLAMA_NUM_PREDICT_LIMITS")
+    keep_alive: Optional[Union[str, int]] = None
+
+    def model_name(self) -> str:
+        """Model Ollama của agent."""
+        if self.model:
+            return self.model
+        model = getattr(settings, f"MODEL_{self.agent_type.upper()}", None)
+        if not model:
+            raise ValueError(f"Profile {self.agent_type} chưa cấu hình model")
+        return model
+
+    def generation_options(self) -> Dict[str, Any]:
+        """Options gửi kèm request Ollama."""
+        options = dict(self.options)
+        if self.num_predict is not None:
+            options["num_predict"] = self.num_predict
+        return options
+
+    def merged(self, override: Dict[str, Any]) -> "AgentProfile":
+        """Profile mới sau khi áp override (options được merge theo key)."""
+        data = self.model_dump()
+        for key, value in override.items():
+            if key == "options" and isinstance(value, dict):
+                data["options"] = {**data["options"], **value}
+            else:
+                data[key] = value
+        data["agent_type"] = self.agent_type
+        return AgentProfile.model_validate(data)
+
+
+def load_profile_overrides() -> Dict[str, Dict[str, Any]]:
+    """Override profile từ AGENT_PROFILES_FILE (JSON) và AGENT_PROFILE_OVERRIDES (env ghi đè file)."""
+    overrides: Dict[str, Dict[str, Any]] = {}
+    if settings.AGENT_PROFILES_FILE:
+        try:
+            with open(settings.AGENT_PROFILES_FILE, encoding="utf-8") as f:
+                overrides = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Không đọc được AGENT_PROFILES_FILE {settings.AGENT_PROFILES_FILE}: {e}")
+    for agent_type, override in settings.AGENT_PROFILE_OVERRIDES.items():
+        overrides[agent_type] = {**overrides.get(agent_type, {}), **override}
+    return overrides
+
+
+def resolve_profile(profile: AgentProfile, overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> AgentProfile:
+    """Áp override cấu hình cho profile có sẵn."""
+    overrides = load_profile_overrides() if overrides is None else overrides
+    override = overrides.get(profile.agent_type)
+    if not override:
+        return profile
+    try:
+        return profile.merged(override)
+    except ValidationError as e:
+        logger.error(f"Override profile {profile.agent_type} không hợp lệ, dùng mặc định: {e}")
+        return profile
+
+
+def custom_profiles(known_agent_types: List[str], overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> List[AgentProfile]:
+    """Profile của các agent mới chỉ khai báo trong cấu hình (không có class riêng)."""
+    overrides = load_profile_overrides() if overrides is None else overrides
+    profiles = []
+    for agent_type, data in overrides.items():
+        if agent_type in known_agent_types:
+            continue
+        try:
+            profile = AgentProfile.model_validate({**data, "agent_type": agent_type})
+            profile.model_name()
+        except (ValidationError, ValueError) as e:
+            logger.error(f"Profile agent {agent_type} không hợp lệ, bỏ qua: {e}")
+            continue
+        profiles.append(profile)
+    return profiles
@@ -0,0 +1,70 @@
+"""Agent chung chạy theo AgentProfile."""
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from agents.base import BaseAgent
+from agents.profile import AgentProfile, resolve_profile
+from core import json_codec
+from core.ollama_client import OllamaClient
+from core.schemas import AgentRequest, AgentResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileAgent(BaseAgent):
+    """Agent chung: prompt, model và generation options lấy từ profile.
+
+    Agent cụ thể chỉ cần khai báo `profile` ở mức class; agent mới có thể
+    tạo trực tiếp từ profile trong cấu hình mà không cần code.
+    """
+
+    profile: Optional[AgentProfile] = None
+
+    def __init__(
+        self,
+        ollama_client: OllamaClient,
+        profile: Optional[AgentProfile] = None,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        super().__init__(ollama_client)
+        profile = profile or type(self).profile
+        if profile is None:
+            raise ValueError(f"{type(self).__name__} chưa khai báo profile")
+        # Registry truyền override đã nạp sẵn; không truyền thì đọc từ cấu hình
+        self.profile = resolve_profile(profile, overrides)
+        self.agent_type = self.profile.agent_type
+
+    def get_system_prompt(self) -> str:
+        return self.profile.system_prompt
+
+    def get_model_name(self) -> str:
+        return self.profile.model_name()
+
+    def fingerprint(self) -> str:
+        """Hash model, system prompt và generation options của profile."""
+        options = json_codec.canonical_dumps(self.profile.generation_options())
+        return hashlib.sha256(super().fingerprint().encode("utf-8") + options).hexdigest()
+
+    async def process(self, request: AgentRequest) -> AgentResponse:
+        try:
+            response_text = await self.call_ollama(
+                request.message,
+                request.context,
+                options=self.profile.generation_options(),
+                keep_alive=self.profile.keep_alive
+            )
+            return AgentResponse(
+                agent_type=self.agent_type,
+                response=response_text,
+                metadata={"model": self.get_model_name()},
+                success=True
+            )
+        except Exception as e:
+            logger.error(f"Lỗi agent {self.agent_type}: {e}")
+            return AgentResponse(
+                agent_type=self.agent_type,
+                response="",
+                success=False,
+                error=str(e)
+            )
@@ -1,13 +1,11 @@
 """Rapid Prototyper Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class RapidPrototyperAgent(BaseAgent):
-    def get_system_prompt(self) -> str:
-        return """You are an elite rapid prototyping specialist who excels at transforming ideas into functional applications at breakneck speed. Your expertise spans modern web frameworks, mobile development, API integration, and trending technologies. You embody the studio's philosophy of shipping fast and iterating based on real user feedback.
+PROFILE = AgentProfile(
+    agent_type="rapidprototyper",
+    description="MVP development, quick prototypes, proof of concepts",
+    system_prompt="""You are an elite rapid prototyping specialist who excels at transforming ideas into functional applications at breakneck speed. Your expertise spans modern web frameworks, mobile development, API integration, and trending technologies. You embody the studio's philosophy of shipping fast and iterating based on real user feedback.
 
 Your primary responsibilities:
 
@@ -32,14 +30,8 @@ Your primary responsibilities:
    - Week 6: Launch preparation and deployment
 
 Your goal is to transform ideas into tangible, testable products faster than anyone thinks possible. You believe that shipping beats perfection, user feedback beats assumptions, and momentum beats analysis paralysis."""
-    
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_RAPIDPROTOTYPER
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(agent_type=self.agent_type, response=response_text, success=True)
-        except Exception as e:
-            return AgentResponse(agent_type=self.agent_type, response="", success=False, error=str(e))
\ No newline at end of file
+)
+
+
+class RapidPrototyperAgent(ProfileAgent):
+    profile = PROFILE
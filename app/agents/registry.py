@@ -0,0 +1,225 @@
+"""
+Registry agent: khai báo agent theo đường dẫn import, chỉ import và khởi tạo khi dùng lần đầu.
+"""
+import importlib
+import logging
+from collections.abc import MutableMapping
+from importlib.metadata import EntryPoint, entry_points
+from typing import Any, Dict, Iterator, List, Optional, Union, TYPE_CHECKING
+
+from agents.profile import AgentProfile, custom_profiles, load_profile_overrides, resolve_profile
+from config import settings
+
+if TYPE_CHECKING:
+    from agents.base import BaseAgent
+    from core.ollama_client import OllamaClient
+
+
+logger = logging.getLogger(__name__)
+
+# Package ngoài đăng ký agent qua entry point nhóm này, ví dụ trong pyproject.toml:
+# [project.entry-points."aio_agent.agents"]
+# sqlexpert = "my_package.sql_agent:SqlExpertAgent"
+ENTRY_POINT_GROUP = "aio_agent.agents"
+
+BUILTIN_AGENTS: Dict[str, str] = {
+    "aiengineer": "agents.ai_engineer_agent:AiEngineerAgent",
+    "uidesigner": "agents.ui_designer_agent:UiDesignerAgent",
+    "contentcreator": "agents.content_creator_agent:ContentCreatorAgent",
+    "backendarchitect": "agents.backend_architect_agent:BackendArchitectAgent",
+    "frontenddeveloper": "agents.frontend_developer_agent:FrontendDeveloperAgent",
+    "rapidprototyper": "agents.rapid_prototyper_agent:RapidPrototyperAgent",
+    "growthhacker": "agents.growth_hacker_agent:GrowthHackerAgent",
+    "trendresearcher": "agents.trend_researcher_agent:TrendResearcherAgent",
+    "devopsautomator": "agents.devops_automator_agent:DevopsAutomatorAgent",
+    "testwriterfixer": "agents.test_writer_fixer_agent:TestWriterFixerAgent",
+    "projectshipper": "agents.project_shipper_agent:ProjectShipperAgent",
+}
+
+# "module:Class", class agent, AgentProfile hoặc entry point trỏ đến một trong các loại trên
+AgentTarget = Union[str, type, AgentProfile, EntryPoint]
+
+
+def import_target(path: str):
+    """Import object theo dạng "package.module:Attribute"."""
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Đường dẫn agent phải có dạng 'module:Class': {path}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def builtin_capabilities() -> Dict[str, str]:
+    """Mô tả năng lực của các agent có sẵn theo profile mặc định (không áp override)."""
+    registry = AgentRegistry(None)
+    registry._overrides = {}
+    for agent_type, path in BUILTIN_AGENTS.items():
+        registry.register(agent_type, path)
+    return registry.capabilities()
+
+
+class AgentRegistry(MutableMapping):
+    """Mapping agent_type → agent, khởi tạo agent khi được truy cập lần đầu.
+
+    Liệt kê, đếm và kiểm tra agent_type không import module agent nào.
+    """
+
+    def __init__(self, ollama_client: "OllamaClient"):
+        self.ollama_client = ollama_client
+        self._targets: Dict[str, AgentTarget] = {}
+        self._instances: Dict[str, "BaseAgent"] = {}
+        self._capabilities: Optional[Dict[str, str]] = None
+        self._overrides: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def register(self, agent_type: str, target: AgentTarget):
+        """Khai báo agent (ghi đè khai báo cũ và bỏ instance đã tạo)."""
+        self._targets[agent_type] = target
+        self._instances.pop(agent_type, None)
+        self._capabilities = None
+
+    def profile_overrides(self) -> Dict[str, Dict[str, Any]]:
+        """Override profile từ cấu hình, đọc một lần và dùng chung cho mọi agent của registry."""
+        if self._overrides is None:
+            self._overrides = load_profile_overrides()
+        return self._overrides
+
+    def discover(self):
+        """Nạp khai báo: agent có sẵn, entry point, AGENT_REGISTRY và agent chỉ có profile.
+
+        Override profile được đọc lại tại đây; các lần khởi tạo agent sau đó dùng bản đã nạp.
+        """
+        self._overrides = load_profile_overrides()
+        for agent_type, path in BUILTIN_AGENTS.items():
+            self.register(agent_type, path)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            logger.info(f"Agent plugin {entry_point.name}: {entry_point.value}")
+            self.register(entry_point.name, entry_point)
+        for agent_type, path in settings.AGENT_REGISTRY.items():
+            self.register(agent_type, path)
+        for profile in custom_profiles(list(self._targets), self._overrides):
+            self.register(profile.agent_type, profile)
+
+    def _load_target(self, agent_type: str):
+        """Class agent hoặc AgentProfile của khai báo (import module nếu cần)."""
+        target = self._targets[agent_type]
+        if isinstance(target, EntryPoint):
+            return target.load()
+        if isinstance(target, str):
+            return import_target(target)
+        return target
+
+    def _create(self, agent_type: str) -> "BaseAgent":
+        target = self._load_target(agent_type)
+        from agents.profile_agent import ProfileAgent
+        if isinstance(target, AgentProfile):
+            agent = ProfileAgent(self.ollama_client, target, overrides=self.profile_overrides())
+        elif isinstance(target, type) and issubclass(target, ProfileAgent):
+            agent = target(self.ollama_client, overrides=self.profile_overrides())
+        else:
+            agent = target(self.ollama_client)
+        if agent.agent_type != agent_type:
+            logger.warning(f"Agent đăng ký '{agent_type}' nhưng có agent_type '{agent.agent_type}'")
+        return agent
+
+    def __getitem__(self, agent_type: str) -> "BaseAgent":
+        agent = self._instances.get(agent_type)
+        if agent is not None:
+            return agent
+        if agent_type not in self._targets:
+            raise KeyError(agent_type)
+        try:
+            agent = self._create(agent_type)
+        except Exception as e:
+            logger.error(f"Không khởi tạo được agent {agent_type}: {e}")
+            raise KeyError(agent_type) from e
+        logger.debug("Initialized agent: %s", agent_type)
+        self._instances[agent_type] = agent
+        return agent
+
+    def __setitem__(self, agent_type: str, agent: "BaseAgent"):
+        self._targets.setdefault(agent_type, type(agent))
+        self._instances[agent_type] = agent
+        self._capabilities = None
+
+    def __delitem__(self, agent_type: str):
+        del self._targets[agent_type]
+        self._instances.pop(agent_type, None)
+        self._capabilities = None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __contains__(self, agent_type: object) -> bool:
+        return agent_type in self._targets
+
+    def loaded(self) -> List[str]:
+        """Các agent đã được khởi tạo."""
+        return list(self._instances)
+
+    def capabilities(self) -> Dict[str, str]:
+        """Mapping agent_type → mô tả năng lực, dùng cho planner.
+
+        Mô tả lấy từ `description` của profile (đã áp override); agent không có profile
+        dùng dòng đầu docstring của class. Cần import module agent (không khởi tạo agent),
+        kết quả được cache đến lần đăng ký tiếp theo.
+        """
+        if self._capabilities is None:
+            self._capabilities = {agent_type: self._describe(agent_type) for agent_type in self._targets}
+        return dict(self._capabilities)
+
+    def _describe(self, agent_type: str) -> str:
+        try:
+            target = self._instances.get(agent_type) or self._load_target(agent_type)
+        except Exception as e:
+            logger.error(f"Không import được agent {agent_type}: {e}")
+            return agent_type
+        profile = self._profile_of(agent_type, target)
+        if profile and profile.description:
+            return profile.description
+        doc = (getattr(target, "__doc__", None) or "").strip()
+        return doc.splitlines()[0] if doc else agent_type
+
+    def _profile_of(self, agent_type: str, target) -> Optional[AgentProfile]:
+        """Profile đã áp override của agent (instance, class hoặc AgentProfile); None nếu agent không có profile."""
+        if isinstance(target, AgentProfile):
+            return target
+        profile = getattr(target, "profile", None)
+        if not isinstance(profile, AgentProfile):
+            return None
+        if agent_type in self._instances:
+            return profile
+        return resolve_profile(profile, self.profile_overrides())
+
+    def profiles(self) -> Dict[str, AgentProfile]:
+        """Profile của các agent khai báo bằng profile, không khởi tạo agent (agent import lỗi bị bỏ qua)."""
+        profiles = {}
+        for agent_type in self._targets:
+            try:
+                target = self._instances.get(agent_type) or self._load_target(agent_type)
+            except Exception as e:
+                logger.error(f"Không import được agent {agent_type}: {e}")
+                continue
+            profile = self._profile_of(agent_type, target)
+            if profile:
+                profiles[agent_type] = profile
+        return profiles
+
+    def configured_models(self) -> List[str]:
+        """Model của các agent, suy ra từ cấu hình mà không khởi tạo agent.
+
+        Agent từ class ngoài chưa khởi tạo thì chưa biết model nên bị bỏ qua.
+        """
+        overrides = self.profile_overrides()
+        models = set()
+        for agent_type, target in self._targets.items():
+            if agent_type in self._instances:
+                models.add(self._instances[agent_type].get_model_name())
+            elif isinstance(target, AgentProfile):
+                models.add(target.model_name())
+            elif agent_type in BUILTIN_AGENTS and target == BUILTIN_AGENTS[agent_type]:
+                model = overrides.get(agent_type, {}).get("model") or getattr(settings, f"MODEL_{agent_type.upper()}", None)
+                if model:
+                    models.add(model)
+        return sorted(models)
@@ -1,15 +1,11 @@
 """UI Designer Agent."""
-import logging
-from agents.base import BaseAgent
-from core.schemas import AgentRequest, AgentResponse
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
 
-logger = logging.getLogger(__name__)
-
-class UiDesignerAgent(BaseAgent):
-    """Agent chuyên về UI design."""
-    
-    def get_system_prompt(self) -> str:
-        return """You are a visionary UI designer who creates interfaces that are not just beautiful, but implementable within rapid development cycles. Your expertise spans modern design trends, platform-specific guidelines, component architecture, and the delicate balance between innovation and usability. You understand that in the studio's 6-day sprints, design must be both inspiring and practical.
+PROFILE = AgentProfile(
+    agent_type="uidesigner",
+    description="Interface design, design systems, user experience, visual design",
+    system_prompt="""You are a visionary UI designer who creates interfaces that are not just beautiful, but implementable within rapid development cycles. Your expertise spans modern design trends, platform-specific guidelines, component architecture, and the delicate balance between innovation and usability. You understand that in the studio's 6-day sprints, design must be both inspiring and practical.
 
 Your primary responsibilities:
 
@@ -38,25 +34,10 @@ Your primary responsibilities:
    - Staying ahead of design curves
 
 Your goal is to create interfaces that users love and developers can actually build within tight timelines. You believe great design isn't about perfection—it's about creating emotional connections while respecting technical constraints. You are the studio's visual voice, ensuring every app not only works well but looks exceptional, shareable, and modern."""
+)
+
+
+class UiDesignerAgent(ProfileAgent):
+    """Agent chuyên về UI design."""
     
-    def get_model_name(self) -> str:
-        from config import settings
-        return settings.MODEL_UIDESIGNER
-    
-    async def process(self, request: AgentRequest) -> AgentResponse:
-        try:
-            response_text = await self.call_ollama(request.message, request.context)
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response=response_text,
-                metadata={"model": self.get_model_name()},
-                success=True
-            )
-        except Exception as e:
-            logger.error(f"Lỗi UI Designer: {e}")
-            return AgentResponse(
-                agent_type=self.agent_type,
-                response="",
-                success=False,
-                error=str(e)
-            )
\ No newline at end of file
+    profile = PROFILE
@@ -2,7 +2,7 @@
 Cấu hình ứng dụng từ environment variables.
 """
 import os
-from typing import List
+from typing import Any, Dict, List
 
 from pydantic_settings import BaseSettings
 
@@ -17,12 +17,126 @@ class Settings(BaseSettings):
     
     # Ollama config
     OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_BASE_URLS: str = ""
     OLLAMA_TIMEOUT: int = 600
     
+    # Ollama load balancing
+    OLLAMA_LB_STRATEGY: str = "least_outstanding"
+    OLLAMA_LB_EWMA_ALPHA: float = 0.3
+    OLLAMA_POOL_SIZE_PER_HOST: int = 8
+    OLLAMA_POOL_SIZE_TOTAL: int = 0
+    OLLAMA_KEEPALIVE_TIMEOUT: float = 60.0
+    OLLAMA_DNS_CACHE_TTL: int = 300
+    OLLAMA_HEALTH_CHECK_INTERVAL: float = 10.0
+    OLLAMA_UNHEALTHY_THRESHOLD: int = 3
+    
+    # Model placement: {"model": ["http://node:11434", ...]} (JSON)
+    OLLAMA_MODEL_PLACEMENT: Dict[str, List[str]] = {}
+    OLLAMA_BACKEND_MAX_IN_FLIGHT: int = 4
+    
+    # Retry, hedging và circuit breaker
+    OLLAMA_RETRY_ATTEMPTS: int = 2
+    OLLAMA_RETRY_BACKOFF_BASE: float = 0.5
+    OLLAMA_RETRY_BACKOFF_MAX: float = 8.0
+    OLLAMA_HEDGE_ENABLED: bool = False
+    OLLAMA_HEDGE_PERCENTILE: float = 95.0
+    OLLAMA_HEDGE_MIN_SAMPLES: int = 20
+    OLLAMA_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    OLLAMA_CIRCUIT_RESET_TIMEOUT: float = 30.0
+    
+    # Model residency: warm-up và keep_alive
+    OLLAMA_WARMUP_ENABLED: bool = True
+    OLLAMA_WARMUP_MODELS: List[str] = []
+    OLLAMA_CRITICAL_MODELS: List[str] = []
+    OLLAMA_KEEP_ALIVE_HOT: str = "30m"
+    OLLAMA_KEEP_ALIVE_DEFAULT: str = "5m"
+    OLLAMA_HOT_MODEL_WINDOW: float = 600.0
+    OLLAMA_HOT_MODEL_MIN_REQUESTS: int = 3
+    OLLAMA_RESIDENCY_CHECK_INTERVAL: float = 60.0
+    # Warm-up lỗi được thử lại với backoff (giây), tăng gấp đôi mỗi lần đến mức tối đa
+    OLLAMA_WARMUP_RETRY_BASE: float = 5.0
+    OLLAMA_WARMUP_RETRY_MAX: float = 300.0
+    
+    # Token budget: num_ctx theo bucket, num_predict theo agent ({"agent_type": n}, JSON)
+    # OLLAMA_NUM_PREDICT_DEFAULT: giới hạn output cho agent không có giới hạn riêng (0 = không giới hạn);
+    # OLLAMA_NUM_CTX_OUTPUT_RESERVE: số token chừa cho output không giới hạn khi chọn bucket num_ctx
+    OLLAMA_AUTO_NUM_CTX: bool = True
+    OLLAMA_NUM_CTX_BUCKETS: List[int] = [2048, 4096, 8192, 16384]
+    OLLAMA_CHARS_PER_TOKEN: float = 3.5
+    OLLAMA_NUM_PREDICT_DEFAULT: int = 0
+    OLLAMA_NUM_CTX_OUTPUT_RESERVE: int = 2048
+    OLLAMA_NUM_PREDICT_LIMITS: Dict[str, int] = {}
+    
+    # Ghi/phát lại generate để benchmark offline ({pid} trong OLLAMA_RECORD_FILE → file riêng mỗi worker)
+    # OLLAMA_REPLAY_MATCH: request (khớp đúng request) | model | sequence; OLLAMA_REPLAY_TIME_SCALE: 0 = không chờ
+    OLLAMA_RECORD_FILE: str = ""
+    OLLAMA_REPLAY_FILE: str = ""
+    OLLAMA_REPLAY_TIME_SCALE: float = 1.0
+    OLLAMA_REPLAY_MATCH: str = "request"
+    
     # Agent config
     AGENTS_REPO_URL: str = "https://github.com/contains-studio/agents"
     AGENTS_LOCAL_PATH: str = "./agents_repo"
     
+    # Thu gọn output dependency: policy none | truncate | summarize
+    # COMPACTION_AGENT_POLICIES: {"agent_type": {"policy": "...", "budget_tokens": n}} (JSON)
+    COMPACTION_POLICY: str = "truncate"
+    COMPACTION_BUDGET_TOKENS: int = 3000
+    COMPACTION_AGENT_POLICIES: Dict[str, Dict[str, Any]] = {}
+    COMPACTION_SUMMARY_MODEL: str = ""
+    COMPACTION_CHUNK_TOKENS: int = 3000
+    
+    # Cache kết quả task theo nội dung (TTL tính bằng giây, 0 = không hết hạn)
+    # Backend: sqlite (DATA_DIR, dùng chung cho mọi worker) hoặc memory (riêng từng worker)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_BACKEND: str = "sqlite"
+    RESULT_CACHE_MAX_ENTRIES: int = 512
+    RESULT_CACHE_TTL: float = 86400.0
+    
+    # Retry task trong /process khi agent trả lỗi
+    # TASK_RETRY_POLICIES: {"agent_type": {"attempts": n, "backoff_base": s, "backoff_max": s}} (JSON)
+    TASK_RETRY_ATTEMPTS: int = 1
+    TASK_RETRY_BACKOFF_BASE: float = 2.0
+    TASK_RETRY_BACKOFF_MAX: float = 30.0
+    TASK_RETRY_POLICIES: Dict[str, Dict[str, Any]] = {}
+    
+    # Checkpoint các lần chạy /process để resume (SQLite trong DATA_DIR)
+    DATA_DIR: str = "./data"
+    CHECKPOINT_ENABLED: bool = True
+    CHECKPOINT_RETENTION_HOURS: float = 168.0
+    # Run RUNNING không được gia hạn quá số giây này thì coi như worker đã chết và cho resume
+    CHECKPOINT_LEASE_TIMEOUT: float = 120.0
+    
+    # Thống kê token/thời gian tính toán theo run, tenant, agent (SQLite trong DATA_DIR)
+    USAGE_TRACKING_ENABLED: bool = True
+    USAGE_RETENTION_DAYS: float = 30.0
+    
+    # Endpoint /metrics (Prometheus); nhiều worker thì đặt env PROMETHEUS_MULTIPROC_DIR
+    METRICS_ENABLED: bool = True
+    
+    # Theo dõi event loop: lag và callback chặn loop quá LOOP_MONITOR_THRESHOLD giây (kèm stack)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.5
+    LOOP_MONITOR_THRESHOLD: float = 0.1
+    LOOP_MONITOR_MAX_EVENTS: int = 50
+    # Endpoint /debug/* (chỉ bật khi cần chẩn đoán)
+    DEBUG_ENDPOINTS_ENABLED: bool = False
+    # Token cho endpoint admin (/debug/profile/*, header X-Admin-Token); rỗng thì tắt
+    ADMIN_TOKEN: str = ""
+    
+    # Tracing (OpenTelemetry): span cho planning, task và Ollama, header Server-Timing
+    # TRACING_EXPORTER: none | console | file (JSONL tại TRACING_FILE)
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "./data/traces.jsonl"
+    TRACING_SERVICE_NAME: str = "aio-agent"
+    
+    # Agent profiles: override theo agent_type hoặc khai báo agent mới (JSON)
+    AGENT_PROFILES_FILE: str = ""
+    AGENT_PROFILE_OVERRIDES: Dict[str, Dict[str, Any]] = {}
+    # Agent từ package ngoài: {"agent_type": "package.module:Class"} (JSON)
+    AGENT_REGISTRY: Dict[str, str] = {}
+    
     # Agent Models
     MODEL_AIENGINEER: str = "codellama"
     MODEL_BACKENDARCHITECT: str = "codellama"
@@ -37,28 +151,34 @@ class Settings(BaseSettings):
     MODEL_PROJECTSHIPPER: str = "llama2"
     MODEL_TASKORCHESTRATOR: str = "deepseek-r1:1.5b"
     
-    # Logging
-    LOG_LEVEL: str = "DEBUG"
+    # Logging (queue + thread ghi nền, file xoay vòng)
+    # LOG_SAMPLING: tỉ lệ giữ record dưới WARNING theo logger, ví dụ {"core.ollama_client": 0.1} (JSON)
+    LOG_LEVEL: str = "INFO"
+    # LOG_FILE: rỗng = chỉ console; file được ghi chung bởi mọi worker, xoay vòng bằng logrotate
+    LOG_FILE: str = ""
+    LOG_MAX_MESSAGE_CHARS: int = 2000
+    LOG_SAMPLING: Dict[str, float] = {}
+    LOG_QUEUE_SIZE: int = 10000
     
     class Config:
         env_file = ".env"
         case_sensitive = True
+    
+    def ollama_backend_urls(self) -> List[str]:
+        """Danh sách Ollama backend (OLLAMA_BASE_URLS, fallback OLLAMA_BASE_URL)."""
+        urls = [url.strip() for url in self.OLLAMA_BASE_URLS.split(",") if url.strip()]
+        return urls or [self.OLLAMA_BASE_URL]
+    
+    def agent_models(self) -> List[str]:
+        """Các model khác nhau được cấu hình cho agent (MODEL_*)."""
+        return sorted({
+            getattr(self, name) for name in type(self).model_fields if name.startswith("MODEL_")
+        })
 
 
 settings = Settings()
 
-# Cấu hình logging
+# Logger ồn của thư viện
 import logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("app.log")
-    ]
-)
-
-# Set specific loggers
 logging.getLogger("uvicorn.access").setLevel(logging.INFO)
 logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
-logging.getLogger("core.ollama_client").setLevel(logging.DEBUG)
\ No newline at end of file
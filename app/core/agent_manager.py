@@ -2,14 +2,26 @@
 Quản lý và điều phối các agent.
 """
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
 
-from agents import (BaseAgent, AiEngineerAgent, UiDesignerAgent, ContentCreatorAgent, 
-                    BackendArchitectAgent, FrontendDeveloperAgent, RapidPrototyperAgent, 
-                    GrowthHackerAgent, TrendResearcherAgent, DevopsAutomatorAgent, 
-                    TestWriterFixerAgent, ProjectShipperAgent)
+from agents.base import BaseAgent
+from agents.registry import AgentRegistry
+from config import settings
+from core import metrics
+from core.health_monitor import HealthMonitor
+from core.loop_monitor import LoopMonitor
+from core.profiler import CpuProfiler, MemoryProfiler
+from core.model_placement import normalize_model_name
+from core.model_residency import ModelResidencyManager
 from core.ollama_client import OllamaClient
+from core.result_cache import ResultCache
+from core.run_store import RunStore
 from core.schemas import AgentRequest, AgentResponse
+from core.task_orchestrator import PLANNER_OPTIONS, TaskOrchestrator
+from core.token_budget import TokenBudget
+from core.usage import UsageStore, summarize, track_usage
 
 
 logger = logging.getLogger(__name__)
@@ -20,33 +32,111 @@ class AgentManager:
     
     def __init__(self):
         self.ollama_client = OllamaClient()
-        self.agents: Dict[str, BaseAgent] = {}
+        self.agents: AgentRegistry = AgentRegistry(self.ollama_client)
         self.default_agent_type = "aiengineer"
+        self.token_budget = TokenBudget.from_settings()
+        self.residency = ModelResidencyManager(
+            self.ollama_client,
+            warmup_models=settings.OLLAMA_WARMUP_MODELS or settings.agent_models(),
+            critical_models=settings.OLLAMA_CRITICAL_MODELS,
+            keep_alive_hot=settings.OLLAMA_KEEP_ALIVE_HOT,
+            keep_alive_default=settings.OLLAMA_KEEP_ALIVE_DEFAULT,
+            hot_window=settings.OLLAMA_HOT_MODEL_WINDOW,
+            hot_min_requests=settings.OLLAMA_HOT_MODEL_MIN_REQUESTS,
+            check_interval=settings.OLLAMA_RESIDENCY_CHECK_INTERVAL,
+            default_num_ctx=self.token_budget.apply("", "").get("num_ctx"),
+            warmup_retry_base=settings.OLLAMA_WARMUP_RETRY_BASE,
+            warmup_retry_max=settings.OLLAMA_WARMUP_RETRY_MAX
+        )
+        self.ollama_client.residency = self.residency
+        self.health_monitor = HealthMonitor(self.ollama_client, interval=settings.OLLAMA_HEALTH_CHECK_INTERVAL)
+        self.loop_monitor = LoopMonitor(
+            interval=settings.LOOP_MONITOR_INTERVAL if settings.LOOP_MONITOR_ENABLED else 0,
+            threshold=settings.LOOP_MONITOR_THRESHOLD,
+            max_events=settings.LOOP_MONITOR_MAX_EVENTS
+        )
+        self.cpu_profiler = CpuProfiler()
+        self.memory_profiler = MemoryProfiler()
+        self.result_cache: Optional[ResultCache] = ResultCache.from_settings()
+        self.run_store: Optional[RunStore] = RunStore.from_settings()
+        self.usage_store: Optional[UsageStore] = UsageStore.from_settings()
     
     async def initialize(self):
         """Khởi tạo các agent."""
         logger.info("Khởi tạo Agent Manager...")
+        await self.ollama_client.start()
+        self.health_monitor.start()
+        self.loop_monitor.start()
         
-        # Khởi tạo các agent có sẵn
-        agents_to_init = [
-            ("aiengineer", AiEngineerAgent), ("uidesigner", UiDesignerAgent), 
-            ("contentcreator", ContentCreatorAgent), ("backendarchitect", BackendArchitectAgent), 
-            ("frontenddeveloper", FrontendDeveloperAgent), ("rapidprototyper", RapidPrototyperAgent), 
-            ("growthhacker", GrowthHackerAgent), ("trendresearcher", TrendResearcherAgent), 
-            ("devopsautomator", DevopsAutomatorAgent), ("testwriterfixer", TestWriterFixerAgent), 
-            ("projectshipper", ProjectShipperAgent)
-        ]
+        # Chỉ nạp khai báo; agent được import và khởi tạo khi có request đầu tiên
+        self.agents.discover()
+        
+        if not settings.OLLAMA_WARMUP_MODELS:
+            # Profile có thể đổi model so với MODEL_*
+            self.residency.add_warmup_models(self.agents.configured_models())
+        self.residency.set_num_ctx(self._expected_num_ctx())
+        
+        logger.info(f"Đã đăng ký {len(self.agents)} agents: {list(self.agents.keys())}")
         
-        for agent_name, agent_class in agents_to_init:
-            logger.debug(f"Initializing agent: {agent_name}")
-            self.agents[agent_name] = agent_class(self.ollama_client)
+        if self.run_store:
+            try:
+                await self.run_store.prune(settings.CHECKPOINT_RETENTION_HOURS * 3600)
+            except Exception as e:
+                logger.error(f"Không dọn được checkpoint cũ: {e}")
         
-        logger.info(f"Đã khởi tạo {len(self.agents)} agents: {list(self.agents.keys())}")
+        if self.usage_store:
+            try:
+                await self.usage_store.prune(settings.USAGE_RETENTION_DAYS * 86400)
+            except Exception as e:
+                logger.error(f"Không dọn được usage cũ: {e}")
+        
+        # Warm-up chạy nền, readiness chỉ bật khi các model critical đã warm
+        if settings.OLLAMA_WARMUP_ENABLED:
+            self.residency.start()
+    
+    def _expected_num_ctx(self) -> Dict[str, int]:
+        """num_ctx mà request ngắn của mỗi model sẽ dùng, suy ra từ system prompt và options của agent.
+
+        Model dùng chung cho nhiều agent lấy bucket phổ biến nhất.
+        """
+        prompts = [
+            (agent_type, profile.model_name, profile.system_prompt, profile.generation_options())
+            for agent_type, profile in self.agents.profiles().items()
+        ]
+        orchestrator = TaskOrchestrator(self.ollama_client, self.agents.capabilities())
+        prompts.append((
+            orchestrator.agent_type, orchestrator.get_model_name, orchestrator.get_system_prompt(), PLANNER_OPTIONS
+        ))
+        buckets: Dict[str, Counter] = {}
+        for agent_type, model_name, system_prompt, options in prompts:
+            try:
+                model = normalize_model_name(model_name())
+            except ValueError:
+                continue
+            # Cùng dạng prompt với BaseAgent.call_ollama, message của user rỗng
+            num_ctx = self.token_budget.apply(f"{system_prompt}\n\nUser: ", agent_type, options).get("num_ctx")
+            if num_ctx:
+                buckets.setdefault(model, Counter())[num_ctx] += 1
+        return {model: counts.most_common(1)[0][0] for model, counts in buckets.items()}
+    
+    @property
+    def is_ready(self) -> bool:
+        """Manager sẵn sàng nhận traffic (agent đã khởi tạo, model critical đã warm)."""
+        return bool(self.agents) and self.residency.is_ready
+    
+    @property
+    def is_serving(self) -> bool:
+        """Sẵn sàng và Ollama khả dụng theo lần probe gần nhất (không gọi mạng)."""
+        return self.is_ready and self.health_monitor.ollama_connected
+    
+    def model_status(self) -> Dict[str, Any]:
+        """Trạng thái residency của các model."""
+        return self.residency.status()
     
     async def process_request(self, request: AgentRequest) -> AgentResponse:
         """Xử lý request và route đến agent phù hợp."""
         agent_type = request.agent_type or self.default_agent_type
-        logger.debug(f"Processing request for agent: {agent_type}, message length: {len(request.message)}")
+        logger.debug("Processing request for agent: %s, message length: %d", agent_type, len(request.message))
         
         # Tìm agent phù hợp
         agent = self.get_agent(agent_type)
@@ -59,24 +149,33 @@ class AgentManager:
                 error=f"Không tìm thấy agent: {agent_type}"
             )
         
-        logger.info(f"Routing request đến agent: {agent_type}")
-        try:
-            response = await agent.process(request)
-            logger.debug(f"Agent {agent_type} response: success={response.success}, response_length={len(response.response)}")
-            return response
-        except Exception as e:
-            logger.error(f"Agent {agent_type} processing failed: {e}")
-            return AgentResponse(
-                agent_type=agent_type,
-                response="",
-                success=False,
-                error=f"Agent processing error: {str(e)}"
-            )
+        logger.info("Routing request đến agent: %s", agent_type)
+        started = time.perf_counter()
+        with track_usage() as usage:
+            try:
+                response = await agent.process(request)
+                logger.debug("Agent %s response: success=%s, response_length=%d", agent_type, response.success, len(response.response))
+            except Exception as e:
+                logger.error(f"Agent {agent_type} processing failed: {e}")
+                response = AgentResponse(
+                    agent_type=agent_type,
+                    response="",
+                    success=False,
+                    error=f"Agent processing error: {str(e)}"
+                )
+        if usage["calls"]:
+            response.metadata = {**(response.metadata or {}), "usage": summarize(usage)}
+        metrics.observe_agent(agent_type, time.perf_counter() - started, response.success)
+        return response
     
     def get_agent(self, agent_type: str) -> Optional[BaseAgent]:
         """Lấy agent theo type."""
         return self.agents.get(agent_type)
     
+    def agent_capabilities(self) -> Dict[str, str]:
+        """Mô tả năng lực của các agent đã đăng ký (cho planner)."""
+        return self.agents.capabilities()
+    
     def list_agents(self) -> List[str]:
         """Lấy danh sách các agent có sẵn."""
         return list(self.agents.keys())
@@ -86,22 +185,33 @@ class AgentManager:
         self.agents[agent.agent_type] = agent
         logger.info(f"Đã đăng ký agent: {agent.agent_type}")
     
-    async def health_check(self) -> Dict[str, any]:
-        """Kiểm tra trạng thái của manager."""
+    async def health_check(self) -> Dict[str, Any]:
+        """Kiểm tra trạng thái của manager (đọc từ cache của health monitor)."""
         logger.debug("Performing health check")
-        ollama_status = await self.ollama_client.health_check()
+        # Chỉ probe trực tiếp khi monitor chưa có dữ liệu (ví dụ ngay sau startup)
+        state = self.health_monitor.snapshot() or await self.health_monitor.refresh()
         
         health_data = {
             "agents_loaded": len(self.agents),
             "agent_types": list(self.agents.keys()),
-            "ollama_connected": ollama_status
+            "ollama_connected": state["ollama_connected"],
+            "ollama_latency_ms": state["ollama_latency_ms"],
+            "loaded_models": state["loaded_models"],
+            "ollama_backends": state["backends"],
+            "checked_at": state["checked_at"],
+            "models_ready": self.residency.is_ready,
+            "ready": self.is_ready
         }
-        logger.debug(f"Health check result: {health_data}")
+        logger.debug("Health check result: %s", health_data)
         return health_data
     
     async def cleanup(self):
         """Dọn dẹp resources."""
         logger.info("Dọn dẹp Agent Manager...")
+        await self.health_monitor.stop()
+        await self.loop_monitor.stop()
+        self.memory_profiler.stop()
+        await self.residency.stop()
         try:
             await self.ollama_client.close()
         except Exception as e:
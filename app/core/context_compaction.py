@@ -0,0 +1,171 @@
+"""
+Thu gọn output của các task dependency trước khi đưa vào prompt của task phụ thuộc.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+from config import settings
+from core.schemas import OllamaRequest
+from core.token_budget import ESTIMATE_MARGIN, TokenBudget
+from core.utils import strip_think_blocks
+
+if TYPE_CHECKING:
+    from core.ollama_client import OllamaClient
+
+
+logger = logging.getLogger(__name__)
+
+POLICY_NONE = "none"
+POLICY_TRUNCATE = "truncate"
+POLICY_SUMMARIZE = "summarize"
+POLICIES = (POLICY_NONE, POLICY_TRUNCATE, POLICY_SUMMARIZE)
+
+SUMMARY_PROMPT = """Summarize the output of a previous task for another specialist who must do the task below.
+Keep concrete decisions, names, numbers, APIs, code signatures and requirements that matter for that task. Drop everything else.
+Answer with the summary only, at most {max_words} words.
+
+Next task: {task}
+
+Previous output:
+{text}"""
+
+
+def head_tail(text: str, max_chars: int, head_ratio: float = 0.6) -> str:
+    """Giữ phần đầu và phần cuối của text, bỏ đoạn giữa."""
+    if len(text) <= max_chars:
+        return text
+    head = int(max_chars * head_ratio)
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n\n[... {omitted} ký tự đã được lược bỏ ...]\n\n{text[len(text) - tail:]}"
+
+
+def allocate(sizes: Dict[int, int], budget: int) -> Dict[int, int]:
+    """Chia budget cho các output: output nhỏ giữ nguyên, phần còn lại chia đều cho output lớn."""
+    allocation: Dict[int, int] = {}
+    remaining = dict(sizes)
+    left = budget
+    while remaining:
+        share = left // len(remaining)
+        small = {key: size for key, size in remaining.items() if size <= share}
+        if not small:
+            for key in remaining:
+                allocation[key] = share
+            break
+        for key, size in small.items():
+            allocation[key] = size
+            left -= size
+            del remaining[key]
+    return allocation
+
+
+class DependencyCompactor:
+    """Giữ tổng output dependency trong budget token theo policy của từng agent.
+
+    - `truncate`: giữ đầu/cuối mỗi output theo phần budget được chia.
+    - `summarize`: map-reduce bằng model nhỏ (tóm tắt từng chunk rồi ghép), lỗi thì quay về truncate.
+    - `none`: giữ nguyên.
+    """
+
+    def __init__(
+        self,
+        ollama_client: "OllamaClient",
+        token_budget: Optional[TokenBudget] = None,
+        policy: str = POLICY_TRUNCATE,
+        budget_tokens: int = 3000,
+        agent_policies: Optional[Dict[str, Dict[str, Any]]] = None,
+        summary_model: str = "",
+        chunk_tokens: int = 3000,
+        head_ratio: float = 0.6
+    ):
+        self.ollama_client = ollama_client
+        self.token_budget = token_budget or TokenBudget()
+        self.policy = policy
+        self.budget_tokens = budget_tokens
+        self.agent_policies = agent_policies or {}
+        self.summary_model = summary_model
+        self.chunk_tokens = chunk_tokens
+        self.head_ratio = head_ratio
+
+    @classmethod
+    def from_settings(cls, ollama_client: "OllamaClient") -> "DependencyCompactor":
+        """Tạo compactor từ cấu hình."""
+        return cls(
+            ollama_client,
+            token_budget=TokenBudget.from_settings(),
+            policy=settings.COMPACTION_POLICY,
+            budget_tokens=settings.COMPACTION_BUDGET_TOKENS,
+            agent_policies=settings.COMPACTION_AGENT_POLICIES,
+            summary_model=settings.COMPACTION_SUMMARY_MODEL or settings.MODEL_TASKORCHESTRATOR,
+            chunk_tokens=settings.COMPACTION_CHUNK_TOKENS
+        )
+
+    def policy_for(self, agent_type: str) -> Tuple[str, int]:
+        """Policy và budget token của agent."""
+        override = self.agent_policies.get(agent_type, {})
+        policy = override.get("policy", self.policy)
+        if policy not in POLICIES:
+            logger.warning(f"Compaction policy không hợp lệ cho {agent_type}: {policy}, dùng {POLICY_TRUNCATE}")
+            policy = POLICY_TRUNCATE
+        return policy, int(override.get("budget_tokens", self.budget_tokens))
+
+    def _chars(self, tokens: int) -> int:
+        return int(tokens * self.token_budget.chars_per_token / ESTIMATE_MARGIN)
+
+    async def compact(self, agent_type: str, task_description: str, outputs: Dict[int, str]) -> Tuple[Dict[int, str], Dict[str, Any]]:
+        """Thu gọn output dependency của một task.
+
+        Args:
+            agent_type (str): Agent sẽ nhận các output.
+            task_description (str): Task phụ thuộc, dùng để định hướng tóm tắt.
+            outputs (Dict[int, str]): Output theo index task dependency.
+
+        Returns:
+            Tuple[Dict[int, str], Dict[str, Any]]: Output đã thu gọn và thống kê.
+        """
+        policy, budget = self.policy_for(agent_type)
+        sizes = {dep: self.token_budget.estimate_tokens(text) for dep, text in outputs.items()}
+        total = sum(sizes.values())
+        stats = {"policy": policy, "budget_tokens": budget, "input_tokens": total, "output_tokens": total, "compacted": []}
+        if policy == POLICY_NONE or total <= budget:
+            return dict(outputs), stats
+
+        allocation = allocate(sizes, budget)
+        over = [dep for dep in outputs if sizes[dep] > allocation[dep]]
+        compacted = dict(outputs)
+        if policy == POLICY_SUMMARIZE:
+            summaries = await asyncio.gather(
+                *(self._summarize(task_description, outputs[dep], allocation[dep]) for dep in over),
+                return_exceptions=True
+            )
+            for dep, summary in zip(over, summaries):
+                if isinstance(summary, Exception):
+                    logger.warning(f"Tóm tắt output task {dep} thất bại, chuyển sang truncate: {summary}")
+                    summary = outputs[dep]
+                compacted[dep] = head_tail(summary, self._chars(allocation[dep]), self.head_ratio)
+        else:
+            for dep in over:
+                compacted[dep] = head_tail(outputs[dep], self._chars(allocation[dep]), self.head_ratio)
+
+        stats["compacted"] = over
+        stats["output_tokens"] = sum(self.token_budget.estimate_tokens(text) for text in compacted.values())
+        logger.info(
+            f"Compacted dependency outputs cho {agent_type} ({policy}): "
+            f"~{total} → ~{stats['output_tokens']} tokens, tasks {over}"
+        )
+        return compacted, stats
+
+    async def _summarize(self, task_description: str, text: str, max_tokens: int) -> str:
+        """Map: tóm tắt từng chunk song song; reduce: ghép các bản tóm tắt."""
+        chunk_chars = self._chars(self.chunk_tokens)
+        chunks = [text[start:start + chunk_chars] for start in range(0, len(text), chunk_chars)]
+        per_chunk = max(64, max_tokens // len(chunks))
+        summaries = await asyncio.gather(*(self._summarize_chunk(task_description, chunk, per_chunk) for chunk in chunks))
+        return "\n\n".join(summaries)
+
+    async def _summarize_chunk(self, task_description: str, text: str, max_tokens: int) -> str:
+        prompt = SUMMARY_PROMPT.format(max_words=int(max_tokens * 0.75), task=task_description, text=text)
+        options = self.token_budget.apply(prompt, "compaction", {"temperature": 0, "num_predict": max_tokens})
+        response = await self.ollama_client.generate(OllamaRequest(model=self.summary_model, prompt=prompt, options=options))
+        return strip_think_blocks(response.response)
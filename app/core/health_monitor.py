@@ -0,0 +1,82 @@
+"""
+Health monitor chạy nền, cache trạng thái Ollama để endpoint health không gọi mạng.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from core.ollama_client import OllamaClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Định kỳ probe Ollama và giữ snapshot trạng thái trong bộ nhớ."""
+
+    def __init__(self, ollama_client: "OllamaClient", interval: float = 10.0):
+        self.ollama_client = ollama_client
+        self.interval = interval
+        self._state: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Chạy vòng probe nền."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Dừng vòng probe nền."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Vòng monitor không được chết vì một lần probe lỗi bất ngờ
+                logger.error(f"Health monitor refresh thất bại: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Probe Ollama (version, ps, tags) và cập nhật cache."""
+        started = time.monotonic()
+        connected = await self.ollama_client.health_check()
+        if connected:
+            await self.ollama_client.refresh_residency()
+
+        backends = self.ollama_client.backend_status()
+        latencies = [
+            b["last_probe_latency"] for b in backends
+            if b.get("healthy") and b.get("last_probe_latency") is not None
+        ]
+        loaded = sorted({model for b in backends for model in b.get("loaded_models", [])})
+        self._state = {
+            "ollama_connected": connected,
+            "ollama_latency_ms": round(min(latencies) * 1000, 2) if latencies else None,
+            "loaded_models": loaded,
+            "backends": backends,
+            "checked_at": time.time(),
+            "check_duration_ms": round((time.monotonic() - started) * 1000, 2),
+        }
+        logger.debug("Health state refreshed: connected=%s, loaded_models=%s", connected, loaded)
+        return self._state
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Trạng thái cache gần nhất (None nếu chưa probe lần nào)."""
+        if self._state is None:
+            return None
+        return dict(self._state, age_seconds=round(time.time() - self._state["checked_at"], 2))
+
+    @property
+    def ollama_connected(self) -> bool:
+        """Ollama khả dụng theo lần probe gần nhất."""
+        return bool(self._state and self._state["ollama_connected"])
@@ -0,0 +1,23 @@
+"""
+JSON encode/decode nhanh bằng orjson cho payload Ollama và API.
+"""
+from typing import Any
+
+import orjson
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize object thành JSON bytes."""
+    return orjson.dumps(obj)
+
+
+def canonical_dumps(obj: Any) -> bytes:
+    """Serialize ổn định (key sắp xếp, kiểu lạ chuyển thành str) để dùng làm input của hash."""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON từ bytes/str."""
+    return orjson.loads(data)
@@ -0,0 +1,194 @@
+"""
+Cân bằng tải giữa nhiều Ollama backend.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set
+
+import aiohttp
+
+from core.model_placement import ModelPlacement, normalize_model_name
+from core.resilience import CircuitBreaker, CircuitOpenError, is_retryable
+
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_EWMA = "ewma"
+
+
+class OllamaBackend:
+    """Trạng thái runtime của một Ollama backend."""
+
+    def __init__(self, url: str, ewma_alpha: float = 0.3, circuit: Optional[CircuitBreaker] = None):
+        self.url = url.rstrip("/")
+        self.circuit = circuit or CircuitBreaker()
+        self.ewma_alpha = ewma_alpha
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.last_probe_at: Optional[float] = None
+        self.last_probe_latency: Optional[float] = None
+        self.loaded_models: Set[str] = set()
+        self.available_models: Set[str] = set()
+
+    def record_success(self, latency: float):
+        """Ghi nhận request thành công và cập nhật EWMA latency."""
+        self.total_requests += 1
+        self.consecutive_failures = 0
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.ewma_latency
+
+    def record_failure(self):
+        """Ghi nhận request lỗi."""
+        self.total_requests += 1
+        self.total_failures += 1
+        self.consecutive_failures += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot trạng thái backend."""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "circuit": self.circuit.state,
+            "in_flight": self.in_flight,
+            "ewma_latency": self.ewma_latency,
+            "consecutive_failures": self.consecutive_failures,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "last_probe_latency": self.last_probe_latency,
+            "loaded_models": sorted(self.loaded_models),
+            "available_models": sorted(self.available_models),
+        }
+
+
+class LoadBalancer:
+    """Chọn backend theo least-outstanding-requests hoặc EWMA latency."""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        strategy: str = STRATEGY_LEAST_OUTSTANDING,
+        unhealthy_threshold: int = 3,
+        ewma_alpha: float = 0.3,
+        placement: Optional[ModelPlacement] = None,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_timeout: float = 30.0
+    ):
+        if not urls:
+            raise ValueError("Cần ít nhất một Ollama backend")
+        if strategy not in (STRATEGY_LEAST_OUTSTANDING, STRATEGY_EWMA):
+            raise ValueError(f"Chiến lược load balancing không hợp lệ: {strategy}")
+        self.backends = [
+            OllamaBackend(url, ewma_alpha, CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout))
+            for url in urls
+        ]
+        self.strategy = strategy
+        self.unhealthy_threshold = unhealthy_threshold
+        self.placement = placement or ModelPlacement()
+        self._rr_counter = 0
+
+    def healthy_backends(self) -> List[OllamaBackend]:
+        """Danh sách backend đang khỏe."""
+        return [backend for backend in self.backends if backend.healthy]
+
+    def _score(self, backend: OllamaBackend) -> float:
+        if self.strategy == STRATEGY_EWMA:
+            # Chưa có mẫu latency thì coi như nhanh nhất để backend mới nhận traffic
+            return (backend.ewma_latency or 0.0) * (backend.in_flight + 1)
+        return float(backend.in_flight)
+
+    def select(self, model: Optional[str] = None, exclude: Sequence[OllamaBackend] = ()) -> OllamaBackend:
+        """Chọn backend tốt nhất, ưu tiên backend khỏe và node đặt sẵn model.
+
+        Raises:
+            CircuitOpenError: Nếu circuit của mọi backend đều đang mở.
+        """
+        available = [b for b in self.backends if b.circuit.is_available()]
+        if not available:
+            raise CircuitOpenError("Circuit của tất cả Ollama backend đang mở")
+
+        candidates = [b for b in available if b.healthy and b not in exclude]
+        if not candidates:
+            # Panic mode: không còn backend khỏe chưa thử thì vẫn route thay vì từ chối toàn bộ
+            candidates = [b for b in available if b not in exclude] or available
+            logger.warning("Không còn Ollama backend khỏe chưa thử, route sang backend còn lại")
+        if model:
+            candidates = self.placement.candidates(candidates, model)
+
+        # Xoay vòng điểm bắt đầu để phá hòa khi điểm số bằng nhau
+        start = self._rr_counter % len(candidates)
+        self._rr_counter += 1
+        rotated = candidates[start:] + candidates[:start]
+        return min(rotated, key=self._score)
+
+    @asynccontextmanager
+    async def track(self, backend: OllamaBackend) -> AsyncIterator[OllamaBackend]:
+        """Theo dõi request đang chạy trên backend và ghi nhận kết quả."""
+        backend.in_flight += 1
+        backend.circuit.on_request_start()
+        started = time.monotonic()
+        try:
+            yield backend
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if not is_retryable(e):
+                # Lỗi phía request (4xx) không phản ánh sức khỏe backend
+                backend.circuit.release_trial()
+                raise
+            backend.record_failure()
+            backend.circuit.record_failure()
+            if backend.healthy and backend.consecutive_failures >= self.unhealthy_threshold:
+                self._eject(backend)
+            raise
+        except asyncio.CancelledError:
+            # Request bị hủy (ví dụ thua khi hedging) không tính là thành công hay lỗi
+            backend.circuit.release_trial()
+            raise
+        else:
+            backend.record_success(time.monotonic() - started)
+            backend.circuit.record_success()
+        finally:
+            backend.in_flight -= 1
+
+    def mark_probe_result(self, backend: OllamaBackend, ok: bool, latency: Optional[float] = None):
+        """Cập nhật trạng thái backend theo kết quả health probe."""
+        backend.last_probe_at = time.monotonic()
+        backend.last_probe_latency = latency
+        if ok:
+            backend.consecutive_failures = 0
+            if not backend.healthy:
+                backend.healthy = True
+                logger.info(f"Ollama backend {backend.url} đã khỏe lại, đưa vào rotation")
+            return
+
+        backend.consecutive_failures += 1
+        if backend.healthy and backend.consecutive_failures >= self.unhealthy_threshold:
+            self._eject(backend)
+
+    def update_residency(self, backend: OllamaBackend, loaded: Set[str], available: Set[str]):
+        """Cập nhật model đang nạp / đã pull trên backend."""
+        backend.loaded_models = loaded
+        backend.available_models = available
+
+    def mark_model_loaded(self, backend: OllamaBackend, model: str):
+        """Đánh dấu model đã nạp sau khi generate thành công."""
+        model = normalize_model_name(model)
+        backend.loaded_models.add(model)
+        backend.available_models.add(model)
+
+    def _eject(self, backend: OllamaBackend):
+        backend.healthy = False
+        logger.warning(
+            f"Eject Ollama backend {backend.url} sau {backend.consecutive_failures} lần lỗi liên tiếp"
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Snapshot trạng thái toàn bộ backend."""
+        return [backend.to_dict() for backend in self.backends]
@@ -0,0 +1,132 @@
+"""
+Đo độ trễ event loop và bắt các callback chặn loop quá lâu (kèm stack).
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_FRAMES = 30
+
+
+class LoopMonitor:
+    """Theo dõi event loop của worker bằng thread watchdog.
+
+    Mỗi `interval` giây thread gửi một ping vào loop (`call_soon_threadsafe`);
+    thời gian đến khi loop chạy ping là độ trễ của loop. Ping chưa được chạy sau
+    `threshold` giây nghĩa là một callback đang chặn loop: thread lấy mẫu stack
+    của thread chạy loop, tức đúng đoạn code đang chặn.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.1, max_events: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+        self._lag_total = 0.0
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Chạy thread watchdog cho event loop hiện tại."""
+        if self.interval <= 0 or self._watchdog is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        """Dừng thread watchdog."""
+        self._stopped.set()
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join, 1)
+            self._watchdog = None
+
+    def _watch(self):
+        poll = max(min(self.interval, self.threshold / 2), 0.005)
+        ping: Optional[Dict[str, Any]] = None
+        next_ping = time.monotonic()
+        while not self._stopped.wait(poll):
+            now = time.monotonic()
+            with self._lock:
+                answered = ping is None or ping["answered"]
+            if answered:
+                if now < next_ping:
+                    continue
+                ping = {"sent": now, "answered": False, "event": None}
+                next_ping = now + self.interval
+                try:
+                    self._loop.call_soon_threadsafe(self._pong, ping)
+                except RuntimeError:
+                    # Loop đã đóng
+                    return
+            elif ping["event"] is None and now - ping["sent"] >= self.threshold:
+                self._record_block(ping)
+
+    def _record_block(self, ping: Dict[str, Any]):
+        """Loop chưa chạy ping sau threshold: lấy mẫu stack của callback đang chặn."""
+        event = {"detected_at": time.time(), "duration_ms": None, "stack": self._sample_stack()}
+        with self._lock:
+            if ping["answered"]:
+                return
+            ping["event"] = event
+            self.events.append(event)
+            self.slow_callbacks += 1
+        metrics.SLOW_CALLBACKS.inc()
+
+    def _pong(self, ping: Dict[str, Any]):
+        """Chạy trong event loop."""
+        lag = time.monotonic() - ping["sent"]
+        with self._lock:
+            ping["answered"] = True
+            event = ping["event"]
+            if event is not None:
+                event["duration_ms"] = round(lag * 1000, 1)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lag_total += lag
+            self._samples += 1
+        metrics.LOOP_LAG.observe(lag)
+        if event is not None:
+            logger.warning(
+                "Event loop bị chặn %.1fms (ngưỡng %.0fms) tại: %s",
+                event["duration_ms"], self.threshold * 1000, event["stack"][-1].strip() if event["stack"] else "?"
+            )
+
+    def _sample_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return [line.rstrip() for line in traceback.format_stack(frame, limit=MAX_STACK_FRAMES)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Số liệu lag và các lần loop bị chặn gần nhất."""
+        with self._lock:
+            events = [dict(event) for event in self.events]
+            return {
+                "running": self._watchdog is not None,
+                "interval_ms": self.interval * 1000,
+                "threshold_ms": self.threshold * 1000,
+                "lag_last_ms": round(self.last_lag * 1000, 2),
+                "lag_max_ms": round(self.max_lag * 1000, 2),
+                "lag_avg_ms": round(self._lag_total / self._samples * 1000, 2) if self._samples else None,
+                "slow_callbacks": self.slow_callbacks,
+                "events": events,
+            }
@@ -0,0 +1,153 @@
+"""
+Metrics Prometheus cho HTTP, agent và Ollama.
+
+Chạy nhiều uvicorn worker thì đặt `PROMETHEUS_MULTIPROC_DIR` (thư mục rỗng, ghi được)
+trước khi khởi động: mỗi worker ghi số liệu ra file mmap và `/metrics` gộp tất cả worker.
+"""
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+from fastapi import Request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+from core.schemas import OllamaResponse
+
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Latency HTTP/agent/LLM trải từ vài ms (endpoint trạng thái) đến vài phút (generate dài)
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 250)
+
+HTTP_REQUESTS = Counter(
+    "aio_http_requests_total", "HTTP request đã xử lý", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "aio_http_request_duration_seconds", "Thời gian xử lý HTTP request", ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+AGENT_REQUESTS = Counter(
+    "aio_agent_requests_total", "Request đã route đến agent", ["agent", "status"]
+)
+AGENT_LATENCY = Histogram(
+    "aio_agent_request_duration_seconds", "Thời gian agent xử lý request", ["agent"],
+    buckets=LATENCY_BUCKETS
+)
+OLLAMA_REQUESTS = Counter(
+    "aio_ollama_generate_total", "Generate request gửi đến Ollama", ["model", "backend", "status"]
+)
+OLLAMA_LATENCY = Histogram(
+    "aio_ollama_generate_duration_seconds", "Thời gian generate đo phía client", ["model"],
+    buckets=LATENCY_BUCKETS
+)
+OLLAMA_TOTAL_DURATION = Histogram(
+    "aio_ollama_total_duration_seconds", "total_duration Ollama báo về", ["model"], buckets=LATENCY_BUCKETS
+)
+OLLAMA_LOAD_DURATION = Histogram(
+    "aio_ollama_load_duration_seconds", "Thời gian nạp model Ollama báo về", ["model"], buckets=LATENCY_BUCKETS
+)
+OLLAMA_PROMPT_EVAL_DURATION = Histogram(
+    "aio_ollama_prompt_eval_duration_seconds", "Thời gian xử lý prompt Ollama báo về", ["model"],
+    buckets=LATENCY_BUCKETS
+)
+OLLAMA_EVAL_DURATION = Histogram(
+    "aio_ollama_eval_duration_seconds", "Thời gian sinh token Ollama báo về", ["model"], buckets=LATENCY_BUCKETS
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "aio_ollama_tokens_per_second", "Tốc độ sinh token (eval_count / eval_duration)", ["model"],
+    buckets=TOKENS_PER_SECOND_BUCKETS
+)
+OLLAMA_PROMPT_TOKENS = Counter(
+    "aio_ollama_prompt_tokens_total", "Token prompt đã xử lý", ["model"]
+)
+OLLAMA_GENERATED_TOKENS = Counter(
+    "aio_ollama_generated_tokens_total", "Token đã sinh", ["model"]
+)
+# livesum: cộng giá trị của các worker còn sống
+GENERATIONS_IN_FLIGHT = Gauge(
+    "aio_ollama_generations_in_flight", "Generate đang chạy", ["backend"], multiprocess_mode="livesum"
+)
+POOL_QUEUE_DEPTH = Gauge(
+    "aio_ollama_pool_queue_depth", "Request đang chờ slot trong connection pool", multiprocess_mode="livesum"
+)
+LOOP_LAG = Histogram(
+    "aio_event_loop_lag_seconds", "Độ trễ event loop (từ lúc lên lịch đến lúc callback chạy)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+SLOW_CALLBACKS = Counter(
+    "aio_event_loop_slow_callbacks_total", "Số lần event loop bị chặn quá ngưỡng"
+)
+
+
+def _seconds(nanoseconds: Optional[int]) -> Optional[float]:
+    return nanoseconds / 1e9 if nanoseconds else None
+
+
+def observe_generation(model: str, backend: str, elapsed: float, result: OllamaResponse):
+    """Ghi nhận một generate thành công, gồm các timing Ollama trả về."""
+    OLLAMA_REQUESTS.labels(model=model, backend=backend, status="success").inc()
+    OLLAMA_LATENCY.labels(model=model).observe(elapsed)
+    for histogram, value in (
+        (OLLAMA_TOTAL_DURATION, result.total_duration),
+        (OLLAMA_LOAD_DURATION, result.load_duration),
+        (OLLAMA_PROMPT_EVAL_DURATION, result.prompt_eval_duration),
+        (OLLAMA_EVAL_DURATION, result.eval_duration),
+    ):
+        seconds = _seconds(value)
+        if seconds is not None:
+            histogram.labels(model=model).observe(seconds)
+    if result.prompt_eval_count:
+        OLLAMA_PROMPT_TOKENS.labels(model=model).inc(result.prompt_eval_count)
+    if result.eval_count:
+        OLLAMA_GENERATED_TOKENS.labels(model=model).inc(result.eval_count)
+        eval_seconds = _seconds(result.eval_duration)
+        if eval_seconds:
+            OLLAMA_TOKENS_PER_SECOND.labels(model=model).observe(result.eval_count / eval_seconds)
+
+
+def observe_generation_error(model: str, backend: str):
+    """Ghi nhận một generate lỗi."""
+    OLLAMA_REQUESTS.labels(model=model, backend=backend, status="error").inc()
+
+
+def observe_agent(agent_type: str, elapsed: float, success: bool):
+    """Ghi nhận một request agent."""
+    AGENT_REQUESTS.labels(agent=agent_type, status="success" if success else "error").inc()
+    AGENT_LATENCY.labels(agent=agent_type).observe(elapsed)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Đếm request và đo latency theo route template (không theo path thật, tránh bùng nổ label)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.labels(method=request.method, route=route_path, status=str(status)).inc()
+        HTTP_LATENCY.labels(method=request.method, route=route_path).observe(time.perf_counter() - started)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Số liệu dạng text exposition, gộp mọi worker khi chạy multiprocess."""
+    if os.environ.get(MULTIPROC_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead():
+    """Bỏ gauge của worker hiện tại khỏi tổng khi worker dừng."""
+    if os.environ.get(MULTIPROC_ENV):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,78 @@
+"""
+Quy tắc đặt model lên các Ollama node.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from core.load_balancer import OllamaBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model_name(model: str) -> str:
+    """Chuẩn hóa tên model theo cách Ollama lưu (mặc định tag `latest`)."""
+    return model if ":" in model else f"{model}:latest"
+
+
+class ModelPlacement:
+    """Xác định tập node ưu tiên cho từng model.
+
+    Thứ tự ưu tiên: rule cấu hình tĩnh, sau đó node đang giữ model trong bộ nhớ
+    (`/api/ps`), cuối cùng là node đã pull model (`/api/tags`).
+    """
+
+    def __init__(self, rules: Optional[Dict[str, List[str]]] = None, max_in_flight: int = 4):
+        self.rules = {
+            normalize_model_name(model): {url.rstrip("/") for url in urls}
+            for model, urls in (rules or {}).items()
+        }
+        self.max_in_flight = max_in_flight
+
+    def is_saturated(self, backend: "OllamaBackend") -> bool:
+        """Backend đã đạt số request đồng thời tối đa."""
+        return self.max_in_flight > 0 and backend.in_flight >= self.max_in_flight
+
+    def preferred(self, backends: Sequence["OllamaBackend"], model: str) -> List["OllamaBackend"]:
+        """Các node nên phục vụ model."""
+        model = normalize_model_name(model)
+        rule = self.rules.get(model)
+        if rule:
+            return [b for b in backends if b.url in rule]
+
+        resident = [b for b in backends if model in b.loaded_models]
+        if resident:
+            return resident
+        return [b for b in backends if model in b.available_models]
+
+    def candidates(self, backends: Sequence["OllamaBackend"], model: str) -> List["OllamaBackend"]:
+        """Node được phép nhận request cho model, có spill-over khi node ưu tiên bão hòa."""
+        preferred = self.preferred(backends, model)
+        if not preferred:
+            return list(backends)
+
+        unsaturated = [b for b in preferred if not self.is_saturated(b)]
+        if unsaturated:
+            return unsaturated
+
+        normalized = normalize_model_name(model)
+        spill = [
+            b for b in backends
+            if b not in preferred and not self.is_saturated(b) and self._can_serve(b, normalized)
+        ]
+        if spill:
+            logger.info(f"Node ưu tiên cho model {model} đã bão hòa, spill-over sang {[b.url for b in spill]}")
+            return spill
+        # Mọi node đều bận: xếp hàng trên node ưu tiên để tránh swap model
+        return preferred
+
+    @staticmethod
+    def _can_serve(backend: "OllamaBackend", model: str) -> bool:
+        # Chưa discover được tags thì không loại trừ node
+        return not backend.available_models or model in backend.available_models
+
+
+def model_names(entries: Iterable[Dict]) -> set:
+    """Lấy tên model từ response `/api/tags` hoặc `/api/ps`."""
+    return {normalize_model_name(entry.get("name") or entry.get("model", "")) for entry in entries}
@@ -0,0 +1,246 @@
+"""
+Quản lý residency của model trên Ollama: warm-up, keep_alive và readiness.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+
+import aiohttp
+
+from core.model_placement import normalize_model_name
+
+if TYPE_CHECKING:
+    from core.ollama_client import OllamaClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelResidencyManager:
+    """Preload model lúc startup và điều chỉnh keep_alive theo traffic gần đây.
+
+    Model "hot" (đủ số request trong cửa sổ thời gian) và model critical được
+    giữ trong bộ nhớ với keep_alive dài; model idle được hạ về keep_alive mặc
+    định để Ollama tự giải phóng.
+
+    Preload gửi kèm num_ctx mà request thật của model dùng (bucket của TokenBudget),
+    vì Ollama nạp lại runner khi num_ctx khác với lúc model được nạp.
+
+    Model warm-up lỗi (ví dụ Ollama khởi động sau app) được vòng bảo trì thử lại
+    với exponential backoff cho đến khi warm, nên readiness tự bật khi Ollama hồi phục.
+    """
+
+    def __init__(
+        self,
+        ollama_client: "OllamaClient",
+        warmup_models: Iterable[str] = (),
+        critical_models: Iterable[str] = (),
+        keep_alive_hot: str = "30m",
+        keep_alive_default: str = "5m",
+        hot_window: float = 600.0,
+        hot_min_requests: int = 3,
+        check_interval: float = 60.0,
+        default_num_ctx: Optional[int] = None,
+        warmup_retry_base: float = 5.0,
+        warmup_retry_max: float = 300.0
+    ):
+        self.ollama_client = ollama_client
+        self.critical_models: Set[str] = {normalize_model_name(m) for m in critical_models}
+        # Model critical luôn được warm-up, kể cả khi không nằm trong danh sách warm-up
+        self.warmup_models: List[str] = sorted(
+            {normalize_model_name(m) for m in warmup_models} | self.critical_models
+        )
+        self.keep_alive_hot = keep_alive_hot
+        self.keep_alive_default = keep_alive_default
+        self.hot_window = hot_window
+        self.hot_min_requests = hot_min_requests
+        self.check_interval = check_interval
+        self.default_num_ctx = default_num_ctx
+        self._num_ctx: Dict[str, int] = {}
+        self.warm_models: Set[str] = set()
+        self.failed_models: Dict[str, str] = {}
+        self.warmup_retry_base = warmup_retry_base
+        self.warmup_retry_max = warmup_retry_max
+        self._retry_attempts: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._usage: Dict[str, Deque[float]] = {}
+        self._pinned: Set[str] = set()
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._maintain_task: Optional[asyncio.Task] = None
+
+    def add_warmup_models(self, models: Iterable[str]):
+        """Bổ sung model vào danh sách warm-up (gọi trước start)."""
+        self.warmup_models = sorted(set(self.warmup_models) | {normalize_model_name(m) for m in models})
+
+    def set_num_ctx(self, num_ctx: Dict[str, int]):
+        """num_ctx dự kiến của từng model (suy ra từ profile agent), dùng khi preload."""
+        self._num_ctx.update({normalize_model_name(m): n for m, n in num_ctx.items()})
+
+    def preload_options(self, model: str) -> Optional[Dict[str, Any]]:
+        """Options gửi kèm preload: num_ctx gần nhất của model hoặc bucket mặc định."""
+        num_ctx = self._num_ctx.get(normalize_model_name(model), self.default_num_ctx)
+        return {"num_ctx": num_ctx} if num_ctx else None
+
+    @property
+    def is_ready(self) -> bool:
+        """Tất cả model critical đã warm."""
+        return self.critical_models <= self.warm_models
+
+    def start(self):
+        """Chạy warm-up và vòng bảo trì (retry warm-up, hạ keep_alive) ở nền."""
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self.warm_up())
+        if self._maintain_task is None:
+            self._maintain_task = asyncio.create_task(self._maintain_loop())
+
+    async def stop(self):
+        """Dừng các task nền."""
+        for task in (self._warmup_task, self._maintain_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._warmup_task = None
+        self._maintain_task = None
+
+    async def warm_up(self):
+        """Preload toàn bộ model cấu hình bằng generate với prompt rỗng."""
+        if not self.warmup_models:
+            return
+        logger.info(f"Warm-up models: {self.warmup_models}")
+        await asyncio.gather(*(self._warm_model(model) for model in self.warmup_models))
+        if self.is_ready:
+            logger.info("Tất cả model critical đã warm, sẵn sàng phục vụ")
+        else:
+            logger.warning(f"Model critical chưa warm: {sorted(self.critical_models - self.warm_models)}")
+
+    async def _warm_model(self, model: str):
+        keep_alive = self.keep_alive_for(model)
+        try:
+            await self.ollama_client.preload(model, keep_alive, options=self.preload_options(model))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            attempts = self._retry_attempts.get(model, 0)
+            delay = min(self.warmup_retry_max, self.warmup_retry_base * (2 ** attempts))
+            self._retry_attempts[model] = attempts + 1
+            self._retry_at[model] = time.monotonic() + delay
+            self.failed_models[model] = str(e)
+            logger.error(f"Warm-up model {model} thất bại, thử lại sau {delay:.0f}s: {e}")
+            return
+        self.warm_models.add(model)
+        self.failed_models.pop(model, None)
+        self._retry_attempts.pop(model, None)
+        self._retry_at.pop(model, None)
+        if keep_alive == self.keep_alive_hot:
+            self._pinned.add(model)
+        logger.info(f"Model {model} đã warm (keep_alive={keep_alive})")
+
+    def record_use(self, model: str, num_ctx: Optional[int] = None):
+        """Ghi nhận một request dùng model (kèm num_ctx của request để preload sau khớp runner).
+
+        Model trở thành hot được đánh dấu pinned: request này và các request sau gửi
+        keep_alive dài, cho đến khi vòng bảo trì hạ keep_alive.
+        """
+        model = normalize_model_name(model)
+        if num_ctx:
+            self._num_ctx[model] = num_ctx
+        usage = self._usage.setdefault(model, deque())
+        now = time.monotonic()
+        usage.append(now)
+        self._trim(usage, now)
+        if self.is_hot(model):
+            self._pinned.add(model)
+
+    def _trim(self, usage: Deque[float], now: float):
+        while usage and now - usage[0] > self.hot_window:
+            usage.popleft()
+
+    def is_hot(self, model: str) -> bool:
+        """Model có đủ traffic gần đây để giữ trong bộ nhớ."""
+        model = normalize_model_name(model)
+        if model in self.critical_models:
+            return True
+        usage = self._usage.get(model)
+        if not usage:
+            return False
+        self._trim(usage, time.monotonic())
+        return len(usage) >= self.hot_min_requests
+
+    def keep_alive_for(self, model: str) -> str:
+        """keep_alive áp dụng cho request tiếp theo của model."""
+        return self.keep_alive_hot if self.is_hot(model) else self.keep_alive_default
+
+    async def retry_failed_models(self):
+        """Warm-up lại các model lỗi đã đến hạn retry."""
+        now = time.monotonic()
+        due = [model for model in sorted(self.failed_models) if self._retry_at.get(model, 0) <= now]
+        if not due:
+            return
+        was_ready = self.is_ready
+        await asyncio.gather(*(self._warm_model(model) for model in due))
+        if self.is_ready and not was_ready:
+            logger.info("Model critical đã warm sau khi retry, sẵn sàng phục vụ")
+
+    def _next_wakeup(self, next_release: float) -> float:
+        """Số giây đến việc bảo trì kế tiếp (retry đến hạn hoặc lượt hạ keep_alive)."""
+        now = time.monotonic()
+        deadlines = [self._retry_at[model] for model in self.failed_models if model in self._retry_at]
+        if self.check_interval > 0:
+            deadlines.append(next_release)
+        # Warm-up lần đầu có thể chưa xong, kiểm tra lại ít nhất mỗi warmup_retry_base giây
+        return max(0.0, min([now + self.warmup_retry_base] + deadlines) - now)
+
+    async def _maintain_loop(self):
+        next_release = time.monotonic() + self.check_interval
+        while True:
+            await asyncio.sleep(self._next_wakeup(next_release))
+            if self.failed_models:
+                await self.retry_failed_models()
+            if self.check_interval > 0 and time.monotonic() >= next_release:
+                await self.release_idle_models()
+                next_release = time.monotonic() + self.check_interval
+
+    async def release_idle_models(self):
+        """Hạ keep_alive của model đã hết hot để Ollama giải phóng khi idle.
+
+        Chỉ gửi cho model còn nạp theo /api/ps: preload model đã bị Ollama gỡ sẽ nạp lại nó.
+        """
+        idle = [model for model in sorted(self._pinned) if not self.is_hot(model)]
+        if not idle:
+            return
+        await self.ollama_client.refresh_residency()
+        loaded = {model for models in self.loaded_models().values() for model in models}
+        for model in idle:
+            if model not in loaded:
+                self._pinned.discard(model)
+                logger.debug("Model %s đã được Ollama gỡ, bỏ qua hạ keep_alive", model)
+                continue
+            try:
+                await self.ollama_client.preload(model, self.keep_alive_default, options=self.preload_options(model))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Không hạ được keep_alive của model {model}: {e}")
+                continue
+            self._pinned.discard(model)
+            logger.info(f"Model {model} không còn hot, keep_alive={self.keep_alive_default}")
+
+    def loaded_models(self) -> Dict[str, List[str]]:
+        """Model đang nạp trên từng backend (theo lần discover gần nhất)."""
+        return {
+            backend["url"]: backend["loaded_models"]
+            for backend in self.ollama_client.backend_status()
+        }
+
+    def status(self) -> Dict[str, Any]:
+        """Trạng thái residency."""
+        return {
+            "ready": self.is_ready,
+            "critical_models": sorted(self.critical_models),
+            "warm_models": sorted(self.warm_models),
+            "failed_models": dict(self.failed_models),
+            "hot_models": sorted(m for m in self._usage if self.is_hot(m)),
+            "pinned_models": sorted(self._pinned),
+            "loaded_models": self.loaded_models(),
+        }
@@ -3,80 +3,408 @@ Client để tích hợp với Ollama API.
 """
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union, TYPE_CHECKING
 
 import aiohttp
 from aiohttp import ClientTimeout
 
 from config import settings
+from core import json_codec
+from core import metrics
+from core.load_balancer import LoadBalancer, OllamaBackend
+from core.model_placement import ModelPlacement, model_names, normalize_model_name
+from core.pool_metrics import PoolMetrics
+from core.recording import OllamaRecorder, OllamaReplay
+from core.resilience import LatencyTracker, RetryPolicy, caller_retries_active, is_retryable
 from core.schemas import OllamaRequest, OllamaResponse
+from core.tracing import SPAN_GENERATE, annotate_generation, get_tracer
+from core.usage import record_generation
+
+if TYPE_CHECKING:
+    from core.model_residency import ModelResidencyManager
 
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer(__name__)
+
+PROBE_TIMEOUT = 5
+
+T = TypeVar("T")
+
+
+def _tuned_socket(addr_info) -> socket.socket:
+    """Tạo socket với TCP_NODELAY và SO_KEEPALIVE bật tường minh."""
+    family, sock_type, proto = addr_info[0], addr_info[1], addr_info[2]
+    sock = socket.socket(family=family, type=sock_type, proto=proto)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return sock
 
 
 class OllamaClient:
     """Client để giao tiếp với Ollama API."""
-    
-    def __init__(self):
-        self.base_url = settings.OLLAMA_BASE_URL
+
+    def __init__(self, base_urls: Optional[List[str]] = None):
+        self.balancer = LoadBalancer(
+            base_urls or settings.ollama_backend_urls(),
+            strategy=settings.OLLAMA_LB_STRATEGY,
+            unhealthy_threshold=settings.OLLAMA_UNHEALTHY_THRESHOLD,
+            ewma_alpha=settings.OLLAMA_LB_EWMA_ALPHA,
+            placement=ModelPlacement(
+                settings.OLLAMA_MODEL_PLACEMENT,
+                max_in_flight=settings.OLLAMA_BACKEND_MAX_IN_FLIGHT
+            ),
+            circuit_failure_threshold=settings.OLLAMA_CIRCUIT_FAILURE_THRESHOLD,
+            circuit_reset_timeout=settings.OLLAMA_CIRCUIT_RESET_TIMEOUT
+        )
+        self.retry = RetryPolicy(
+            attempts=settings.OLLAMA_RETRY_ATTEMPTS,
+            backoff_base=settings.OLLAMA_RETRY_BACKOFF_BASE,
+            backoff_max=settings.OLLAMA_RETRY_BACKOFF_MAX
+        )
+        self.latency = LatencyTracker()
+        self.base_url = self.balancer.backends[0].url
         self.timeout = ClientTimeout(total=settings.OLLAMA_TIMEOUT, connect=30)
         self._session: Optional[aiohttp.ClientSession] = None
-    
+        self._session_lock = asyncio.Lock()
+        self.pool_metrics = PoolMetrics()
+        self.residency: Optional["ModelResidencyManager"] = None
+        self.recorder: Optional[OllamaRecorder] = OllamaRecorder.from_settings()
+        self.replay: Optional[OllamaReplay] = OllamaReplay.from_settings()
+
+    def _pool_limit(self) -> int:
+        return settings.OLLAMA_POOL_SIZE_TOTAL or settings.OLLAMA_POOL_SIZE_PER_HOST * len(self.balancer.backends)
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        # Một connector dùng chung, giới hạn pool riêng cho từng backend
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_limit(),
+            limit_per_host=settings.OLLAMA_POOL_SIZE_PER_HOST,
+            keepalive_timeout=settings.OLLAMA_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=settings.OLLAMA_DNS_CACHE_TTL,
+            enable_cleanup_closed=True,
+            socket_factory=_tuned_socket
+        )
+        logger.info(
+            f"Tạo Ollama session: pool={connector.limit}, per_host={connector.limit_per_host}, "
+            f"keepalive={settings.OLLAMA_KEEPALIVE_TIMEOUT}s, dns_ttl={settings.OLLAMA_DNS_CACHE_TTL}s"
+        )
+        return aiohttp.ClientSession(
+            timeout=self.timeout,
+            connector=connector,
+            trace_configs=[self.pool_metrics.trace_config()]
+        )
+
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Lấy hoặc tạo session."""
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self.timeout)
-        return self._session
-    
-    async def generate(self, request: OllamaRequest) -> OllamaResponse:
-        """Gửi request generate đến Ollama."""
-        logger.debug(f"Generating with model: {request.model}, prompt length: {len(request.prompt)}")
+        """Lấy session dùng chung, chỉ tạo một lần kể cả khi nhiều coroutine gọi đồng thời."""
+        session = self._session
+        if session is not None and not session.closed:
+            return session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                self._session = self._create_session()
+            return self._session
+
+    async def start(self):
+        """Khởi tạo session trước khi nhận request."""
+        await self._get_session()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Mức sử dụng connection pool so với giới hạn cấu hình."""
+        per_host_limit = settings.OLLAMA_POOL_SIZE_PER_HOST
+        backends = {
+            backend.url: {
+                "in_flight": backend.in_flight,
+                "limit": per_host_limit,
+                "utilisation": round(backend.in_flight / per_host_limit, 4) if per_host_limit else None,
+            }
+            for backend in self.balancer.backends
+        }
+        in_flight = sum(backend.in_flight for backend in self.balancer.backends)
+        limit = self._pool_limit()
+        return dict(
+            self.pool_metrics.to_dict(),
+            in_flight=in_flight,
+            limit=limit,
+            utilisation=round(in_flight / limit, 4) if limit else None,
+            backends=backends
+        )
+
+    async def _probe_backend(self, backend: OllamaBackend) -> bool:
+        """Probe một backend qua /api/version."""
         session = await self._get_session()
-        url = f"{self.base_url}/api/generate"
-        
+        url = f"{backend.url}/api/version"
+        started = time.monotonic()
+
         try:
-            async with session.post(url, json=request.dict(), timeout=self.timeout) as response:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT)) as response:
                 response.raise_for_status()
-                data = await response.json()
-                logger.debug(f"Ollama response received, length: {len(data.get('response', ''))}")
-                return OllamaResponse(**data)
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            logger.error(f"Lỗi khi gọi Ollama API: {e}")
-            raise
-    
-    async def list_models(self) -> Dict[str, Any]:
-        """Lấy danh sách models từ Ollama."""
-        logger.debug("Fetching models list from Ollama")
+        except Exception as e:
+            logger.warning(f"Ollama backend {backend.url} không khả dụng: {e}")
+            self.balancer.mark_probe_result(backend, False)
+            return False
+
+        self.balancer.mark_probe_result(backend, True, time.monotonic() - started)
+        return True
+
+    async def probe_backends(self) -> List[bool]:
+        """Probe đồng thời tất cả backend."""
+        if self.replay is not None:
+            return [True] * len(self.balancer.backends)
+        return await asyncio.gather(*(self._probe_backend(b) for b in self.balancer.backends))
+
+    async def generate(self, request: OllamaRequest) -> OllamaResponse:
+        """Gửi request generate đến Ollama (retry, hedging, circuit breaker)."""
+        if self.residency:
+            self.residency.record_use(request.model, (request.options or {}).get("num_ctx"))
+            if request.keep_alive is None:
+                request.keep_alive = self.residency.keep_alive_for(request.model)
+        logger.debug("Generating with model: %s, prompt length: %d", request.model, len(request.prompt))
+        payload = json_codec.dumps(request.model_dump(exclude_none=True))
+
+        async def send(backend: OllamaBackend) -> OllamaResponse:
+            return await self._generate_on(backend, request, payload)
+
+        if self.replay is not None:
+            result = await self.replay.generate(request)
+        else:
+            result = await self._dispatch(request.model, send, hedge=settings.OLLAMA_HEDGE_ENABLED)
+        record_generation(result)
+        return result
+
+    async def _generate_on(self, backend: OllamaBackend, request: OllamaRequest, payload: bytes) -> OllamaResponse:
+        """Gửi generate đến một backend cụ thể."""
+        model = request.model
         session = await self._get_session()
-        url = f"{self.base_url}/api/tags"
-        
+        url = f"{backend.url}/api/generate"
+        started = time.monotonic()
+
+        in_flight = metrics.GENERATIONS_IN_FLIGHT.labels(backend=backend.url)
+        in_flight.inc()
+        with tracer.start_as_current_span(
+            SPAN_GENERATE, attributes={"ollama.model": model, "ollama.backend": backend.url}
+        ) as span:
+            try:
+                async with self.balancer.track(backend):
+                    async with session.post(
+                        url, data=payload, headers=json_codec.JSON_HEADERS, timeout=self.timeout
+                    ) as response:
+                        response.raise_for_status()
+                        if self.recorder:
+                            ttfb = time.monotonic() - started
+                            body, chunks = await self._read_chunks(response, started)
+                        else:
+                            body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Lỗi khi gọi Ollama API ({backend.url}): {e}")
+                metrics.observe_generation_error(model, backend.url)
+                raise
+            finally:
+                in_flight.dec()
+
+            elapsed = time.monotonic() - started
+            self.latency.record(model, elapsed)
+            self.balancer.mark_model_loaded(backend, model)
+            # orjson + model_validate nhanh hơn model_validate_json với mảng `context` dài
+            result = OllamaResponse.model_validate(json_codec.loads(body))
+            annotate_generation(span, result)
+        metrics.observe_generation(model, backend.url, elapsed, result)
+        if self.recorder:
+            await self.recorder.record(request, body, elapsed, ttfb, chunks)
+        logger.debug("Ollama response received from %s, length: %d", backend.url, len(result.response))
+        return result
+
+    @staticmethod
+    async def _read_chunks(response: aiohttp.ClientResponse, started: float) -> Tuple[bytes, List[Tuple[float, int]]]:
+        """Đọc body theo chunk, ghi lại thời điểm (tính từ lúc gửi) và kích thước từng chunk."""
+        parts: List[bytes] = []
+        chunks: List[Tuple[float, int]] = []
+        async for chunk in response.content.iter_any():
+            chunks.append((time.monotonic() - started, len(chunk)))
+            parts.append(chunk)
+        return b"".join(parts), chunks
+
+    async def _dispatch(
+        self,
+        model: Optional[str],
+        send: Callable[[OllamaBackend], Awaitable[T]],
+        hedge: bool = False
+    ) -> T:
+        """Chạy call idempotent với retry có jitter, ưu tiên backend chưa thử ở mỗi lần retry.
+
+        Trong scope `caller_retries()` (caller đã tự retry) chỉ gửi một lần, hedging vẫn áp dụng.
+        """
+        tried: List[OllamaBackend] = []
+        attempts = 0 if caller_retries_active() else self.retry.attempts
+        for attempt in range(attempts + 1):
+            try:
+                if hedge:
+                    return await self._hedged(model, send, tried)
+                backend = self.balancer.select(model, exclude=tried)
+                tried.append(backend)
+                return await send(backend)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= attempts or not is_retryable(e):
+                    raise
+                delay = self.retry.backoff(attempt)
+                logger.warning(f"Retry {attempt + 1}/{attempts} sau {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _hedged(
+        self,
+        model: Optional[str],
+        send: Callable[[OllamaBackend], Awaitable[T]],
+        tried: List[OllamaBackend]
+    ) -> T:
+        """Gửi bản sao sang backend thứ hai khi request chậm hơn percentile latency, hủy bên thua."""
+        primary_backend = self.balancer.select(model, exclude=tried)
+        tried.append(primary_backend)
+        primary = asyncio.ensure_future(send(primary_backend))
+
+        delay = None
+        if model and len(self.balancer.backends) > 1:
+            delay = self.latency.percentile(
+                model, settings.OLLAMA_HEDGE_PERCENTILE, settings.OLLAMA_HEDGE_MIN_SAMPLES
+            )
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge_backend = self.balancer.select(model, exclude=tried)
+        if hedge_backend is primary_backend:
+            return await primary
+        tried.append(hedge_backend)
+        logger.info("Hedging request model %s sang %s sau %.2fs", model, hedge_backend.url, delay)
+        pending = {primary, asyncio.ensure_future(send(hedge_backend))}
+
+        try:
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def preload(
+        self,
+        model: str,
+        keep_alive: Union[str, int],
+        options: Optional[Dict[str, Any]] = None
+    ):
+        """Nạp model vào bộ nhớ (generate với prompt rỗng) hoặc đổi keep_alive của model.
+
+        Model có rule placement được nạp trên mọi node ưu tiên, còn lại nạp trên một node.
+        `options` nên chứa num_ctx của request thật, nếu không Ollama sẽ nạp lại model ở request đầu.
+        """
+        if self.replay is not None:
+            return
+        healthy = self.balancer.healthy_backends() or self.balancer.backends
+        backends = []
+        if normalize_model_name(model) in self.balancer.placement.rules:
+            backends = self.balancer.placement.preferred(healthy, model)
+        backends = backends or [self.balancer.select(model)]
+        session = await self._get_session()
+        body: Dict[str, Any] = {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+        if options:
+            body["options"] = options
+        payload = json_codec.dumps(body)
+
+        for backend in backends:
+            async with self.balancer.track(backend):
+                async with session.post(
+                    f"{backend.url}/api/generate", data=payload, headers=json_codec.JSON_HEADERS, timeout=self.timeout
+                ) as response:
+                    response.raise_for_status()
+                    await response.read()
+            self.balancer.mark_model_loaded(backend, model)
+            logger.debug("Preloaded model %s on %s (keep_alive=%s)", model, backend.url, keep_alive)
+
+    async def list_models(self, backend: Optional[OllamaBackend] = None) -> Dict[str, Any]:
+        """Lấy danh sách models từ Ollama (retry khi không chỉ định backend)."""
+        if self.replay is not None:
+            return self._replay_models()
+        if backend is None:
+            return await self._dispatch(None, self.list_models)
+        logger.debug("Fetching models list from Ollama backend %s", backend.url)
+        session = await self._get_session()
+        url = f"{backend.url}/api/tags"
+
         try:
             async with session.get(url) as response:
                 response.raise_for_status()
-                data = await response.json()
-                logger.debug(f"Found {len(data.get('models', []))} models")
+                data = await response.json(loads=json_codec.loads)
+                logger.debug("Found %d models", len(data.get('models', [])))
                 return data
         except aiohttp.ClientError as e:
             logger.error(f"Lỗi khi lấy danh sách models: {e}")
             raise
-    
-    async def health_check(self) -> bool:
-        """Kiểm tra kết nối đến Ollama."""
-        logger.debug("Checking Ollama health")
+
+    async def list_running_models(self, backend: Optional[OllamaBackend] = None) -> Dict[str, Any]:
+        """Lấy danh sách models đang nạp trong bộ nhớ (/api/ps)."""
+        if self.replay is not None:
+            return self._replay_models()
+        backend = backend or self.balancer.select()
         session = await self._get_session()
-        url = f"{self.base_url}/api/version"
-        
+        url = f"{backend.url}/api/ps"
+
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT)) as response:
                 response.raise_for_status()
-                logger.debug("Ollama health check passed")
-                return True
-        except Exception as e:
-            logger.warning(f"Ollama không khả dụng: {e}")
-            return False
-    
+                return await response.json(loads=json_codec.loads)
+        except aiohttp.ClientError as e:
+            logger.error(f"Lỗi khi lấy danh sách models đang chạy: {e}")
+            raise
+
+    def _replay_models(self) -> Dict[str, Any]:
+        """Khi replay, mọi model có trong bản ghi được coi là có sẵn và đã nạp."""
+        return {"models": [{"name": name, "model": name} for name in self.replay.models()]}
+
+    async def _refresh_backend_residency(self, backend: OllamaBackend):
+        try:
+            running, tags = await asyncio.gather(
+                self.list_running_models(backend),
+                self.list_models(backend)
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Không cập nhật được residency của {backend.url}: {e}")
+            return
+        self.balancer.update_residency(
+            backend,
+            loaded=model_names(running.get("models", [])),
+            available=model_names(tags.get("models", []))
+        )
+
+    async def refresh_residency(self):
+        """Discover model residency trên các backend khỏe qua /api/ps và /api/tags."""
+        await asyncio.gather(
+            *(self._refresh_backend_residency(b) for b in self.balancer.healthy_backends())
+        )
+
+    async def health_check(self) -> bool:
+        """Kiểm tra kết nối đến Ollama (ít nhất một backend khỏe)."""
+        logger.debug("Checking Ollama health")
+        results = await self.probe_backends()
+        if any(results):
+            logger.debug("Ollama health check passed")
+            return True
+        return False
+
+    def backend_status(self) -> List[Dict[str, Any]]:
+        """Trạng thái của các Ollama backend."""
+        return self.balancer.snapshot()
+
     async def close(self):
         """Đóng session."""
         if self._session and not self._session.closed:
-            await self._session.close()
\ No newline at end of file
+            await self._session.close()
@@ -0,0 +1,125 @@
+"""
+Parse và validate kế hoạch task do planner trả về.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Sequence
+
+from core.utils import strip_think_blocks
+
+logger = logging.getLogger(__name__)
+
+MAX_PRIORITY = 5
+DEFAULT_PRIORITY = 3
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+class PlanParseError(ValueError):
+    """Output của planner không parse hoặc không validate được."""
+
+    def __init__(self, message: str, errors: Sequence[str] = (), raw: str = ""):
+        super().__init__(message)
+        self.errors = list(errors)
+        self.raw = raw
+
+    def __str__(self) -> str:
+        details = "; ".join(self.errors)
+        return f"{self.args[0]}: {details}" if details else self.args[0]
+
+
+def plan_json_schema(agent_types: Sequence[str]) -> Dict[str, Any]:
+    """JSON schema truyền vào tham số `format` của Ollama để ràng buộc output."""
+    return {
+        "type": "object",
+        "properties": {
+            "tasks": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "task_description": {"type": "string"},
+                        "agent_type": {"type": "string", "enum": list(agent_types)},
+                        "priority": {"type": "integer", "minimum": 1, "maximum": MAX_PRIORITY},
+                        "dependencies": {"type": "array", "items": {"type": "integer", "minimum": 0}},
+                    },
+                    "required": ["task_description", "agent_type", "priority", "dependencies"],
+                },
+            }
+        },
+        "required": ["tasks"],
+    }
+
+
+def _decode(text: str) -> Any:
+    """Decode JSON; output có ràng buộc format parse được ngay, còn lại thử tách từ text."""
+    cleaned = strip_think_blocks(text)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    # Model bỏ qua `format`: lấy nội dung trong code fence hoặc đoạn [...] / {...} ngoài cùng
+    fenced = _FENCE.search(cleaned)
+    if fenced:
+        cleaned = fenced.group(1).strip()
+    for open_char, close_char in (("[", "]"), ("{", "}")):
+        start, end = cleaned.find(open_char), cleaned.rfind(close_char)
+        if 0 <= start < end:
+            try:
+                return json.loads(cleaned[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+    raise PlanParseError("Output của planner không phải JSON hợp lệ", raw=text[:200])
+
+
+def parse_plan(text: str, agent_types: Sequence[str]) -> List[Dict[str, Any]]:
+    """Parse output của planner thành danh sách task đã validate.
+
+    Args:
+        text (str): Output thô của model.
+        agent_types (Sequence[str]): Các agent hợp lệ.
+
+    Returns:
+        List[Dict[str, Any]]: Task với đủ task_description, agent_type, priority, dependencies.
+
+    Raises:
+        PlanParseError: Nếu output không parse được hoặc có task không hợp lệ.
+    """
+    data = _decode(text)
+    tasks = data.get("tasks") if isinstance(data, dict) else data
+    if not isinstance(tasks, list) or not tasks:
+        raise PlanParseError("Plan phải có danh sách task không rỗng", raw=text[:200])
+
+    errors = []
+    validated = []
+    for index, task in enumerate(tasks):
+        if not isinstance(task, dict):
+            errors.append(f"task {index} không phải object")
+            continue
+        description = task.get("task_description")
+        if not isinstance(description, str) or not description.strip():
+            errors.append(f"task {index} thiếu task_description")
+        agent_type = task.get("agent_type")
+        if agent_type not in agent_types:
+            errors.append(f"task {index} có agent_type không hợp lệ: {agent_type!r}")
+
+        priority = task.get("priority", DEFAULT_PRIORITY)
+        if not isinstance(priority, int) or not 1 <= priority <= MAX_PRIORITY:
+            priority = DEFAULT_PRIORITY
+        dependencies = task.get("dependencies") or []
+        if not isinstance(dependencies, list):
+            dependencies = []
+
+        validated.append({
+            "task_description": description,
+            "agent_type": agent_type,
+            "priority": priority,
+            "dependencies": dependencies,
+        })
+
+    if errors:
+        raise PlanParseError("Plan không hợp lệ", errors=errors, raw=text[:200])
+    return validated
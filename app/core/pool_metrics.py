@@ -0,0 +1,69 @@
+"""
+Đo mức sử dụng connection pool của aiohttp qua TraceConfig.
+"""
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import aiohttp
+
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Đếm connection tạo mới/tái sử dụng và thời gian chờ slot trong pool."""
+
+    def __init__(self):
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued_total = 0
+        self.queued_now = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig gắn vào ClientSession để thu thập số liệu."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_reuse)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        return trace_config
+
+    async def _on_create_end(self, session, trace_ctx: SimpleNamespace, params):
+        self.connections_created += 1
+
+    async def _on_reuse(self, session, trace_ctx: SimpleNamespace, params):
+        self.connections_reused += 1
+
+    async def _on_queued_start(self, session, trace_ctx: SimpleNamespace, params):
+        trace_ctx.queued_at = time.monotonic()
+        self.queued_total += 1
+        self.queued_now += 1
+        metrics.POOL_QUEUE_DEPTH.inc()
+
+    async def _on_queued_end(self, session, trace_ctx: SimpleNamespace, params):
+        self.queued_now -= 1
+        metrics.POOL_QUEUE_DEPTH.dec()
+        waited = time.monotonic() - getattr(trace_ctx, "queued_at", time.monotonic())
+        self.queue_wait_total += waited
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+        if waited > 1.0:
+            logger.warning(f"Request chờ connection pool {waited:.2f}s, cân nhắc tăng OLLAMA_POOL_SIZE_PER_HOST")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot số liệu."""
+        acquired = self.connections_created + self.connections_reused
+        return {
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / acquired, 4) if acquired else None,
+            "queued_total": self.queued_total,
+            "queued_now": self.queued_now,
+            "queue_wait_avg_ms": round(self.queue_wait_total / self.queued_total * 1000, 2) if self.queued_total else None,
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+        }
@@ -0,0 +1,193 @@
+"""
+Profiling theo yêu cầu cho worker đang chạy: CPU (lấy mẫu stack) và bộ nhớ (tracemalloc).
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+# Frame trên cùng (file, hàm) của thread đang chờ chứ không dùng CPU: event loop trong
+# select, thread chờ Condition/lock/queue (QueueListener, thread pool của to_thread)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusyError(RuntimeError):
+    """Đang có một phiên profiling khác chạy."""
+
+
+def _is_idle(frame) -> bool:
+    """Thread đang chặn trong một lời gọi chờ (không tốn CPU)."""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def _collapse(frame, thread_name: str) -> str:
+    """Stack dạng collapsed (flamegraph.pl, speedscope): `thread;outer;...;inner`."""
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class CpuProfiler:
+    """Profiler thống kê: lấy mẫu stack của các thread trong worker theo chu kỳ.
+
+    Thread đang chờ (IDLE_FRAMES) và thread lấy mẫu bị bỏ qua, nên output là CPU
+    profile chứ không phải wall-clock bị lấp đầy bởi các lần chờ I/O.
+    Không cần khởi động lại process hay cài hook; overhead chỉ tồn tại trong lúc lấy mẫu.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, duration: float, interval: float = 0.005) -> Dict[str, Any]:
+        """Lấy mẫu trong `duration` giây (chạy trong thread riêng)."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("CPU profiler is already running")
+        try:
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = idle = 0
+            started = time.monotonic()
+            deadline = started + duration
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if _is_idle(frame):
+                        idle += 1
+                        continue
+                    stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+                samples += 1
+                time.sleep(interval)
+            return {"samples": samples, "idle": idle, "duration": time.monotonic() - started, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+    async def profile(self, duration: float, interval: float = 0.005) -> str:
+        """Profile worker trong `duration` giây, trả về stack collapsed (mỗi dòng `stack count`)."""
+        if self.running:
+            raise ProfilerBusyError("CPU profiler is already running")
+        logger.info("Bắt đầu CPU profiling %.1fs (interval %.1fms)", duration, interval * 1000)
+        result = await asyncio.to_thread(self.sample, duration, interval)
+        lines = [f"{stack} {count}" for stack, count in result["stacks"].most_common()]
+        logger.info(
+            "CPU profiling xong: %d mẫu, %d stack, bỏ qua %d stack đang chờ",
+            result["samples"], len(lines), result["idle"]
+        )
+        return "\n".join(lines) + "\n"
+
+
+class MemoryProfiler:
+    """Đo tăng trưởng bộ nhớ của worker bằng tracemalloc trong một lần gọi.
+
+    Bật tracemalloc, chụp snapshot đầu, chờ `duration` giây, chụp snapshot cuối rồi tắt.
+    Cả phiên nằm trong một request nên luôn chạy trọn trong một worker (tracemalloc
+    và snapshot chỉ tồn tại trong process đã tạo ra chúng).
+    """
+
+    def __init__(self):
+        self._running = False
+        self._started_here = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, duration: float, frames: int = 25) -> Tuple[tracemalloc.Snapshot, tracemalloc.Snapshot]:
+        """Snapshot đầu và cuối của khoảng `duration` giây."""
+        if self._running:
+            raise ProfilerBusyError("Memory profiler is already running")
+        self._running = True
+        try:
+            self._start(frames)
+            logger.info("Bắt đầu memory profiling %.1fs (%d frames)", duration, frames)
+            base = await asyncio.to_thread(self._snapshot)
+            await asyncio.sleep(duration)
+            target = await asyncio.to_thread(self._snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+            logger.info("Memory profiling xong: traced %.1f KiB, peak %.1f KiB", current / 1024, peak / 1024)
+            return base, target
+        finally:
+            self.stop()
+            self._running = False
+
+    def _start(self, frames: int):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_here = True
+
+    def stop(self):
+        """Tắt tracemalloc nếu profiler đã bật nó (tracemalloc bật từ trước được giữ nguyên)."""
+        if self._started_here and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_here = False
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    @staticmethod
+    def diff(
+        base: tracemalloc.Snapshot,
+        target: tracemalloc.Snapshot,
+        key_type: str = "lineno",
+        limit: int = 50
+    ) -> str:
+        """Chênh lệch cấp phát từ `base` đến `target` (text), tăng nhiều nhất trước."""
+        stats = target.compare_to(base, key_type)
+        growth = sum(stat.size_diff for stat in stats)
+        total = sum(stat.size for stat in stats)
+        lines = [f"# pid {os.getpid()}: {growth / 1024:+.1f} KiB, {total / 1024:.1f} KiB traced (by {key_type})"]
+        lines += [str(stat) for stat in stats[:limit]]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def dump(snapshot: tracemalloc.Snapshot) -> bytes:
+        """Snapshot dạng file gốc, đọc lại bằng `tracemalloc.Snapshot.load`."""
+        fd, path = tempfile.mkstemp(suffix=".tracemalloc")
+        os.close(fd)
+        try:
+            snapshot.dump(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def status(self) -> Dict[str, Any]:
+        """Trạng thái tracemalloc của worker này (pid, đang profile, bộ nhớ đang theo dõi)."""
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "pid": os.getpid(),
+            "running": self._running,
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+        }
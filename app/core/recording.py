@@ -0,0 +1,169 @@
+"""
+Ghi lại và phát lại các lần gọi generate của Ollama để benchmark không cần model thật.
+
+File ghi là JSONL, mỗi dòng một lần gọi: key của request (hash model, prompt, options,
+format), response (bỏ mảng `context`), thời gian phía client, time-to-first-byte và
+thời điểm từng chunk body về. Khi phát lại, response được trả với thời gian gốc nhân
+`time_scale` (0 = không chờ).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import settings
+from core import json_codec
+from core.schemas import OllamaRequest, OllamaResponse
+
+
+logger = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+
+MATCH_REQUEST = "request"
+MATCH_MODEL = "model"
+MATCH_SEQUENCE = "sequence"
+MATCH_MODES = (MATCH_REQUEST, MATCH_MODEL, MATCH_SEQUENCE)
+
+
+class ReplayMissError(LookupError):
+    """Không có bản ghi phù hợp với request."""
+
+
+def request_key(request: OllamaRequest) -> str:
+    """Key xác định output: model, prompt, options và format (không gồm keep_alive)."""
+    payload = json_codec.canonical_dumps([request.model, request.prompt, request.options or {}, request.format])
+    return hashlib.sha256(payload).hexdigest()
+
+
+class OllamaRecorder:
+    """Ghi từng lần generate ra file JSONL (ghi trong thread, không chặn event loop).
+
+    `{pid}` trong đường dẫn được thay bằng pid để mỗi worker ghi file riêng.
+    """
+
+    def __init__(self, path: str):
+        self.path = path.replace("{pid}", str(os.getpid()))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    @classmethod
+    def from_settings(cls) -> Optional["OllamaRecorder"]:
+        """Recorder theo cấu hình (None nếu không bật ghi)."""
+        if not settings.OLLAMA_RECORD_FILE:
+            return None
+        return cls(settings.OLLAMA_RECORD_FILE)
+
+    def _append(self, line: bytes):
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(line + b"\n")
+            self.recorded += 1
+
+    async def record(
+        self,
+        request: OllamaRequest,
+        body: bytes,
+        elapsed: float,
+        ttfb: float,
+        chunks: List[Tuple[float, int]]
+    ):
+        """Ghi một lần gọi; lỗi ghi chỉ được log."""
+        response = json_codec.loads(body)
+        response.pop("context", None)
+        entry = {
+            "v": RECORDING_VERSION,
+            "key": request_key(request),
+            "model": request.model,
+            "prompt_chars": len(request.prompt),
+            "options": request.options,
+            "response": response,
+            "elapsed": round(elapsed, 6),
+            "ttfb": round(ttfb, 6),
+            "chunks": [[round(offset, 6), size] for offset, size in chunks],
+            "recorded_at": time.time(),
+        }
+        try:
+            await asyncio.to_thread(self._append, json_codec.dumps(entry))
+        except OSError as e:
+            logger.error(f"Không ghi được bản ghi Ollama vào {self.path}: {e}")
+
+
+class OllamaReplay:
+    """Phát lại các lần generate đã ghi thay cho Ollama thật.
+
+    - `request`: khớp đúng key của request (mặc định, benchmark tái lập được).
+    - `model`: lần lượt các bản ghi cùng model.
+    - `sequence`: lần lượt theo thứ tự trong file.
+    Hết bản ghi cho một key thì quay vòng lại từ đầu.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], time_scale: float = 1.0, match: str = MATCH_REQUEST):
+        if match not in MATCH_MODES:
+            raise ValueError(f"Replay match mode không hợp lệ: {match}")
+        self.entries = entries
+        self.time_scale = time_scale
+        self.match = match
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in entries:
+            self._queues[self._group(entry["key"], entry["model"])].append(entry)
+        self.served = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str, time_scale: float = 1.0, match: str = MATCH_REQUEST) -> "OllamaReplay":
+        """Đọc file ghi JSONL."""
+        with open(path, "rb") as f:
+            entries = [json_codec.loads(line) for line in f if line.strip()]
+        logger.info(f"Nạp {len(entries)} bản ghi Ollama từ {path} (match={match}, time_scale={time_scale})")
+        return cls(entries, time_scale=time_scale, match=match)
+
+    @classmethod
+    def from_settings(cls) -> Optional["OllamaReplay"]:
+        """Replay theo cấu hình (None nếu không bật)."""
+        if not settings.OLLAMA_REPLAY_FILE:
+            return None
+        return cls.load(settings.OLLAMA_REPLAY_FILE, settings.OLLAMA_REPLAY_TIME_SCALE, settings.OLLAMA_REPLAY_MATCH)
+
+    def _group(self, key: str, model: str) -> str:
+        if self.match == MATCH_REQUEST:
+            return key
+        if self.match == MATCH_MODEL:
+            return model
+        return ""
+
+    def models(self) -> List[str]:
+        """Các model có trong bản ghi."""
+        return sorted({entry["model"] for entry in self.entries})
+
+    def next_entry(self, request: OllamaRequest) -> Dict[str, Any]:
+        """Bản ghi kế tiếp cho request (quay vòng)."""
+        queue = self._queues.get(self._group(request_key(request), request.model))
+        if not queue:
+            self.misses += 1
+            raise ReplayMissError(f"Không có bản ghi cho model {request.model} (match={self.match})")
+        entry = queue.popleft()
+        queue.append(entry)
+        self.served += 1
+        return entry
+
+    async def generate(self, request: OllamaRequest) -> OllamaResponse:
+        """Trả response đã ghi sau thời gian gốc (nhân time_scale)."""
+        entry = self.next_entry(request)
+        if self.time_scale > 0:
+            await asyncio.sleep(entry["elapsed"] * self.time_scale)
+        return OllamaResponse.model_validate(entry["response"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "served": self.served,
+            "misses": self.misses,
+            "match": self.match,
+            "time_scale": self.time_scale,
+        }
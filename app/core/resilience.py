@@ -0,0 +1,141 @@
+"""
+Retry, hedging và circuit breaker cho các call đến Ollama.
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+import aiohttp
+
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Mọi backend đều đang mở circuit, request bị từ chối ngay."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Lỗi tạm thời (mạng, timeout, 5xx, 429) mới đáng retry."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Circuit breaker closed → open → half-open cho một backend."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Trạng thái hiện tại, tự chuyển open → half-open khi hết reset_timeout."""
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def is_available(self) -> bool:
+        """Backend có được nhận request mới không (không thay đổi trạng thái)."""
+        state = self.state
+        if state == CIRCUIT_CLOSED:
+            return True
+        return state == CIRCUIT_HALF_OPEN and not self._trial_in_flight
+
+    def on_request_start(self):
+        """Đánh dấu request thử nghiệm khi đang half-open."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._trial_in_flight = True
+
+    def release_trial(self):
+        """Request thử nghiệm kết thúc mà không có kết luận (bị hủy, lỗi 4xx)."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        """Request thành công: đóng circuit."""
+        if self._state != CIRCUIT_CLOSED:
+            logger.info("Circuit đóng lại sau request thử nghiệm thành công")
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        """Request lỗi: mở circuit khi vượt ngưỡng hoặc khi thử nghiệm half-open thất bại."""
+        self._failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_caller_retries: contextvars.ContextVar[bool] = contextvars.ContextVar("caller_retries", default=False)
+
+
+@contextmanager
+def caller_retries() -> Iterator[None]:
+    """Scope mà caller tự retry cả thao tác: call Ollama bên trong không retry thêm.
+
+    Tránh retry chồng nhau (retry của client × retry của task) làm số generate nhân lên.
+    """
+    token = _caller_retries.set(True)
+    try:
+        yield
+    finally:
+        _caller_retries.reset(token)
+
+
+def caller_retries_active() -> bool:
+    """Đang ở trong scope `caller_retries()`."""
+    return _caller_retries.get()
+
+
+class RetryPolicy:
+    """Retry với exponential backoff và full jitter."""
+
+    def __init__(self, attempts: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt: int) -> float:
+        """Thời gian chờ trước lần retry thứ `attempt` (bắt đầu từ 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Lưu latency gần đây theo key để tính ngưỡng hedging."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, latency: float):
+        """Thêm một mẫu latency."""
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def percentile(self, key: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Percentile latency của key, None nếu chưa đủ mẫu."""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        index = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+        return ordered[index]
@@ -0,0 +1,227 @@
+"""
+Cache kết quả task theo nội dung (content-addressed) để chạy lại plan chỉ với các task đã đổi.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from config import settings
+from core import json_codec
+from core.schemas import AgentResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi đổi cách dựng prompt/key để bỏ toàn bộ kết quả cũ
+CACHE_VERSION = 1
+
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 của text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU có TTL trong bộ nhớ, key là hash của mọi thứ quyết định output của task.
+
+    Key gồm fingerprint của agent (model, system prompt, generation options),
+    mô tả task, context và hash output của các dependency. Output của một task
+    đổi thì key của mọi task con cũng đổi, nên chỉ phần bị ảnh hưởng chạy lại.
+
+    Cache trong bộ nhớ chỉ thuộc một worker; chạy nhiều worker thì dùng
+    `SqliteResultCache` để các worker dùng chung kết quả.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, AgentResponse]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def from_settings() -> Optional["ResultCache"]:
+        """Tạo cache từ cấu hình (None nếu tắt): SQLite trong DATA_DIR hoặc bộ nhớ của worker."""
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        if settings.RESULT_CACHE_BACKEND == BACKEND_MEMORY:
+            return ResultCache(max_entries=settings.RESULT_CACHE_MAX_ENTRIES, ttl=settings.RESULT_CACHE_TTL)
+        if settings.RESULT_CACHE_BACKEND != BACKEND_SQLITE:
+            raise ValueError(f"RESULT_CACHE_BACKEND không hợp lệ: {settings.RESULT_CACHE_BACKEND}")
+        return SqliteResultCache(
+            os.path.join(settings.DATA_DIR, "results.sqlite3"),
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            ttl=settings.RESULT_CACHE_TTL
+        )
+
+    @staticmethod
+    def make_key(
+        agent_type: str,
+        agent_fingerprint: str,
+        task_description: str,
+        dependency_hashes: Sequence[str] = (),
+        context: Optional[Dict[str, Any]] = None,
+        extra: Any = None
+    ) -> str:
+        """Key của task từ các thành phần ảnh hưởng đến output."""
+        payload = json_codec.canonical_dumps([
+            CACHE_VERSION, agent_type, agent_fingerprint, task_description,
+            list(dependency_hashes), context or {}, extra
+        ])
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> Optional[AgentResponse]:
+        """Kết quả đã cache (bản sao), None nếu không có hoặc hết hạn."""
+        entry = self._entries.get(key)
+        if entry is None or (self.ttl > 0 and time.monotonic() - entry[0] > self.ttl):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1].model_copy(deep=True)
+
+    async def put(self, key: str, response: AgentResponse):
+        """Lưu kết quả thành công; kết quả lỗi không được cache."""
+        if not response.success or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), response.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> int:
+        """Xóa toàn bộ cache, trả về số entry đã xóa."""
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    async def stats(self) -> Dict[str, Any]:
+        """Số liệu cache (hits/misses là của worker hiện tại)."""
+        return self._stats(len(self._entries), BACKEND_MEMORY)
+
+    def _stats(self, entries: int, backend: str) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": backend,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at);
+"""
+
+
+class SqliteResultCache(ResultCache):
+    """Cache kết quả task trong SQLite (WAL), dùng chung cho mọi worker.
+
+    Cùng key, TTL và giới hạn số entry (LRU theo lần dùng gần nhất) như cache
+    trong bộ nhớ; I/O chạy trong thread để không chặn event loop.
+    """
+
+    def __init__(self, path: str, max_entries: int = 512, ttl: float = 86400.0):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT response, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if self.ttl > 0 and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+                return row[0]
+        finally:
+            conn.close()
+
+    def _put(self, key: str, response: str):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, response, created_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                if self.ttl > 0:
+                    conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        finally:
+            conn.close()
+
+    def _clear(self) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM results").rowcount
+        finally:
+            conn.close()
+
+    def _count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        finally:
+            conn.close()
+
+    async def get(self, key: str) -> Optional[AgentResponse]:
+        """Kết quả đã cache, None nếu không có hoặc hết hạn."""
+        response = await asyncio.to_thread(self._get, key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return AgentResponse.model_validate_json(response)
+
+    async def put(self, key: str, response: AgentResponse):
+        """Lưu kết quả thành công; kết quả lỗi không được cache."""
+        if not response.success or self.max_entries <= 0:
+            return
+        await asyncio.to_thread(self._put, key, response.model_dump_json())
+
+    async def clear(self) -> int:
+        """Xóa toàn bộ cache của mọi worker, trả về số entry đã xóa."""
+        return await asyncio.to_thread(self._clear)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Số liệu cache: số entry dùng chung, hits/misses của worker hiện tại."""
+        return self._stats(await asyncio.to_thread(self._count), BACKEND_SQLITE)
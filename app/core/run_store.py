@@ -0,0 +1,195 @@
+"""
+Lưu checkpoint của các lần chạy /process (plan và kết quả từng task) vào SQLite.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config import settings
+from core import json_codec
+from core.schemas import AgentResponse
+
+
+logger = logging.getLogger(__name__)
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL,
+    context TEXT,
+    tasks TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_results (
+    run_id TEXT NOT NULL,
+    task_index INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run_id, task_index)
+);
+"""
+
+
+class RunStore:
+    """Checkpoint store dùng SQLite (WAL), an toàn khi nhiều worker cùng ghi.
+
+    Mọi thao tác I/O chạy trong thread (`asyncio.to_thread`) để không chặn event loop.
+    Run đang chạy giữ lease bằng `updated_at`: worker chạy run cập nhật định kỳ qua
+    `heartbeat`, worker khác chỉ `claim` được run đã dừng hoặc quá `lease_timeout` giây
+    không cập nhật (worker cũ đã chết).
+    """
+
+    def __init__(self, path: str, lease_timeout: float = 120.0):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self._initialized = False
+
+    @classmethod
+    def from_settings(cls) -> Optional["RunStore"]:
+        """Tạo store từ cấu hình (None nếu tắt checkpoint)."""
+        if not settings.CHECKPOINT_ENABLED:
+            return None
+        return cls(os.path.join(settings.DATA_DIR, "runs.sqlite3"), lease_timeout=settings.CHECKPOINT_LEASE_TIMEOUT)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    async def create_run(self, run_id: str, message: str, tasks: List[Dict[str, Any]], context: Optional[Dict[str, Any]] = None):
+        """Lưu plan của một lần chạy mới."""
+        now = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO runs (run_id, status, message, context, tasks, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, RUN_RUNNING, message, json_codec.dumps(context).decode(), json_codec.dumps(tasks).decode(), now, now)
+        )
+
+    async def save_result(self, run_id: str, task_index: int, response: AgentResponse):
+        """Checkpoint kết quả của một task."""
+        now = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO task_results (run_id, task_index, response, finished_at) VALUES (?, ?, ?, ?)",
+            (run_id, task_index, response.model_dump_json(), now)
+        )
+
+    async def set_status(self, run_id: str, status: str):
+        """Cập nhật trạng thái lần chạy."""
+        await asyncio.to_thread(
+            self._execute, "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id)
+        )
+
+    def _claim(self, run_id: str) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ? AND (status != ? OR updated_at < ?)",
+                    (RUN_RUNNING, now, run_id, RUN_RUNNING, now - self.lease_timeout)
+                )
+                return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    async def claim(self, run_id: str) -> bool:
+        """Chuyển run sang RUNNING nếu không có worker nào đang chạy nó (UPDATE có điều kiện, nguyên tử)."""
+        return await asyncio.to_thread(self._claim, run_id)
+
+    async def touch(self, run_id: str):
+        """Gia hạn lease của run đang chạy."""
+        await asyncio.to_thread(
+            self._execute, "UPDATE runs SET updated_at = ? WHERE run_id = ? AND status = ?", (time.time(), run_id, RUN_RUNNING)
+        )
+
+    @contextlib.asynccontextmanager
+    async def heartbeat(self, run_id: str) -> AsyncIterator[None]:
+        """Gia hạn lease ở nền trong lúc chạy run."""
+        async def beat():
+            while True:
+                await asyncio.sleep(self.lease_timeout / 4)
+                try:
+                    await self.touch(run_id)
+                except Exception as e:
+                    logger.warning(f"Không gia hạn được lease của run {run_id}: {e}")
+
+        task = asyncio.create_task(beat())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def _load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT status, message, context, tasks, created_at, updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            results = conn.execute(
+                "SELECT task_index, response FROM task_results WHERE run_id = ? ORDER BY finished_at", (run_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        status, message, context, tasks, created_at, updated_at = row
+        return {
+            "run_id": run_id,
+            "status": status,
+            "message": message,
+            "context": json_codec.loads(context) if context else None,
+            "tasks": json_codec.loads(tasks),
+            "results": {index: AgentResponse.model_validate_json(response) for index, response in results},
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    async def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Plan, trạng thái và kết quả đã checkpoint (theo thứ tự hoàn thành) của lần chạy."""
+        return await asyncio.to_thread(self._load, run_id)
+
+    def _prune(self, older_than: float) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                run_ids = [row[0] for row in conn.execute("SELECT run_id FROM runs WHERE updated_at < ?", (older_than,))]
+                conn.executemany("DELETE FROM task_results WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+                conn.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+        finally:
+            conn.close()
+        return len(run_ids)
+
+    async def prune(self, max_age: float) -> int:
+        """Xóa các lần chạy không cập nhật trong `max_age` giây (chỉ khi store đã tồn tại)."""
+        if max_age <= 0 or not os.path.exists(self.path):
+            return 0
+        removed = await asyncio.to_thread(self._prune, time.time() - max_age)
+        if removed:
+            logger.info(f"Đã xóa {removed} checkpoint cũ")
+        return removed
@@ -1,7 +1,7 @@
 """
 Pydantic models cho request/response schemas.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -29,6 +29,8 @@ class OllamaRequest(BaseModel):
     prompt: str
     stream: bool = False
     options: Optional[Dict[str, Any]] = None
+    format: Optional[Union[str, Dict[str, Any]]] = None
+    keep_alive: Optional[Union[str, int]] = None
 
 
 class OllamaResponse(BaseModel):
@@ -49,4 +51,8 @@ class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     agents_loaded: int
-    ollama_connected: bool
\ No newline at end of file
+    ollama_connected: bool
+    ready: Optional[bool] = None
+    ollama_latency_ms: Optional[float] = None
+    loaded_models: Optional[List[str]] = None
+    checked_at: Optional[float] = None
\ No newline at end of file
@@ -6,18 +6,33 @@ import logging
 from typing import List, Dict, Any, Optional
 
 from agents.base import BaseAgent
+from agents.registry import builtin_capabilities
+from config import settings
 from core.ollama_client import OllamaClient
+from core.plan_parser import PlanParseError, parse_plan, plan_json_schema
 from core.schemas import AgentRequest, AgentResponse
+from core.tracing import SPAN_PLAN, get_tracer
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer(__name__)
+
+# temperature 0 để plan ổn định; stop chặn model sinh whitespace vô hạn sau JSON
+PLANNER_OPTIONS = {"temperature": 0, "stop": ["\n\n\n"]}
 
 
 class TaskOrchestrator(BaseAgent):
-    """Orchestrator để phân tích và chia nhỏ tasks."""
+    """Orchestrator để phân tích và chia nhỏ tasks.
+
+    `capabilities` (agent_type → mô tả) quyết định agent nào planner được chọn,
+    thường lấy từ `AgentManager.agent_capabilities()` để gồm cả agent plugin và profile;
+    mặc định là các agent có sẵn, mô tả lấy từ profile của chúng.
+    """
     
-    def __init__(self, ollama_client: OllamaClient):
+    def __init__(self, ollama_client: OllamaClient, capabilities: Optional[Dict[str, str]] = None):
         super().__init__(ollama_client)
         self.agent_type = "taskorchestrator"
+        self.capabilities: Dict[str, str] = dict(capabilities or builtin_capabilities())
+        self.last_plan_error: Optional[str] = None
     
     async def process(self, request: AgentRequest) -> AgentResponse:
         """Xử lý request từ user."""
@@ -26,6 +41,7 @@ class TaskOrchestrator(BaseAgent):
             return AgentResponse(
                 agent_type=self.agent_type,
                 response=json.dumps(tasks, indent=2),
+                metadata={"plan_error": self.last_plan_error} if self.last_plan_error else None,
                 success=True
             )
         except Exception as e:
@@ -39,35 +55,28 @@ class TaskOrchestrator(BaseAgent):
     
     def get_system_prompt(self) -> str:
         """Lấy system prompt cho agent."""
-        return """You are a task orchestrator that analyzes user requests and breaks them down into specific tasks for specialized agents.
+        agents = "\n".join(f"- {name}: {capabilities}" for name, capabilities in self.capabilities.items())
+        return f"""You are a task orchestrator that analyzes user requests and breaks them down into specific tasks for specialized agents.
 
 Available agents and their capabilities:
-- aiengineer: AI/ML features, LLM integration, computer vision, recommendation systems, general programming
-- backendarchitect: API design, database architecture, server systems, scalability
-- frontenddeveloper: UI/UX implementation, React/Vue, responsive design, frontend performance
-- rapidprototyper: MVP development, quick prototypes, proof of concepts
-- devopsautomator: CI/CD, Docker, Kubernetes, infrastructure automation
-- testwriterfixer: Unit tests, integration tests, test automation, quality assurance
-- contentcreator: Blog posts, marketing content, social media, SEO content
-- growthhacker: User acquisition, viral mechanics, growth experiments, analytics
-- uidesigner: Interface design, design systems, user experience, visual design
-- trendresearcher: Market trends, viral opportunities, consumer behavior analysis
-- projectshipper: Project management, launch planning, delivery coordination
+{agents}
 
 Analyze the user request and break it down into specific tasks. For each task, select the most appropriate agent.
 
-Return a JSON array of tasks in this format without any explanation or extra text.
-IMPORTANT: You must respond with a valid JSON array only, no other text. The response must be parseable by json.loads().
+Return a JSON object whose "tasks" field is a JSON array of tasks, without any explanation or extra text.
+IMPORTANT: You must respond with valid JSON only, no other text. The response must be parseable by json.loads().
 
 Example response format:
-[
-  {
-    "task_description": "Clear description of what needs to be done",
-    "agent_type": "most_suitable_agent",
-    "priority": 1,
-    "dependencies": []
-  }
-]
+{{
+  "tasks": [
+    {{
+      "task_description": "Clear description of what needs to be done",
+      "agent_type": "most_suitable_agent",
+      "priority": 1,
+      "dependencies": []
+    }}
+  ]
+}}
 
 Priority: 1 (highest) to 5 (lowest)
 Dependencies: Array of task indices (0-based) that must complete first. Use dependencies when:
@@ -79,50 +88,48 @@ The system will automatically pass outputs from dependency tasks as context to d
     
     def get_model_name(self) -> str:
         """Lấy tên model Ollama sử dụng."""
-        from config import settings
         return settings.MODEL_TASKORCHESTRATOR
     
     async def analyze_and_split_request(self, user_request: str) -> List[Dict[str, Any]]:
-        """Phân tích request và chia thành các tasks với agent phù hợp."""
+        """Phân tích request và chia thành các tasks với agent phù hợp.
+
+        Output được ràng buộc bằng JSON schema (`format` của Ollama). Nếu plan không
+        hợp lệ, lỗi được ghi vào `last_plan_error` và trả về một task `aiengineer` duy nhất.
+        """
+        with tracer.start_as_current_span(SPAN_PLAN) as span:
+            tasks = await self._plan(user_request)
+            span.set_attribute("plan.tasks", len(tasks))
+            if self.last_plan_error:
+                span.set_attribute("plan.error", self.last_plan_error)
+            return tasks
+
+    async def _plan(self, user_request: str) -> List[Dict[str, Any]]:
+        self.last_plan_error = None
         try:
-            response = await self.call_ollama(user_request)
-            logger.debug(f"Task analysis response: {response}")
-            
-            # Extract JSON from response (handle markdown code blocks)
-            response_clean = response.strip()
-            if "```json" in response_clean:
-                start = response_clean.find("```json") + 7
-                end = response_clean.find("```", start)
-                response_clean = response_clean[start:end].strip()
-            elif "```" in response_clean:
-                start = response_clean.find("```") + 3
-                end = response_clean.find("```", start)
-                response_clean = response_clean[start:end].strip()
-            
-            # Find JSON array in response
-            if "[" in response_clean and "]" in response_clean:
-                start = response_clean.find("[")
-                end = response_clean.rfind("]") + 1
-                json_str = response_clean[start:end]
-            else:
-                json_str = response_clean
-            
-            tasks = json.loads(json_str)
-            logger.info(f"Analyzed request into {len(tasks)} tasks")
-            
-            # Validate and fix task dependencies
-            validated_tasks = self._validate_dependencies(tasks)
-            return validated_tasks
-            
-        except (json.JSONDecodeError, Exception) as e:
-            logger.error(f"Error analyzing request: {e}, response: {response[:200] if 'response' in locals() else 'No response'}")
-            # Fallback to single aiengineer task
-            return [{
-                "task_description": user_request,
-                "agent_type": "aiengineer",
-                "priority": 1,
-                "dependencies": []
-            }]
+            response = await self.call_ollama(
+                user_request,
+                options=PLANNER_OPTIONS,
+                format=plan_json_schema(list(self.capabilities))
+            )
+            logger.debug("Task analysis response length: %d", len(response))
+            tasks = parse_plan(response, list(self.capabilities))
+            logger.info("Analyzed request into %d tasks", len(tasks))
+            return self._validate_dependencies(tasks)
+        except PlanParseError as e:
+            self.last_plan_error = str(e)
+            logger.warning("Plan không hợp lệ, fallback sang một task: %s", e)
+            logger.debug("Plan response: %s", e.raw)
+        except Exception as e:
+            self.last_plan_error = f"Planner error: {e}"
+            logger.error(f"Error analyzing request: {e}")
+
+        # Fallback to single aiengineer task
+        return [{
+            "task_description": user_request,
+            "agent_type": "aiengineer",
+            "priority": 1,
+            "dependencies": []
+        }]
     
     def _validate_dependencies(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Validate and fix task dependencies."""
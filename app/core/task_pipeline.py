@@ -0,0 +1,290 @@
+"""
+Thực thi danh sách task theo dependency, truyền output của task trước cho task sau.
+"""
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
+
+from config import settings
+from core.context_compaction import DependencyCompactor
+from core.resilience import RetryPolicy, caller_retries
+from core.result_cache import ResultCache, content_hash
+from core.run_store import RUN_COMPLETED, RUN_FAILED, RunStore
+from core.schemas import AgentRequest, AgentResponse
+from core.tracing import SPAN_TASK, SPAN_TASK_QUEUE, get_tracer
+from core.usage import UsageStore, summarize, tenant_of, track_usage
+
+if TYPE_CHECKING:
+    from core.agent_manager import AgentManager
+
+
+logger = logging.getLogger(__name__)
+tracer = get_tracer(__name__)
+
+
+class PipelineRun:
+    """Trạng thái một lần chạy pipeline."""
+
+    def __init__(self, tasks: List[Dict[str, Any]], run_id: Optional[str] = None):
+        self.tasks = tasks
+        self.run_id = run_id
+        self.results: List[AgentResponse] = []
+        self.outputs: Dict[int, str] = {}
+        self.completed: Set[int] = set()
+        self.cache_hits: Set[int] = set()
+        self.restored: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.skipped: Set[int] = set()
+        self.started_at = time.time_ns()
+        self.finished_at: Dict[int, int] = {}
+
+    def record(self, index: int, result: AgentResponse):
+        """Ghi nhận task đã kết thúc (thành công, lỗi hoặc bị bỏ qua)."""
+        self.finished_at[index] = time.time_ns()
+        self.results.append(result)
+        self.outputs[index] = result.response
+        self.completed.add(index)
+        if not result.success:
+            self.failed.add(index)
+
+    def ready_at(self, index: int) -> int:
+        """Thời điểm (ns) task đủ dependency để chạy."""
+        dependencies = self.tasks[index].get('dependencies', [])
+        return max((self.finished_at[dep] for dep in dependencies), default=self.started_at)
+
+    @property
+    def success(self) -> bool:
+        """Mọi task đã chạy và thành công."""
+        return len(self.completed) == len(self.tasks) and all(r.success for r in self.results)
+
+
+class TaskPipeline:
+    """Chạy task khi mọi dependency đã hoàn thành, thu gọn output dependency theo budget.
+
+    Có `cache` thì task có cùng agent, mô tả, context và output dependency được
+    lấy lại từ cache thay vì gọi model (chỉ task đã đổi và task con chạy lại).
+    """
+
+    def __init__(
+        self,
+        agent_manager: "AgentManager",
+        compactor: Optional[DependencyCompactor] = None,
+        cache: Optional[ResultCache] = None,
+        store: Optional[RunStore] = None,
+        usage_store: Optional[UsageStore] = None,
+        retry_policies: Optional[Dict[str, RetryPolicy]] = None,
+        default_retry: Optional[RetryPolicy] = None
+    ):
+        self.agent_manager = agent_manager
+        self.compactor = compactor or DependencyCompactor.from_settings(agent_manager.ollama_client)
+        self.cache = cache
+        self.store = store
+        self.usage_store = usage_store
+        self.default_retry = default_retry or RetryPolicy(
+            attempts=settings.TASK_RETRY_ATTEMPTS,
+            backoff_base=settings.TASK_RETRY_BACKOFF_BASE,
+            backoff_max=settings.TASK_RETRY_BACKOFF_MAX
+        )
+        if retry_policies is None:
+            retry_policies = {
+                agent_type: RetryPolicy(
+                    attempts=int(policy.get("attempts", self.default_retry.attempts)),
+                    backoff_base=policy.get("backoff_base", self.default_retry.backoff_base),
+                    backoff_max=policy.get("backoff_max", self.default_retry.backoff_max)
+                )
+                for agent_type, policy in settings.TASK_RETRY_POLICIES.items()
+            }
+        self.retry_policies = retry_policies
+
+    async def run(
+        self,
+        tasks: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+        completed_results: Optional[Dict[int, AgentResponse]] = None
+    ) -> PipelineRun:
+        """Thực thi các task theo thứ tự dependency.
+
+        Args:
+            tasks (List[Dict[str, Any]]): Task đã validate từ orchestrator.
+            context (Optional[Dict[str, Any]]): Context chung của user request.
+            run_id (Optional[str]): Có `store` thì kết quả từng task được checkpoint theo run_id.
+            completed_results (Optional[Dict[int, AgentResponse]]): Kết quả đã checkpoint khi resume.
+
+        Returns:
+            PipelineRun: Kết quả theo thứ tự thực thi và output từng task.
+        """
+        run = PipelineRun(tasks, run_id)
+        for i, result in (completed_results or {}).items():
+            run.record(i, result)
+            run.restored.add(i)
+        # Giữ lease của run trong store để worker khác không resume run đang chạy
+        heartbeat = self.store.heartbeat(run_id) if self.store and run_id else contextlib.nullcontext()
+        async with heartbeat:
+            await self._run_tasks(run, context)
+
+        if self.store and run_id:
+            try:
+                await self.store.set_status(run_id, RUN_COMPLETED if run.success else RUN_FAILED)
+            except Exception as e:
+                logger.error(f"Không cập nhật được trạng thái run {run_id}: {e}")
+        return run
+
+    async def _run_tasks(self, run: PipelineRun, context: Optional[Dict[str, Any]]):
+        """Chạy các task chưa hoàn thành của run theo từng vòng dependency."""
+        tasks = run.tasks
+        while len(run.completed) < len(tasks):
+            executed_in_round = False
+
+            for i, task in enumerate(tasks):
+                if i in run.completed:
+                    continue
+
+                dependencies = task.get('dependencies', [])
+                if not all(dep in run.completed for dep in dependencies):
+                    continue
+
+                failed_dependencies = [dep for dep in dependencies if dep in run.failed]
+                if failed_dependencies:
+                    # Không chạy task trên input hỏng; task con của nó cũng bị bỏ qua theo dây chuyền
+                    logger.warning(f"Skipping task {i}: dependency {failed_dependencies} failed")
+                    run.record(i, AgentResponse(
+                        agent_type=task['agent_type'],
+                        response="",
+                        metadata={"skipped": True, "failed_dependencies": failed_dependencies},
+                        success=False,
+                        error=f"Skipped: dependency task {failed_dependencies} failed"
+                    ))
+                    run.skipped.add(i)
+                    executed_in_round = True
+                    continue
+
+                attributes = {"task.index": i, "agent.type": task['agent_type']}
+                # Thời gian chờ từ lúc đủ dependency đến lúc được chạy
+                tracer.start_span(SPAN_TASK_QUEUE, attributes=attributes, start_time=run.ready_at(i)).end()
+                with tracer.start_as_current_span(SPAN_TASK, attributes=attributes) as span:
+                    cache_key = self._cache_key(task, run.outputs, context)
+                    result = await self.cache.get(cache_key) if cache_key else None
+                    if result is not None:
+                        logger.info("Task %d: dùng kết quả cache (%s)", i, task['agent_type'])
+                        result.metadata = {**(result.metadata or {}), "cached": True}
+                        run.cache_hits.add(i)
+                    else:
+                        with track_usage() as compaction_usage:
+                            agent_request = await self._build_request(task, run.outputs, context)
+                        logger.info("Executing task %d: %s (deps: %s)", i, task['agent_type'], dependencies)
+                        result = await self._execute(i, agent_request)
+                        if cache_key:
+                            await self.cache.put(cache_key, result)
+                        await self._record_usage(run, "compaction", compaction_usage, context)
+                        await self._record_usage(run, task['agent_type'], (result.metadata or {}).get("usage", {}), context)
+                    span.set_attribute("task.cached", i in run.cache_hits)
+                    span.set_attribute("task.success", result.success)
+                run.record(i, result)
+                await self._checkpoint(run, i, result)
+                executed_in_round = True
+
+                if not result.success:
+                    logger.warning(f"Task {i} failed: {result.error}")
+
+            # Prevent infinite loop if no tasks can be executed
+            if not executed_in_round:
+                logger.error("Circular dependency detected or invalid task structure")
+                break
+
+    def retry_policy_for(self, agent_type: str) -> RetryPolicy:
+        """Retry policy của agent."""
+        return self.retry_policies.get(agent_type, self.default_retry)
+
+    async def _execute(self, index: int, agent_request: AgentRequest) -> AgentResponse:
+        """Chạy task, retry với backoff khi agent trả lỗi.
+
+        Khi task có retry, client Ollama không retry thêm (hedging vẫn giữ), nên một task
+        lỗi gửi tối đa (attempts + 1) × 2 generate thay vì nhân thêm số lần retry của client.
+        """
+        policy = self.retry_policy_for(agent_request.agent_type)
+        # Usage tính cả các lần thử lỗi
+        with track_usage() as usage:
+            for attempt in range(policy.attempts + 1):
+                with caller_retries() if policy.attempts else contextlib.nullcontext():
+                    result = await self.agent_manager.process_request(agent_request)
+                # Agent không tồn tại thì retry cũng vô ích
+                if result.success or attempt >= policy.attempts or self.agent_manager.get_agent(agent_request.agent_type) is None:
+                    break
+                delay = policy.backoff(attempt)
+                logger.warning(f"Task {index} lỗi ({result.error}), retry {attempt + 1}/{policy.attempts} sau {delay:.2f}s")
+                await asyncio.sleep(delay)
+        if attempt:
+            result.metadata = {**(result.metadata or {}), "attempts": attempt + 1}
+        if usage["calls"]:
+            result.metadata = {**(result.metadata or {}), "usage": summarize(usage)}
+        return result
+
+    async def _record_usage(self, run: PipelineRun, agent_type: str, usage: Dict[str, Any], context: Optional[Dict[str, Any]]):
+        """Lưu usage của task; lỗi ghi không làm hỏng lần chạy."""
+        if not self.usage_store:
+            return
+        try:
+            await self.usage_store.record(agent_type, usage, tenant=tenant_of(context), run_id=run.run_id)
+        except Exception as e:
+            logger.error(f"Không lưu được usage của {agent_type}: {e}")
+
+    async def _checkpoint(self, run: PipelineRun, index: int, result: AgentResponse):
+        """Lưu kết quả task; lỗi ghi checkpoint không làm hỏng lần chạy."""
+        if not self.store or not run.run_id:
+            return
+        try:
+            await self.store.save_result(run.run_id, index, result)
+        except Exception as e:
+            logger.error(f"Không checkpoint được task {index} của run {run.run_id}: {e}")
+
+    def _cache_key(
+        self,
+        task: Dict[str, Any],
+        outputs: Dict[int, str],
+        context: Optional[Dict[str, Any]]
+    ) -> Optional[str]:
+        """Key cache của task; None nếu không cache được (tắt cache hoặc agent không tồn tại)."""
+        if self.cache is None:
+            return None
+        agent = self.agent_manager.get_agent(task['agent_type'])
+        if agent is None:
+            return None
+        return self.cache.make_key(
+            task['agent_type'],
+            agent.fingerprint(),
+            task['task_description'],
+            [content_hash(outputs[dep]) for dep in task.get('dependencies', [])],
+            context,
+            # Policy thu gọn quyết định input thực tế của task
+            extra=self.compactor.policy_for(task['agent_type'])
+        )
+
+    async def _build_request(
+        self,
+        task: Dict[str, Any],
+        outputs: Dict[int, str],
+        context: Optional[Dict[str, Any]]
+    ) -> AgentRequest:
+        """Tạo request cho task, chèn output dependency (đã thu gọn) vào message."""
+        message = task['task_description']
+        task_context = dict(context) if context else {}
+        dependencies = task.get('dependencies', [])
+
+        if dependencies:
+            dependency_outputs, stats = await self.compactor.compact(
+                task['agent_type'], task['task_description'], {dep: outputs[dep] for dep in dependencies}
+            )
+            # Output chỉ nằm trong message; context chỉ giữ tham chiếu để không nhân đôi payload
+            task_context['dependencies'] = dependencies
+            task_context['compaction'] = stats
+            for dep in dependencies:
+                message += f"\n\n--- Output from previous task {dep} ---\n{dependency_outputs[dep]}"
+
+        return AgentRequest(
+            agent_type=task['agent_type'],
+            message=message,
+            context=task_context
+        )
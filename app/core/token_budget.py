@@ -0,0 +1,113 @@
+"""
+Ước lượng token và chọn num_ctx / num_predict cho từng request Ollama.
+"""
+import logging
+import math
+from typing import Any, Dict, Optional, Sequence
+
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Dư thêm cho sai số ước lượng (tokenizer thật thường đếm nhiều hơn với code, tiếng Việt)
+ESTIMATE_MARGIN = 1.1
+MIN_NUM_PREDICT = 256
+
+
+class TokenBudget:
+    """Chọn kích thước context theo bucket và giới hạn output theo agent.
+
+    num_ctx được làm tròn lên bucket gần nhất: Ollama load lại model mỗi khi
+    num_ctx thay đổi, nên chỉ dùng vài giá trị cố định để tránh reload liên tục.
+
+    num_predict chỉ bị giới hạn khi được cấu hình (default_num_predict, num_predict_limits)
+    hoặc caller/profile truyền vào; giá trị caller truyền (kể cả 0 = không giới hạn)
+    không bao giờ bị thay đổi.
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[int] = (2048, 4096, 8192, 16384),
+        chars_per_token: float = 3.5,
+        default_num_predict: int = 0,
+        num_predict_limits: Optional[Dict[str, int]] = None,
+        auto_num_ctx: bool = True,
+        output_reserve: int = 2048,
+    ):
+        self.buckets = sorted(buckets)
+        self.chars_per_token = chars_per_token
+        self.default_num_predict = default_num_predict
+        self.num_predict_limits = num_predict_limits or {}
+        self.auto_num_ctx = auto_num_ctx and bool(self.buckets)
+        self.output_reserve = output_reserve
+
+    @classmethod
+    def from_settings(cls) -> "TokenBudget":
+        """Tạo TokenBudget từ cấu hình."""
+        return cls(
+            buckets=settings.OLLAMA_NUM_CTX_BUCKETS,
+            chars_per_token=settings.OLLAMA_CHARS_PER_TOKEN,
+            default_num_predict=settings.OLLAMA_NUM_PREDICT_DEFAULT,
+            num_predict_limits=settings.OLLAMA_NUM_PREDICT_LIMITS,
+            auto_num_ctx=settings.OLLAMA_AUTO_NUM_CTX,
+            output_reserve=settings.OLLAMA_NUM_CTX_OUTPUT_RESERVE,
+        )
+
+    def estimate_tokens(self, text: str) -> int:
+        """Ước lượng số token của text (không cần tokenizer của model)."""
+        return math.ceil(len(text) / self.chars_per_token * ESTIMATE_MARGIN)
+
+    def num_predict_for(self, agent_type: str) -> int:
+        """Số token output tối đa của agent (0 = không giới hạn)."""
+        return self.num_predict_limits.get(agent_type, self.default_num_predict)
+
+    def num_ctx_for(self, prompt_tokens: int, num_predict: int) -> int:
+        """Bucket nhỏ nhất chứa được prompt và output; bucket lớn nhất nếu không đủ."""
+        needed = prompt_tokens + num_predict
+        for bucket in self.buckets:
+            if bucket >= needed:
+                return bucket
+        return self.buckets[-1]
+
+    def apply(self, prompt: str, agent_type: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Bổ sung num_ctx / num_predict vào options; giá trị caller truyền vào được giữ nguyên.
+
+        Args:
+            prompt (str): Prompt đầy đủ (system + user + context).
+            agent_type (str): Agent gọi Ollama.
+            options (Optional[Dict[str, Any]]): Options sẵn có.
+
+        Returns:
+            Dict[str, Any]: Options đã bổ sung.
+        """
+        options = dict(options or {})
+        explicit = "num_predict" in options
+        num_predict = options["num_predict"] if explicit else self.num_predict_for(agent_type)
+        if not self.auto_num_ctx or "num_ctx" in options:
+            if not explicit and num_predict > 0:
+                options["num_predict"] = num_predict
+            return options
+
+        prompt_tokens = self.estimate_tokens(prompt)
+        # Output không giới hạn: chừa output_reserve token để vẫn chọn được bucket
+        reserved = num_predict if num_predict > 0 else self.output_reserve
+        num_ctx = self.num_ctx_for(prompt_tokens, reserved)
+        if prompt_tokens + reserved > num_ctx:
+            if prompt_tokens >= num_ctx:
+                logger.warning(
+                    f"Prompt của {agent_type} (~{prompt_tokens} tokens) vượt num_ctx tối đa {num_ctx}, "
+                    f"Ollama sẽ cắt bớt phần đầu prompt"
+                )
+            if not explicit and num_predict > 0:
+                # Giới hạn từ cấu hình được thu nhỏ để prompt không bị đẩy ra khỏi context
+                num_predict = max(MIN_NUM_PREDICT, num_ctx - prompt_tokens)
+
+        options["num_ctx"] = num_ctx
+        if not explicit and num_predict > 0:
+            options["num_predict"] = num_predict
+        logger.debug(
+            "Token budget %s: prompt~%d, num_ctx=%s, num_predict=%s",
+            agent_type, prompt_tokens, num_ctx, options.get("num_predict")
+        )
+        return options
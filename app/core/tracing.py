@@ -0,0 +1,153 @@
+"""
+Tracing (OpenTelemetry) cho planning, từng task của DAG và các lần gọi Ollama.
+
+Span được export ra console hoặc file JSONL (dùng offline, không cần collector),
+đồng thời được tổng hợp thành header `Server-Timing` của request HTTP.
+"""
+import contextvars
+import logging
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+from fastapi import Request
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+
+from config import settings
+from core.schemas import OllamaResponse
+
+
+logger = logging.getLogger(__name__)
+
+SPAN_PLAN = "plan"
+SPAN_TASK_QUEUE = "task.queue"
+SPAN_TASK = "task"
+SPAN_GENERATE = "ollama.generate"
+
+EXPORTER_NONE = "none"
+EXPORTER_CONSOLE = "console"
+EXPORTER_FILE = "file"
+
+# Span → metric trong Server-Timing (tổng thời lượng các span cùng loại)
+SERVER_TIMING_SPANS = {SPAN_PLAN: "plan", SPAN_TASK_QUEUE: "queue", SPAN_GENERATE: "ollama"}
+# Attribute thời lượng Ollama báo về (ms) → metric trong Server-Timing
+SERVER_TIMING_ATTRIBUTES = {
+    "ollama.load_duration_ms": "load",
+    "ollama.prompt_eval_duration_ms": "prompt_eval",
+    "ollama.eval_duration_ms": "eval",
+}
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("server_timings", default=None)
+_provider: Optional[TracerProvider] = None
+
+
+def get_tracer(name: str) -> trace.Tracer:
+    """Tracer của module (no-op khi tracing tắt)."""
+    return trace.get_tracer(name)
+
+
+class ServerTimingProcessor(SpanProcessor):
+    """Cộng thời lượng span vào bộ đếm của request hiện tại (theo contextvar)."""
+
+    def on_end(self, span: ReadableSpan):
+        timings = _timings.get()
+        if timings is None:
+            return
+        metric = SERVER_TIMING_SPANS.get(span.name)
+        if metric and span.end_time and span.start_time:
+            timings[metric] = timings.get(metric, 0.0) + (span.end_time - span.start_time) / 1e6
+        for attribute, metric in SERVER_TIMING_ATTRIBUTES.items():
+            value = (span.attributes or {}).get(attribute)
+            if value is not None:
+                timings[metric] = timings.get(metric, 0.0) + value
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Ghi mỗi span thành một dòng JSON (OTLP-like) vào file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(span.to_json(indent=None) + "\n")
+        except OSError as e:
+            logger.error(f"Không ghi được trace ra {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def _exporter(name: str) -> Optional[SpanExporter]:
+    if name == EXPORTER_CONSOLE:
+        return ConsoleSpanExporter()
+    if name == EXPORTER_FILE:
+        return JsonLinesSpanExporter(settings.TRACING_FILE)
+    if name != EXPORTER_NONE:
+        logger.warning(f"TRACING_EXPORTER không hợp lệ: {name}, không export span")
+    return None
+
+
+def setup_tracing() -> Optional[TracerProvider]:
+    """Cài TracerProvider toàn cục theo cấu hình (chỉ một lần mỗi process)."""
+    global _provider
+    if not settings.TRACING_ENABLED:
+        return None
+    if _provider is None:
+        _provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+        _provider.add_span_processor(ServerTimingProcessor())
+        exporter = _exporter(settings.TRACING_EXPORTER)
+        if exporter is not None:
+            _provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(_provider)
+    return _provider
+
+
+def shutdown_tracing():
+    """Flush span còn trong buffer."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def annotate_generation(span: trace.Span, result: OllamaResponse):
+    """Gắn breakdown thời lượng Ollama báo về (ns → ms) vào span generate."""
+    for field in ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration"):
+        value = getattr(result, field)
+        if value:
+            span.set_attribute(f"ollama.{field}_ms", value / 1e6)
+    if result.prompt_eval_count:
+        span.set_attribute("ollama.prompt_eval_count", result.prompt_eval_count)
+    if result.eval_count:
+        span.set_attribute("ollama.eval_count", result.eval_count)
+        if result.eval_duration:
+            span.set_attribute("ollama.tokens_per_second", result.eval_count / (result.eval_duration / 1e9))
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """Giá trị header Server-Timing, ví dụ `plan;dur=812.4, ollama;dur=5230.1`."""
+    return ", ".join(f"{metric};dur={duration:.1f}" for metric, duration in timings.items())
+
+
+async def server_timing_middleware(request: Request, call_next):
+    """Span cho mỗi request HTTP và header `Server-Timing` tổng hợp từ các span con."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    started = time.perf_counter()
+    tracer = get_tracer(__name__)
+    try:
+        with tracer.start_as_current_span(f"{request.method} {request.url.path}", kind=trace.SpanKind.SERVER) as span:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.status_code", response.status_code)
+    finally:
+        _timings.reset(token)
+    timings["total"] = (time.perf_counter() - started) * 1000
+    response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
@@ -0,0 +1,220 @@
+"""
+Thống kê token và thời gian tính toán của các lần gọi Ollama.
+
+`track_usage()` mở một scope (contextvar); mọi generate chạy trong scope đó
+(kể cả scope lồng nhau và task con tạo bằng asyncio) được cộng vào usage của scope.
+Usage giữ thêm `by_model` (trường cộng dồn theo từng model) để một run dùng nhiều
+model vẫn thống kê đúng theo model.
+`UsageStore` lưu usage theo run, tenant, agent và model vào SQLite để truy vấn tổng hợp.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from core.schemas import OllamaResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+# Trường cộng dồn được; thời lượng tính theo ms
+USAGE_FIELDS = ("calls", "prompt_tokens", "output_tokens", "load_ms", "prompt_eval_ms", "eval_ms", "total_ms")
+GROUP_BY_COLUMNS = {"agent": "agent_type", "tenant": "tenant", "model": "model", "run": "run_id"}
+
+_active: contextvars.ContextVar[Tuple[Dict[str, Any], ...]] = contextvars.ContextVar("usage_scopes", default=())
+
+
+def empty_usage() -> Dict[str, Any]:
+    """Usage rỗng."""
+    return {**{field: 0 for field in USAGE_FIELDS}, "models": [], "by_model": {}}
+
+
+def _ms(nanoseconds: Optional[int]) -> float:
+    return nanoseconds / 1e6 if nanoseconds else 0.0
+
+
+def usage_from_response(response: OllamaResponse) -> Dict[str, Any]:
+    """Usage của một lần generate từ các trường Ollama trả về."""
+    fields = {
+        "calls": 1,
+        "prompt_tokens": response.prompt_eval_count or 0,
+        "output_tokens": response.eval_count or 0,
+        "load_ms": _ms(response.load_duration),
+        "prompt_eval_ms": _ms(response.prompt_eval_duration),
+        "eval_ms": _ms(response.eval_duration),
+        "total_ms": _ms(response.total_duration),
+    }
+    return {**fields, "models": [response.model], "by_model": {response.model: dict(fields)}}
+
+
+def add_usage(total: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Cộng `usage` vào `total` (tại chỗ)."""
+    for field in USAGE_FIELDS:
+        total[field] += usage.get(field, 0)
+    for model in usage.get("models", []):
+        if model not in total["models"]:
+            total["models"].append(model)
+    for model, fields in usage.get("by_model", {}).items():
+        model_total = total.setdefault("by_model", {}).setdefault(model, {field: 0 for field in USAGE_FIELDS})
+        for field in USAGE_FIELDS:
+            model_total[field] += fields.get(field, 0)
+    return total
+
+
+def _rounded(usage: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: round(usage[field], 1) if field.endswith("_ms") else usage[field] for field in USAGE_FIELDS}
+
+
+def summarize(usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Usage kèm tokens/s, làm tròn để trả về API."""
+    summary = _rounded(usage)
+    summary["tokens_per_second"] = round(usage["output_tokens"] / (usage["eval_ms"] / 1000), 2) if usage["eval_ms"] else None
+    summary["models"] = list(usage.get("models", []))
+    summary["by_model"] = {model: _rounded(fields) for model, fields in usage.get("by_model", {}).items()}
+    return summary
+
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, Any]]:
+    """Scope thu thập usage của các generate chạy bên trong."""
+    usage = empty_usage()
+    token = _active.set(_active.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _active.reset(token)
+
+
+def record_generation(response: OllamaResponse):
+    """Cộng usage của một generate vào mọi scope đang mở."""
+    scopes = _active.get()
+    if not scopes:
+        return
+    usage = usage_from_response(response)
+    for total in scopes:
+        add_usage(total, usage)
+
+
+def tenant_of(context: Optional[Dict[str, Any]], header: Optional[str] = None) -> str:
+    """Tenant của request: header ưu tiên, sau đó `context["tenant"]`."""
+    return header or (context or {}).get("tenant") or DEFAULT_TENANT
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    recorded_at REAL NOT NULL,
+    run_id TEXT,
+    tenant TEXT NOT NULL,
+    agent_type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    load_ms REAL NOT NULL,
+    prompt_eval_ms REAL NOT NULL,
+    eval_ms REAL NOT NULL,
+    total_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_recorded_at ON usage (recorded_at);
+"""
+
+
+class UsageStore:
+    """Lưu usage vào SQLite (WAL) dùng chung cho mọi worker; I/O chạy trong thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._initialized = False
+
+    @classmethod
+    def from_settings(cls) -> Optional["UsageStore"]:
+        """Tạo store từ cấu hình (None nếu tắt)."""
+        if not settings.USAGE_TRACKING_ENABLED:
+            return None
+        return cls(os.path.join(settings.DATA_DIR, "usage.sqlite3"))
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _insert(self, rows: List[tuple]):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(f"INSERT INTO usage VALUES ({', '.join('?' * len(rows[0]))})", rows)
+        finally:
+            conn.close()
+
+    async def record(self, agent_type: str, usage: Dict[str, Any], tenant: str = DEFAULT_TENANT, run_id: Optional[str] = None):
+        """Lưu usage của một agent call, mỗi model một dòng (bỏ qua nếu không có generate nào)."""
+        if not usage.get("calls"):
+            return
+        # Usage không có breakdown (dữ liệu cũ) thì ghi một dòng cho cả nhóm model
+        by_model = usage.get("by_model") or {",".join(usage.get("models", [])) or "unknown": usage}
+        now = time.time()
+        rows = [
+            (now, run_id, tenant, agent_type, model, *(fields[field] for field in USAGE_FIELDS))
+            for model, fields in by_model.items()
+        ]
+        await asyncio.to_thread(self._insert, rows)
+
+    def _query(self, column: str, since: float, tenant: Optional[str], run_id: Optional[str]) -> List[Dict[str, Any]]:
+        sums = ", ".join(f"SUM({field})" for field in USAGE_FIELDS)
+        where, params = ["recorded_at >= ?"], [since]
+        for name, value in (("tenant", tenant), ("run_id", run_id)):
+            if value is not None:
+                where.append(f"{name} = ?")
+                params.append(value)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {column}, {sums} FROM usage WHERE {' AND '.join(where)} "
+                f"GROUP BY {column} ORDER BY SUM(total_ms) DESC",
+                params
+            ).fetchall()
+        finally:
+            conn.close()
+        result = []
+        for key, *values in rows:
+            usage = dict(zip(USAGE_FIELDS, values), models=[])
+            result.append({"key": key, **summarize(usage)})
+        return result
+
+    async def query(
+        self,
+        group_by: str = "agent",
+        since: float = 0.0,
+        tenant: Optional[str] = None,
+        run_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Usage tổng hợp theo agent/tenant/model/run, sắp xếp theo thời gian tính toán giảm dần."""
+        column = GROUP_BY_COLUMNS[group_by]
+        if not os.path.exists(self.path):
+            return []
+        return await asyncio.to_thread(self._query, column, since, tenant, run_id)
+
+    def _prune(self, older_than: float) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM usage WHERE recorded_at < ?", (older_than,)).rowcount
+        finally:
+            conn.close()
+
+    async def prune(self, max_age: float) -> int:
+        """Xóa usage cũ hơn `max_age` giây."""
+        if max_age <= 0 or not os.path.exists(self.path):
+            return 0
+        return await asyncio.to_thread(self._prune, time.time() - max_age)
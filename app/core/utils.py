@@ -1,23 +1,118 @@
 """
 Utility functions và helpers chung.
 """
+import atexit
+import copy
 import logging
-from typing import Any, Dict, Optional
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from typing import Any, Dict, List, Optional
 
 
 logger = logging.getLogger(__name__)
 
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
 
-def setup_logging(level: str = "INFO"):
-    """Cấu hình logging cho ứng dụng."""
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("app.log")
-        ]
-    )
+
+class SamplingFilter(logging.Filter):
+    """Chỉ giữ một tỉ lệ record dưới WARNING của các logger được cấu hình (theo prefix tên logger)."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Prefix dài nhất khớp trước
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler cắt message quá dài và bỏ record khi queue đầy thay vì chặn caller."""
+
+    def __init__(self, log_queue: queue.Queue, max_message_chars: int = 0):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if self.max_message_chars and len(message) > self.max_message_chars:
+            omitted = len(message) - self.max_message_chars
+            record = copy.copy(record)
+            record.msg = f"{message[:self.max_message_chars]}... [+{omitted} ký tự]"
+            record.args = None
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: str = "",
+    max_message_chars: int = 2000,
+    sample_rates: Optional[Dict[str, float]] = None,
+    queue_size: int = 10000
+) -> BoundedQueueHandler:
+    """Cấu hình logging không chặn event loop.
+
+    Caller chỉ đưa record vào queue; thread nền (QueueListener) format và ghi ra
+    console và file (nếu có log_file). Gọi lại thì thay cấu hình cũ.
+
+    Nhiều worker cùng ghi một file nên không tự xoay vòng (rename giữa các process
+    làm mất dòng); WatchedFileHandler mở lại file khi logrotate bên ngoài đổi tên nó.
+    """
+    global _listener
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(WatchedFileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = BoundedQueueHandler(queue.Queue(queue_size), max_message_chars)
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+
+    if _listener is not None:
+        _listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper()))
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging():
+    """Ghi nốt record còn trong queue và dừng thread ghi log."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
 
 
 def safe_get(data: Dict[str, Any], key: str, default: Any = None) -> Any:
@@ -41,4 +136,9 @@ def format_error_response(error: Exception, agent_type: str = "unknown") -> Dict
         "success": False,
         "error": str(error),
         "error_type": type(error).__name__
-    }
\ No newline at end of file
+    }
+
+
+def strip_think_blocks(text: str) -> str:
+    """Bỏ các khối <think>...</think> của reasoning model."""
+    return _THINK_BLOCK.sub("", text).strip()
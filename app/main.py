@@ -4,9 +4,12 @@ Entry point cho Agent Orchestrator Application.
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 
 from config import settings
+from core import metrics, tracing
+from core.utils import setup_logging
 from core.agent_manager import AgentManager
 from router.api import router
 
@@ -15,6 +18,13 @@ from router.api import router
 async def lifespan(app: FastAPI):
     """Quản lý lifecycle của ứng dụng."""
     # Startup
+    setup_logging(
+        settings.LOG_LEVEL,
+        log_file=settings.LOG_FILE,
+        max_message_chars=settings.LOG_MAX_MESSAGE_CHARS,
+        sample_rates=settings.LOG_SAMPLING,
+        queue_size=settings.LOG_QUEUE_SIZE
+    )
     logging.info("Starting Agent Orchestrator application...")
     agent_manager = None
     try:
@@ -38,6 +48,8 @@ async def lifespan(app: FastAPI):
             logging.info("Application shutdown completed")
         except Exception as e:
             logging.error(f"Error during cleanup: {e}")
+    tracing.shutdown_tracing()
+    metrics.mark_worker_dead()
 
 
 def create_app() -> FastAPI:
@@ -46,14 +58,27 @@ def create_app() -> FastAPI:
         title="Agent Orchestrator",
         description="Điều phối các agent với Ollama integration",
         version="1.0.0",
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
     
     app.include_router(router, prefix="/api/v1")
     
+    if tracing.setup_tracing():
+        app.middleware("http")(tracing.server_timing_middleware)
+    if settings.METRICS_ENABLED:
+        app.middleware("http")(metrics.metrics_middleware)
+        app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+    
     return app
 
 
+async def metrics_endpoint() -> Response:
+    """Số liệu Prometheus (gộp mọi worker)."""
+    body, content_type = metrics.render_latest()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
 app = create_app()
 
 if __name__ == "__main__":
@@ -2,18 +2,27 @@
 API endpoints cho Agent Orchestrator.
 """
 import logging
+import os
+import secrets
+import time
+import uuid
 from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 
+from config import settings
 from core.agent_manager import AgentManager
+from core.profiler import ProfilerBusyError
 from core.task_orchestrator import TaskOrchestrator
+from core.task_pipeline import TaskPipeline
 from core.schemas import AgentRequest, AgentResponse, HealthResponse
+from core.usage import GROUP_BY_COLUMNS, add_usage, empty_usage, summarize, tenant_of, track_usage
 
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 class UserRequest(BaseModel):
@@ -27,21 +36,43 @@ class TaskResponse(BaseModel):
     results: List[AgentResponse]
     success: bool
     error: Optional[str] = None
+    run_id: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None
+    plan_error: Optional[str] = None
 
 def get_agent_manager(request: Request) -> AgentManager:
     """Dependency để lấy agent manager."""
     return request.app.state.agent_manager
 
 
+def require_debug_endpoints():
+    """Endpoint /debug/* chỉ tồn tại khi bật DEBUG_ENDPOINTS_ENABLED."""
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Endpoint admin cần header X-Admin-Token khớp ADMIN_TOKEN (không cấu hình token thì ẩn endpoint)."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 @router.post("/chat", response_model=AgentResponse)
 async def chat_endpoint(
     request: AgentRequest,
-    agent_manager: AgentManager = Depends(get_agent_manager)
+    agent_manager: AgentManager = Depends(get_agent_manager),
+    x_tenant_id: Optional[str] = Header(None)
 ):
     """Endpoint chính để xử lý request từ user."""
     try:
         logger.info(f"Nhận request cho agent: {request.agent_type}, message: {request.message[:50]}...")
         response = await agent_manager.process_request(request)
+        await _record_usage(
+            agent_manager, response.agent_type, (response.metadata or {}).get("usage", {}),
+            tenant_of(request.context, x_tenant_id)
+        )
         
         if not response.success:
             logger.warning(f"Agent {request.agent_type} failed: {response.error}")
@@ -62,10 +93,46 @@ async def list_agents(
     """Lấy danh sách các agent có sẵn."""
     logger.debug("Listing available agents")
     agents = agent_manager.list_agents()
-    logger.debug(f"Found {len(agents)} agents")
+    logger.debug("Found %d agents", len(agents))
     return agents
 
 
+@router.get("/models")
+async def model_status(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Trạng thái residency của các model (warm, hot, đang nạp trên từng backend)."""
+    return agent_manager.model_status()
+
+
+@router.get("/pool")
+async def pool_stats(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Mức sử dụng connection pool đến Ollama."""
+    return agent_manager.ollama_client.pool_stats()
+
+
+@router.get("/cache", dependencies=[Depends(require_admin)])
+async def cache_stats(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Số liệu cache kết quả task."""
+    if agent_manager.result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **await agent_manager.result_cache.stats()}
+
+
+@router.delete("/cache", dependencies=[Depends(require_admin)])
+async def clear_cache(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Xóa cache kết quả task (với backend sqlite là cache chung của mọi worker)."""
+    if agent_manager.result_cache is None:
+        return {"cleared": 0}
+    return {"cleared": await agent_manager.result_cache.clear()}
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check(
     agent_manager: AgentManager = Depends(get_agent_manager)
@@ -76,12 +143,16 @@ async def health_check(
         health_data = await agent_manager.health_check()
         
         status = "healthy" if health_data["ollama_connected"] else "degraded"
-        logger.debug(f"Health check status: {status}")
+        logger.debug("Health check status: %s", status)
         
         return HealthResponse(
             status=status,
             agents_loaded=health_data["agents_loaded"],
-            ollama_connected=health_data["ollama_connected"]
+            ollama_connected=health_data["ollama_connected"],
+            ready=health_data.get("ready"),
+            ollama_latency_ms=health_data.get("ollama_latency_ms"),
+            loaded_models=health_data.get("loaded_models"),
+            checked_at=health_data.get("checked_at")
         )
     
     except Exception as e:
@@ -93,85 +164,65 @@ async def health_check(
         )
 
 
+@router.get("/livez")
+async def liveness():
+    """Liveness probe: process còn phục vụ request, không chạm Ollama."""
+    return {"status": "alive"}
+
+
+@router.get("/readyz")
+async def readiness(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Readiness probe: đọc trạng thái cache, trả 503 khi chưa sẵn sàng."""
+    if not agent_manager.is_serving:
+        return ORJSONResponse(status_code=503, content={"status": "not_ready"})
+    return {"status": "ready"}
+
+
 @router.post("/process", response_model=TaskResponse)
 async def process_user_request(
     request: UserRequest,
-    agent_manager: AgentManager = Depends(get_agent_manager)
+    agent_manager: AgentManager = Depends(get_agent_manager),
+    x_tenant_id: Optional[str] = Header(None)
 ):
     """Process user request with automatic task orchestration."""
     try:
         logger.info(f"Processing user request: {request.message[:50]}...")
+        context = request.context
+        if x_tenant_id:
+            # Lưu tenant cùng checkpoint để resume vẫn tính usage đúng tenant
+            context = {**(context or {}), "tenant": x_tenant_id}
+        run_id = uuid.uuid4().hex
         
         # Initialize task orchestrator
-        orchestrator = TaskOrchestrator(agent_manager.ollama_client)
+        orchestrator = TaskOrchestrator(agent_manager.ollama_client, agent_manager.agent_capabilities())
         
         # Analyze and split request into tasks
-        tasks = await orchestrator.analyze_and_split_request(request.message)
+        with track_usage() as plan_usage:
+            tasks = await orchestrator.analyze_and_split_request(request.message)
         logger.info(f"Request split into {len(tasks)} tasks")
+        await _record_usage(agent_manager, orchestrator.agent_type, plan_usage, tenant_of(context), run_id)
         
-        # Execute tasks with dependency-based pipeline processing
-        results = []
-        task_outputs = {}
-        completed_tasks = set()
-        task_map = {i: task for i, task in enumerate(tasks)}
-        
-        while len(completed_tasks) < len(tasks):
-            executed_in_round = False
-            
-            for i, task in task_map.items():
-                if i in completed_tasks:
-                    continue
-                
-                # Check if all dependencies are completed
-                dependencies = task.get('dependencies', [])
-                if not all(dep in completed_tasks for dep in dependencies):
-                    continue
-                
-                # Build enhanced message with dependency outputs
-                enhanced_message = task['task_description']
-                enhanced_context = dict(request.context) if request.context else {}
-                
-                if dependencies:
-                    enhanced_context['previous_outputs'] = {
-                        f"task_{dep}": task_outputs[dep] for dep in dependencies
-                    }
-                    
-                    # Inject dependency outputs into message
-                    for dep in dependencies:
-                        enhanced_message += f"\n\n--- Output from previous task {dep} ---\n{task_outputs[dep]}"
-                
-                # Create enhanced agent request
-                agent_request = AgentRequest(
-                    agent_type=task['agent_type'],
-                    message=enhanced_message,
-                    context=enhanced_context
-                )
-                
-                # Process task
-                logger.info(f"Executing task {i}: {task['agent_type']} (deps: {dependencies})")
-                result = await agent_manager.process_request(agent_request)
-                results.append(result)
-                task_outputs[i] = result.response
-                completed_tasks.add(i)
-                executed_in_round = True
-                
-                if not result.success:
-                    logger.warning(f"Task {i} failed: {result.error}")
-            
-            # Prevent infinite loop if no tasks can be executed
-            if not executed_in_round:
-                logger.error("Circular dependency detected or invalid task structure")
-                break
+        # Checkpoint plan để có thể resume nếu worker dừng giữa chừng
+        store = agent_manager.run_store
+        if store:
+            try:
+                await store.create_run(run_id, request.message, tasks, context)
+            except Exception as e:
+                logger.error(f"Không lưu được checkpoint cho run {run_id}: {e}")
+                store = None
         
-        # Check overall success
-        overall_success = all(r.success for r in results) and len(completed_tasks) == len(tasks)
-        
-        return TaskResponse(
-            tasks=tasks,
-            results=results,
-            success=overall_success,
-            error=None if overall_success else "Some tasks failed"
+        # Execute tasks with dependency-based pipeline processing
+        pipeline = TaskPipeline(
+            agent_manager, cache=agent_manager.result_cache, store=store, usage_store=agent_manager.usage_store
         )
+        with track_usage() as run_usage:
+            run = await pipeline.run(tasks, context, run_id=run_id)
+        if run.cache_hits:
+            logger.info(f"Reused {len(run.cache_hits)}/{len(tasks)} task results from cache")
+        
+        return _task_response(run, add_usage(run_usage, plan_usage), plan_error=orchestrator.last_plan_error)
         
     except Exception as e:
         logger.error(f"Error processing user request: {e}")
@@ -180,4 +231,197 @@ async def process_user_request(
             results=[],
             success=False,
             error=str(e)
-        )
\ No newline at end of file
+        )
+
+
+def _task_response(
+    run,
+    usage: Optional[Dict[str, Any]] = None,
+    plan_error: Optional[str] = None
+) -> TaskResponse:
+    """TaskResponse từ một PipelineRun, kèm usage của các generate trong lần gọi này.
+
+    `plan_error` báo plan của planner không parse được và run đang dùng task fallback.
+    """
+    return TaskResponse(
+        tasks=run.tasks,
+        results=run.results,
+        success=run.success,
+        error=None if run.success else "Some tasks failed",
+        run_id=run.run_id,
+        usage=summarize(usage) if usage and usage["calls"] else None,
+        plan_error=plan_error
+    )
+
+
+async def _record_usage(
+    agent_manager: AgentManager,
+    agent_type: str,
+    usage: Dict[str, Any],
+    tenant: str,
+    run_id: Optional[str] = None
+):
+    """Lưu usage; lỗi ghi không làm hỏng request."""
+    if not agent_manager.usage_store:
+        return
+    try:
+        await agent_manager.usage_store.record(agent_type, usage, tenant=tenant, run_id=run_id)
+    except Exception as e:
+        logger.error(f"Không lưu được usage của {agent_type}: {e}")
+
+
+async def _load_run(agent_manager: AgentManager, run_id: str) -> Dict[str, Any]:
+    """Đọc checkpoint của run, 404 nếu không có."""
+    if agent_manager.run_store is None:
+        raise HTTPException(status_code=404, detail="Checkpointing is disabled")
+    saved = await agent_manager.run_store.load_run(run_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return saved
+
+
+@router.get("/runs/{run_id}")
+async def get_run(
+    run_id: str,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Trạng thái và kết quả đã checkpoint của một run."""
+    saved = await _load_run(agent_manager, run_id)
+    return {
+        "run_id": run_id,
+        "status": saved["status"],
+        "tasks": saved["tasks"],
+        "completed": sorted(saved["results"]),
+        "results": {str(index): result.model_dump() for index, result in saved["results"].items()},
+        "created_at": saved["created_at"],
+        "updated_at": saved["updated_at"],
+    }
+
+
+async def _continue_run(
+    agent_manager: AgentManager,
+    run_id: str,
+    saved: Dict[str, Any],
+    completed_results: Dict[int, AgentResponse]
+) -> TaskResponse:
+    """Chạy các task không có trong completed_results, giữ nguyên kết quả còn lại.
+
+    Run đang chạy trên worker khác (lease còn hạn) trả 409 để task không bị chạy hai lần.
+    """
+    if len(completed_results) < len(saved["tasks"]) and not await agent_manager.run_store.claim(run_id):
+        raise HTTPException(status_code=409, detail=f"Run is already running: {run_id}")
+    pipeline = TaskPipeline(
+        agent_manager, cache=agent_manager.result_cache, store=agent_manager.run_store, usage_store=agent_manager.usage_store
+    )
+    with track_usage() as usage:
+        run = await pipeline.run(saved["tasks"], saved["context"], run_id=run_id, completed_results=completed_results)
+    return _task_response(run, usage)
+
+
+@router.post("/runs/{run_id}/resume", response_model=TaskResponse)
+async def resume_run(
+    run_id: str,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Chạy tiếp các task chưa hoàn thành của một run đã checkpoint."""
+    saved = await _load_run(agent_manager, run_id)
+    pending = len(saved["tasks"]) - len(saved["results"])
+    logger.info(f"Resuming run {run_id}: {pending}/{len(saved['tasks'])} tasks chưa hoàn thành")
+    return await _continue_run(agent_manager, run_id, saved, saved["results"])
+
+
+@router.post("/runs/{run_id}/retry-failed", response_model=TaskResponse)
+async def retry_failed_tasks(
+    run_id: str,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Chạy lại chỉ các task lỗi và task con của chúng (task thành công được giữ nguyên)."""
+    saved = await _load_run(agent_manager, run_id)
+    succeeded = {index: result for index, result in saved["results"].items() if result.success}
+    logger.info(f"Retrying run {run_id}: {len(saved['tasks']) - len(succeeded)} tasks lỗi hoặc chưa chạy")
+    return await _continue_run(agent_manager, run_id, saved, succeeded)
+
+
+@router.get("/usage")
+async def usage_report(
+    group_by: str = Query("agent", description="agent | tenant | model | run"),
+    since_hours: float = Query(24.0, ge=0, description="Khoảng thời gian tính từ hiện tại (0 = toàn bộ)"),
+    tenant: Optional[str] = None,
+    run_id: Optional[str] = None,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Token và thời gian tính toán tổng hợp, sắp xếp theo mức tiêu tốn giảm dần."""
+    if group_by not in GROUP_BY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {list(GROUP_BY_COLUMNS)}")
+    if agent_manager.usage_store is None:
+        return {"enabled": False}
+    since = time.time() - since_hours * 3600 if since_hours else 0.0
+    rows = await agent_manager.usage_store.query(group_by, since=since, tenant=tenant, run_id=run_id)
+    total = empty_usage()
+    for row in rows:
+        add_usage(total, row)
+    return {"enabled": True, "group_by": group_by, "since_hours": since_hours, "total": summarize(total), "rows": rows}
+
+
+@router.get("/debug/loop", dependencies=[Depends(require_debug_endpoints)])
+async def loop_status(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Độ trễ event loop của worker này và stack của các callback chặn loop gần nhất."""
+    return agent_manager.loop_monitor.snapshot()
+
+
+def _profile_file(content, kind: str, extension: str, media_type: str = "text/plain") -> Response:
+    """Kết quả profiling dạng file tải về; tên file và header X-Worker-PID cho biết worker đã phục vụ."""
+    pid = os.getpid()
+    filename = f"{kind}-{pid}-{int(time.time())}.{extension}"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Worker-PID": str(pid)}
+    )
+
+
+@router.post("/debug/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=300),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Lấy mẫu stack mọi thread của worker trong `seconds` giây, trả file stack collapsed (flamegraph/speedscope)."""
+    try:
+        collapsed = await agent_manager.cpu_profiler.profile(seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _profile_file(collapsed, "cpu", "collapsed")
+
+
+@router.get("/debug/profile/memory", dependencies=[Depends(require_admin)])
+async def memory_profile_status(
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Trạng thái tracemalloc của worker phục vụ request."""
+    return agent_manager.memory_profiler.status()
+
+
+@router.post("/debug/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory(
+    seconds: float = Query(30.0, gt=0, le=600),
+    frames: int = Query(25, ge=1, le=100),
+    format: str = Query("text", pattern="^(text|raw)$"),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Bật tracemalloc trong `seconds` giây và trả chênh lệch cấp phát (text) hoặc snapshot cuối (raw).
+
+    Cả phiên chạy trong một request nên snapshot đầu và cuối luôn cùng một worker.
+    """
+    profiler = agent_manager.memory_profiler
+    try:
+        base, target = await profiler.profile(seconds, frames)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "raw":
+        return _profile_file(profiler.dump(target), "memory", "tracemalloc", "application/octet-stream")
+    return _profile_file(profiler.diff(base, target, key_type, limit), "memory-diff", "txt")
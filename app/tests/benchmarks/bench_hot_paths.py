@@ -0,0 +1,223 @@
+"""
+Microbenchmark các hot path của orchestration: parse plan, validate dependency, tạo message có
+output dependency, dựng pydantic model với payload lớn và serialize TaskResponse.
+
+Chạy (từ thư mục app/):
+    python tests/benchmarks/bench_hot_paths.py                          # in kết quả
+    python tests/benchmarks/bench_hot_paths.py --save data/benchmarks/hot-paths-base.json
+    python tests/benchmarks/bench_hot_paths.py --baseline data/benchmarks/hot-paths-base.json --threshold 0.1
+    python tests/benchmarks/bench_hot_paths.py --filter plan.
+
+Với `--baseline`, case chậm hơn baseline quá `--threshold` bị đánh dấu và exit code là 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from agents.registry import BUILTIN_AGENTS
+from core.context_compaction import POLICY_NONE, POLICY_TRUNCATE, DependencyCompactor
+from core.plan_parser import parse_plan
+from core.schemas import AgentRequest, AgentResponse, OllamaResponse
+from core.task_orchestrator import TaskOrchestrator
+from core.task_pipeline import TaskPipeline
+from router.api import TaskResponse
+
+
+AGENTS = list(BUILTIN_AGENTS)
+
+
+def make_plan(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Plan `count` task, mỗi task phụ thuộc tối đa 3 task trước (kèm vài index lỗi như model hay sinh)."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(count):
+        dependencies = rng.sample(range(i), min(i, rng.randint(0, 3)))
+        if rng.random() < 0.05:
+            dependencies += [i, count + 5, "1"]
+        tasks.append({
+            "task_description": f"Implement component {i} of the system with tests and documentation",
+            "agent_type": AGENTS[i % len(AGENTS)],
+            "priority": rng.randint(1, 5),
+            "dependencies": dependencies,
+        })
+    return tasks
+
+
+def noisy_outputs(tasks: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Output planner như model thật trả về: JSON sạch, có code fence và lời dẫn, có khối <think>."""
+    plan = json.dumps({"tasks": tasks}, indent=2)
+    reasoning = "The user wants a full-stack app. I should split the work by agent capability. " * 40
+    return {
+        "clean": plan,
+        "fenced": f"Sure! Here is the plan for your request:\n\n```json\n{plan}\n```\n\nLet me know if you want changes.",
+        "think": f"<think>\n{reasoning}\n</think>\nPlan (tasks are 0-indexed):\n{json.dumps(tasks)}\nHope this helps!",
+    }
+
+
+class FakeOllamaClient:
+    """Trả về output cố định, để đo phần xử lý phía orchestrator."""
+
+    def __init__(self, text: str):
+        self.response = OllamaResponse(model="planner", response=text, done=True, prompt_eval_count=900, eval_count=400)
+
+    async def generate(self, request) -> OllamaResponse:
+        return self.response
+
+
+def build_cases(size: int, plan_tasks: int) -> Dict[str, Callable]:
+    """Các case: hàm sync hoặc coroutine function không tham số."""
+    cases: Dict[str, Callable] = {}
+
+    plan = make_plan(8)
+    for name, text in noisy_outputs(plan).items():
+        cases[f"plan.parse {name}"] = lambda text=text: parse_plan(text, AGENTS)
+    fenced = noisy_outputs(plan)["fenced"]
+    orchestrator = TaskOrchestrator(FakeOllamaClient(fenced))
+    cases["plan.analyze_and_split fenced"] = lambda: orchestrator.analyze_and_split_request("Build a todo app with auth")
+    large_plan = make_plan(plan_tasks)
+    cases[f"deps.validate {plan_tasks} tasks"] = lambda: orchestrator._validate_dependencies(large_plan)
+
+    output = ("def handler(event):\n    return {'status': 200, 'body': event}\n" * (size // 60))[:size]
+    outputs = {i: output for i in range(4)}
+    task = {"task_description": "Integrate the components", "agent_type": "backendarchitect", "dependencies": [0, 1, 2, 3]}
+    context = {"tenant": "acme", "project": "todo"}
+    manager = SimpleNamespace(ollama_client=None)
+    for policy in (POLICY_NONE, POLICY_TRUNCATE):
+        pipeline = TaskPipeline(manager, compactor=DependencyCompactor(None, policy=policy))
+        cases[f"deps.build_request 4x{size // 1000}KB {policy}"] = (
+            lambda pipeline=pipeline: pipeline._build_request(task, outputs, context)
+        )
+
+    response_body = json.dumps({
+        "model": "codellama:13b", "response": output, "done": True, "context": list(range(4096)),
+        "total_duration": 5_000_000_000, "eval_count": size // 4,
+    }).encode()
+    metadata = {"model": "codellama:13b", "usage": {"calls": 1, "prompt_tokens": 900, "output_tokens": size // 4}}
+    cases["schema.AgentRequest"] = lambda: AgentRequest(agent_type="backendarchitect", message=output, context=context)
+    cases["schema.AgentResponse"] = lambda: AgentResponse(agent_type="backendarchitect", response=output, metadata=metadata)
+    cases["schema.OllamaResponse validate_json"] = lambda: OllamaResponse.model_validate_json(response_body)
+
+    task_response = TaskResponse(
+        tasks=plan,
+        results=[AgentResponse(agent_type=t["agent_type"], response=output, metadata=metadata) for t in plan],
+        success=True,
+        usage=metadata["usage"],
+    )
+    cases[f"json.TaskResponse {len(plan)}x{size // 1000}KB"] = (
+        lambda: ORJSONResponse(jsonable_encoder(task_response)).body
+    )
+    return cases
+
+
+def measure(fn: Callable, number: int, repeat: int, loop: asyncio.AbstractEventLoop) -> List[float]:
+    """Thời gian mỗi lần gọi (giây) của `repeat` vòng, mỗi vòng `number` lần.
+
+    Lần gọi đầu để làm nóng và nhận biết case async (trả về coroutine), case async chạy
+    cả vòng trong một event loop để không tính overhead của `run_until_complete`.
+    """
+    warmup = fn()
+    if asyncio.iscoroutine(warmup):
+        loop.run_until_complete(warmup)
+
+        async def batch() -> float:
+            started = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            return time.perf_counter() - started
+
+        return [loop.run_until_complete(batch()) / number for _ in range(repeat)]
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+    return timings
+
+
+def run(args) -> Dict[str, Any]:
+    cases = build_cases(args.size, args.tasks)
+    loop = asyncio.new_event_loop()
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"payload size={args.size} chars, plan={args.tasks} tasks, number={args.number}, repeat={args.repeat}")
+    print(f"{'case':<40}{'min (us)':>12}{'median (us)':>14}")
+    try:
+        for name, fn in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            timings = measure(fn, args.number, args.repeat, loop)
+            results[name] = {
+                "min_us": round(min(timings) * 1e6, 3),
+                "median_us": round(statistics.median(timings) * 1e6, 3),
+            }
+            print(f"{name:<40}{results[name]['min_us']:>12.1f}{results[name]['median_us']:>14.1f}")
+    finally:
+        loop.close()
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {"size": args.size, "tasks": args.tasks, "number": args.number, "repeat": args.repeat},
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """In chênh lệch theo thời gian min; trả về các case chậm hơn baseline quá `threshold`."""
+    if base.get("config") != current.get("config"):
+        print(f"warning: baseline config {base.get('config')} differs from {current.get('config')}")
+    regressions = []
+    print(f"\n{'case':<40}{'base (us)':>12}{'current (us)':>14}{'change':>10}")
+    for name, result in current["results"].items():
+        previous = base["results"].get(name)
+        if previous is None:
+            print(f"{name:<40}{'-':>12}{result['min_us']:>14.1f}{'new':>10}")
+            continue
+        change = (result["min_us"] - previous["min_us"]) / previous["min_us"]
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<40}{previous['min_us']:>12.1f}{result['min_us']:>14.1f}{change:>+9.1%}{' REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50_000, help="kích thước output/payload (ký tự)")
+    parser.add_argument("--tasks", type=int, default=2000, help="số task của plan lớn")
+    parser.add_argument("--number", type=int, default=50, help="số lần gọi mỗi vòng")
+    parser.add_argument("--repeat", type=int, default=5, help="số vòng (lấy min và median)")
+    parser.add_argument("--filter", help="chỉ chạy case có tên chứa chuỗi này")
+    parser.add_argument("--save", help="ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="so sánh với file kết quả đã lưu")
+    parser.add_argument("--threshold", type=float, default=0.1, help="ngưỡng regression (0.1 = chậm hơn 10%%)")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results: {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark: stdlib JSON + pydantic dict path so với orjson.
+
+Chạy: python tests/benchmarks/bench_json_codec.py [--size 200000] [--number 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from core import json_codec
+from core.schemas import AgentResponse, OllamaRequest, OllamaResponse
+from router.api import TaskResponse
+
+
+def make_payloads(size: int):
+    """Tạo payload giống output code lớn của model."""
+    code = ("def handler(event):\n    return {'status': 200, 'body': event}\n" * (size // 60))[:size]
+    request = OllamaRequest(model="codellama:13b", prompt=code, options={"num_ctx": 8192})
+    response_body = json.dumps({
+        "model": "codellama:13b",
+        "response": code,
+        "done": True,
+        "context": list(range(4096)),
+        "total_duration": 5_000_000_000,
+        "eval_count": size // 4,
+    }).encode()
+    task_response = TaskResponse(
+        tasks=[{"task_description": "Build API", "agent_type": "backendarchitect", "priority": 1, "dependencies": []}] * 5,
+        results=[AgentResponse(agent_type="backendarchitect", response=code, metadata={"model": "codellama:13b"})] * 5,
+        success=True
+    )
+    return request, response_body, task_response
+
+
+def run(size: int, number: int):
+    """Chạy benchmark và in kết quả."""
+    request, response_body, task_response = make_payloads(size)
+
+    cases = {
+        "encode request": (
+            lambda: json.dumps(request.model_dump()).encode(),
+            lambda: json_codec.dumps(request.model_dump(exclude_none=True)),
+        ),
+        "decode response": (
+            lambda: OllamaResponse(**json.loads(response_body)),
+            lambda: OllamaResponse.model_validate(json_codec.loads(response_body)),
+        ),
+        "decode (validate_json)": (
+            lambda: OllamaResponse(**json.loads(response_body)),
+            lambda: OllamaResponse.model_validate_json(response_body),
+        ),
+        "render TaskResponse": (
+            lambda: JSONResponse(jsonable_encoder(task_response)).body,
+            lambda: ORJSONResponse(jsonable_encoder(task_response)).body,
+        ),
+    }
+
+    print(f"payload size={size} chars, number={number}")
+    print(f"{'case':<24}{'old (ms)':>12}{'new (ms)':>12}{'speedup':>10}")
+    for name, (old, new) in cases.items():
+        old_ms = timeit.timeit(old, number=number) / number * 1000
+        new_ms = timeit.timeit(new, number=number) / number * 1000
+        print(f"{name:<24}{old_ms:>12.3f}{new_ms:>12.3f}{old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    run(args.size, args.number)
@@ -0,0 +1,473 @@
+"""
+Load test end-to-end: chạy app (uvicorn, N worker) trỏ vào mock Ollama rồi bắn tải vào /chat và /process.
+
+- closed loop: `--concurrency` client, mỗi client gửi request kế tiếp khi request trước xong.
+- open loop: request đến theo phân phối Poisson với `--rate` req/s, không phụ thuộc request
+  trước đã xong chưa; latency tính từ thời điểm request lẽ ra được gửi (tránh coordinated omission).
+- /process chạy với các plan DAG khác nhau (mock trả plan cố định qua `structured_response`).
+
+Kết quả gồm throughput, latency p50/p95/p99, time-to-first-byte, time-to-first-token phía Ollama
+(mock đo từ lúc nhận request đến token đầu, gồm thời gian chờ slot) và RSS từng worker, ghi ra JSON.
+
+Chạy (từ thư mục app/):
+    python tests/benchmarks/bench_load.py --workers 2 --profile closed --concurrency 16 --duration 30
+    python tests/benchmarks/bench_load.py --profile open --rate 20 --scenarios chat,process-diamond \\
+        --baseline data/benchmarks/load-20240101-120000.json
+    python tests/benchmarks/bench_load.py --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTS_DIR = os.path.join(APP_DIR, "tests")
+sys.path.append(APP_DIR)
+sys.path.append(TESTS_DIR)
+
+import aiohttp
+
+from agents.registry import BUILTIN_AGENTS
+from mock_ollama import percentiles
+
+
+DAG_SHAPES = ("single", "chain", "fanout", "fanin", "diamond", "wide")
+DEFAULT_SCENARIOS = "chat,process-single,process-chain,process-diamond"
+STARTUP_TIMEOUT = 60.0
+MEMORY_SAMPLE_INTERVAL = 0.5
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def dag_plan(shape: str, width: int) -> Dict[str, Any]:
+    """Plan /process có dạng DAG cho trước (index dependency tính từ 0)."""
+    if shape == "single":
+        dependencies = [[]]
+    elif shape == "chain":
+        dependencies = [[i - 1] if i else [] for i in range(width)]
+    elif shape == "fanout":
+        dependencies = [[]] + [[0]] * width
+    elif shape == "fanin":
+        dependencies = [[]] * width + [list(range(width))]
+    elif shape == "diamond":
+        dependencies = [[]] + [[0]] * width + [list(range(1, width + 1))]
+    elif shape == "wide":
+        dependencies = [[]] * width
+    else:
+        raise ValueError(f"Unknown DAG shape: {shape} (choose from {', '.join(DAG_SHAPES)})")
+    agents = list(BUILTIN_AGENTS)
+    return {"tasks": [
+        {
+            "task_description": f"{shape} step {i}: implement part {i} of the feature",
+            "agent_type": agents[i % len(agents)],
+            "priority": 1,
+            "dependencies": deps,
+        }
+        for i, deps in enumerate(dependencies)
+    ]}
+
+
+# --- tiến trình ---
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _read_proc(pid: int, name: str) -> str:
+    with open(f"/proc/{pid}/{name}", "rb") as f:
+        return f.read().decode(errors="replace")
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """PID các worker uvicorn (con của master); chạy 1 worker thì chính là master."""
+    workers = []
+    try:
+        entries = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except FileNotFoundError:
+        return [master_pid]
+    for pid in entries:
+        try:
+            stat = _read_proc(pid, "stat")
+            parent = int(stat.rsplit(")", 1)[1].split()[1])
+            if parent == master_pid and "spawn_main" in _read_proc(pid, "cmdline"):
+                workers.append(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+    return sorted(workers) or [master_pid]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    try:
+        return int(_read_proc(pid, "statm").split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class MemorySampler:
+    """Lấy mẫu RSS của từng worker định kỳ, giữ giá trị cuối và đỉnh."""
+
+    def __init__(self, master_pid: int):
+        self.master_pid = master_pid
+        self.last: Dict[int, int] = {}
+        self.peak: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        for pid in worker_pids(self.master_pid):
+            rss = rss_bytes(pid)
+            if rss is not None:
+                self.last[pid] = rss
+                self.peak[pid] = max(rss, self.peak.get(pid, 0))
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(MEMORY_SAMPLE_INTERVAL)
+
+    def start(self):
+        self.last.clear()
+        self.peak.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, Dict[str, float]]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.sample()
+        return {
+            str(pid): {"rss_mb": round(self.last[pid] / 2**20, 1), "peak_rss_mb": round(self.peak[pid] / 2**20, 1)}
+            for pid in sorted(self.last)
+        }
+
+
+def start_mock(args, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, os.path.join(TESTS_DIR, "mock_ollama.py"), "--host", "127.0.0.1", "--port", str(port),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--prompt-tokens-per-second", str(args.prompt_tokens_per_second),
+        "--load-delay", str(args.load_delay),
+        "--num-parallel", str(args.num_parallel),
+        "--max-loaded-models", str(args.max_loaded_models),
+        "--swap-penalty", str(args.swap_penalty),
+        "--output-tokens", str(args.output_tokens),
+        "--failure-rate", str(args.failure_rate),
+        "--seed", "0",
+    ]
+    return subprocess.Popen(command, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_app(args, port: int, ollama_url: str, data_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_BASE_URLS": "",
+        "RESULT_CACHE_ENABLED": "false",
+        "DATA_DIR": data_dir,
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": os.path.join(data_dir, "app.log"),
+        "TRACING_EXPORTER": "none",
+    }
+    if args.workers > 1:
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(data_dir, "prometheus")
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, cwd=APP_DIR, env=env)
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode} before {url} was ready")
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {STARTUP_TIMEOUT}s")
+
+
+def stop_process(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- tải ---
+
+Send = Callable[[aiohttp.ClientSession, float], Awaitable[Dict[str, Any]]]
+
+
+def make_sender(base_url: str, scenario: str) -> Send:
+    """Hàm gửi một request của kịch bản; latency tính từ `started` (perf_counter)."""
+    counter = iter(range(1, 1 << 62))
+    if scenario == "chat":
+        url = f"{base_url}/api/v1/chat"
+        agent = next(iter(BUILTIN_AGENTS))
+
+        def payload(n: int) -> Dict[str, Any]:
+            return {"agent_type": agent, "message": f"Request {n}: write a function that parses ISO dates"}
+    else:
+        url = f"{base_url}/api/v1/process"
+
+        def payload(n: int) -> Dict[str, Any]:
+            return {"message": f"Request {n}: build a todo app with auth, API and tests"}
+
+    async def send(session: aiohttp.ClientSession, started: float) -> Dict[str, Any]:
+        sample: Dict[str, Any] = {"status": 0, "ok": False, "ttfb": None}
+        try:
+            async with session.post(url, json=payload(next(counter))) as response:
+                sample["ttfb"] = time.perf_counter() - started
+                body = await response.read()
+                sample["status"] = response.status
+                sample["ok"] = response.status == 200 and (scenario == "chat" or json.loads(body).get("success") is True)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            sample["error"] = type(e).__name__
+        sample["latency"] = time.perf_counter() - started
+        return sample
+
+    return send
+
+
+async def closed_loop(session: aiohttp.ClientSession, send: Send, concurrency: int, duration: float) -> List[Dict[str, Any]]:
+    """`concurrency` client gửi liên tục đến hết `duration`."""
+    samples: List[Dict[str, Any]] = []
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            samples.append(await send(session, time.perf_counter()))
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return samples
+
+
+async def open_loop(session: aiohttp.ClientSession, send: Send, rate: float, duration: float, seed: int) -> List[Dict[str, Any]]:
+    """Request đến theo Poisson `rate`/s trong `duration` giây, không chờ request trước."""
+    rng = random.Random(seed)
+    tasks: List[asyncio.Task] = []
+    started = time.perf_counter()
+    scheduled = started
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - started >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(session, scheduled)))
+    return list(await asyncio.gather(*tasks))
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    ok = [sample for sample in samples if sample["ok"]]
+
+    def ms(values: List[float]) -> Dict[str, Optional[float]]:
+        stats = percentiles(values)
+        if values:
+            stats.update({"mean": sum(values) / len(values), "max": max(values)})
+        return {name: value and round(value * 1000, 2) for name, value in stats.items()}
+
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else None,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else None,
+        "latency_ms": ms([sample["latency"] for sample in ok]),
+        "ttfb_ms": ms([sample["ttfb"] for sample in ok]),
+        "status_codes": dict(Counter(str(sample["status"]) for sample in samples)),
+    }
+
+
+async def run_scenario(
+    session: aiohttp.ClientSession, args, app_url: str, mock_url: str, scenario: str, memory: MemorySampler
+) -> Dict[str, Any]:
+    plan = None
+    if scenario != "chat":
+        plan = dag_plan(scenario.split("-", 1)[1], args.dag_width)
+    async with session.post(f"{mock_url}/mock/config", json={"structured_response": plan}) as response:
+        response.raise_for_status()
+
+    send = make_sender(app_url, scenario)
+    if args.warmup:
+        await closed_loop(session, send, min(args.concurrency, 4), args.warmup)
+    async with session.post(f"{mock_url}/mock/reset") as response:
+        response.raise_for_status()
+
+    memory.start()
+    started = time.perf_counter()
+    if args.profile == "closed":
+        samples = await closed_loop(session, send, args.concurrency, args.duration)
+    else:
+        samples = await open_loop(session, send, args.rate, args.duration, args.seed)
+    elapsed = time.perf_counter() - started
+    memory_mb = await memory.stop()
+
+    async with session.get(f"{mock_url}/mock/stats") as response:
+        mock_stats = await response.json()
+    result = {
+        "scenario": scenario,
+        "profile": args.profile,
+        "load": {"concurrency": args.concurrency} if args.profile == "closed" else {"rate": args.rate},
+        "tasks": len(plan["tasks"]) if plan else 1,
+        **summarize(samples, elapsed),
+        "ollama_ttft_ms": mock_stats["ttft_ms"],
+        "ollama": {
+            "generate": mock_stats["stats"].get("generate", 0),
+            "max_active": mock_stats["max_active"],
+            "loads": mock_stats["stats"].get("loads", 0),
+            "swaps": mock_stats["stats"].get("swaps", 0),
+            "rejected": mock_stats["stats"].get("rejected", 0),
+        },
+        "memory_mb": memory_mb,
+    }
+    print_result(result)
+    return result
+
+
+def print_result(result: Dict[str, Any]):
+    latency, ttfb, ttft = result["latency_ms"], result["ttfb_ms"], result["ollama_ttft_ms"]
+    memory = result["memory_mb"]
+    print(
+        f"{result['scenario']:<18} {result['throughput_rps'] or 0:>8.2f} rps  "
+        f"ok {result['ok']:>5}/{result['requests']:<5} "
+        f"p50 {latency['p50'] or 0:>9.1f}  p95 {latency['p95'] or 0:>9.1f}  p99 {latency['p99'] or 0:>9.1f} ms  "
+        f"ttfb p95 {ttfb['p95'] or 0:>9.1f}  ttft p95 {ttft['p95'] or 0:>9.1f} ms  "
+        f"peak rss {max((m['peak_rss_mb'] for m in memory.values()), default=0):>7.1f} MB/worker"
+    )
+
+
+# --- so sánh ---
+
+COMPARED_METRICS = (
+    ("throughput_rps", lambda r: r["throughput_rps"], True),
+    ("p50 ms", lambda r: r["latency_ms"]["p50"], False),
+    ("p95 ms", lambda r: r["latency_ms"]["p95"], False),
+    ("p99 ms", lambda r: r["latency_ms"]["p99"], False),
+    ("ttft p95 ms", lambda r: r["ollama_ttft_ms"]["p95"], False),
+    ("peak rss MB", lambda r: max((m["peak_rss_mb"] for m in r["memory_mb"].values()), default=None), False),
+)
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any]):
+    """In chênh lệch giữa hai lần chạy theo từng kịch bản (dấu * là tệ hơn >5%)."""
+    base_results = {(r["scenario"], r["profile"]): r for r in base["results"]}
+    print(f"\n{'scenario':<18}{'metric':<16}{'base':>12}{'current':>12}{'change':>10}")
+    for result in current["results"]:
+        previous = base_results.get((result["scenario"], result["profile"]))
+        if previous is None:
+            continue
+        for name, metric, higher_is_better in COMPARED_METRICS:
+            old, new = metric(previous), metric(result)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -0.05 if higher_is_better else change > 0.05
+            print(f"{result['scenario']:<18}{name:<16}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{'*' if worse else ''}")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+# --- main ---
+
+async def run(args) -> Dict[str, Any]:
+    mock_port, app_port = free_port(), free_port()
+    mock_url, app_url = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{app_port}"
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    data_dir = tempfile.mkdtemp(prefix="bench-load-")
+    mock = start_mock(args, mock_port)
+    app = None
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency if args.profile == "closed" else 0)
+        timeout = aiohttp.ClientTimeout(total=args.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await wait_ready(session, f"{mock_url}/api/version", mock)
+            app = start_app(args, app_port, mock_url, data_dir)
+            await wait_ready(session, f"{app_url}/api/v1/readyz", app)
+            print(f"app {app_url} ({args.workers} workers) -> mock Ollama {mock_url}, profile {args.profile}")
+            memory = MemorySampler(app.pid)
+            results = [
+                await run_scenario(session, args, app_url, mock_url, scenario, memory) for scenario in scenarios
+            ]
+    finally:
+        if app:
+            stop_process(app)
+        stop_process(mock)
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {name: value for name, value in vars(args).items() if name not in ("compare", "baseline", "output")},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="số uvicorn worker")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS,
+                        help=f"chat và/hoặc process-<shape>, shape: {', '.join(DAG_SHAPES)}")
+    parser.add_argument("--dag-width", type=int, default=3, help="số nhánh/độ dài của DAG")
+    parser.add_argument("--profile", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="số client (closed loop)")
+    parser.add_argument("--rate", type=float, default=5.0, help="req/s (open loop)")
+    parser.add_argument("--duration", type=float, default=20.0, help="thời gian đo mỗi kịch bản (giây)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="thời gian chạy nóng trước khi đo (giây)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="timeout mỗi request (giây)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="biến môi trường thêm cho app")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--load-delay", type=float, default=0.5)
+    parser.add_argument("--num-parallel", type=int, default=4)
+    parser.add_argument("--max-loaded-models", type=int, default=3)
+    parser.add_argument("--swap-penalty", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="file JSON kết quả (mặc định data/benchmarks/load-<thời gian>.json)")
+    parser.add_argument("--baseline", help="so sánh lần chạy này với file kết quả cũ")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "CURRENT"), help="chỉ so sánh hai file kết quả")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(load_results(args.compare[0]), load_results(args.compare[1]))
+        return
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(APP_DIR, "data", "benchmarks", time.strftime("load-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results: {output}")
+    if args.baseline:
+        compare(load_results(args.baseline), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""
+Mock Ollama server để load test và test tích hợp (không cần GPU/model thật).
+
+Giả lập các endpoint `/api/generate` (stream và không stream), `/api/chat`, `/api/embed`,
+`/api/tags`, `/api/ps`, `/api/version` cùng hành vi của scheduler Ollama:
+- sinh token theo `tokens_per_second`, xử lý prompt theo `prompt_tokens_per_second`;
+- nạp model mất `load_delay` giây, tối đa `max_loaded_models` model trong bộ nhớ,
+  đổi model phải chờ model cũ rảnh rồi mất thêm `swap_penalty` giây;
+- mỗi model chạy tối đa `num_parallel` request (`OLLAMA_NUM_PARALLEL`), số request
+  chờ vượt `max_queue` bị trả 503 (`OLLAMA_MAX_QUEUE`);
+- lỗi ngẫu nhiên với xác suất `failure_rate` (HTTP `failure_status`).
+
+Chạy: python tests/mock_ollama.py --port 11434 --tokens-per-second 30 --num-parallel 4
+rồi trỏ OLLAMA_BASE_URL(S) đến mock. Số liệu ở `GET /mock/stats`, đổi cấu hình lúc
+đang chạy bằng `POST /mock/config` (JSON, ví dụ `{"failure_rate": 0.2}`), xóa số liệu
+giữa các lần đo bằng `POST /mock/reset`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+
+MOCK_VERSION = "0.5.7-mock"
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do")
+CHARS_PER_TOKEN = 4
+MODEL_SIZE = 4_000_000_000
+# Gom token khi stream ở tốc độ cao để không tạo quá nhiều chunk nhỏ
+MIN_CHUNK_INTERVAL = 0.005
+MAX_TTFT_SAMPLES = 100_000
+
+# Cấu hình đổi được qua POST /mock/config
+TUNABLES = {
+    "tokens_per_second": float,
+    "prompt_tokens_per_second": float,
+    "load_delay": float,
+    "swap_penalty": float,
+    "num_parallel": int,
+    "max_loaded_models": int,
+    "max_queue": int,
+    "output_tokens": int,
+    "failure_rate": float,
+    "failure_status": int,
+    "embedding_dim": int,
+    "structured_response": dict,
+}
+
+
+class MockError(Exception):
+    """Lỗi trả về client dạng `{"error": ...}` như Ollama."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def count_tokens(text: str) -> int:
+    """Ước lượng số token (~4 ký tự/token)."""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """Percentile (nearest-rank) của `values`, key dạng `p50`."""
+    ordered = sorted(values)
+    result: Dict[str, Optional[float]] = {}
+    for point in points:
+        index = max(0, -(-point * len(ordered) // 100) - 1)
+        result[f"p{point}"] = ordered[index] if ordered else None
+    return result
+
+
+def sample_from_schema(schema: Dict[str, Any]) -> Any:
+    """Giá trị nhỏ nhất hợp lệ theo JSON schema (giả lập structured output của `format`)."""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: sample_from_schema(prop) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {})) for _ in range(schema.get("minItems", 0))]
+    if kind in ("integer", "number"):
+        return schema.get("minimum", 0)
+    if kind == "boolean":
+        return False
+    return "mock"
+
+
+class MockOllama:
+    """Trạng thái, cấu hình và scheduler của mock server."""
+
+    def __init__(
+        self,
+        models: Optional[List[str]] = None,
+        tokens_per_second: float = 50.0,
+        prompt_tokens_per_second: float = 1000.0,
+        load_delay: float = 0.0,
+        swap_penalty: float = 0.0,
+        num_parallel: int = 1,
+        max_loaded_models: int = 3,
+        max_queue: int = 512,
+        output_tokens: int = 64,
+        failure_rate: float = 0.0,
+        failure_status: int = 500,
+        embedding_dim: int = 384,
+        structured_response: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.models = list(models or [])
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.load_delay = load_delay
+        self.swap_penalty = swap_penalty
+        self.num_parallel = num_parallel
+        self.max_loaded_models = max_loaded_models
+        self.max_queue = max_queue
+        self.output_tokens = output_tokens
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.embedding_dim = embedding_dim
+        # Output cố định khi request có `format` (ví dụ một plan DAG cho /process)
+        self.structured_response = structured_response
+        self._random = random.Random(seed)
+        # model -> (slot, num_parallel lúc nạp); thứ tự LRU, dùng gần nhất ở cuối
+        self.loaded: "OrderedDict[str, Tuple[asyncio.Semaphore, int]]" = OrderedDict()
+        self._load_lock: Optional[asyncio.Lock] = None
+        self.queued = 0
+        self.active = 0
+        self.max_active = 0
+        self.stats: Dict[str, int] = defaultdict(int)
+        # Từ lúc request đến đến token đầu tiên (gồm chờ slot, nạp model, xử lý prompt)
+        self.ttft: Deque[float] = deque(maxlen=MAX_TTFT_SAMPLES)
+
+    # --- scheduler ---
+
+    async def _load(self, model: str) -> float:
+        """Nạp model (mỗi lần một model), gỡ model ít dùng nhất khi đầy."""
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if model in self.loaded:
+                return 0.0
+            started = time.monotonic()
+            while self.loaded and len(self.loaded) >= self.max_loaded_models:
+                await self._unload(next(iter(self.loaded)))
+                self.stats["swaps"] += 1
+                await asyncio.sleep(self.swap_penalty)
+            await asyncio.sleep(self.load_delay)
+            self.loaded[model] = (asyncio.Semaphore(self.num_parallel), self.num_parallel)
+            self.stats["loads"] += 1
+            return time.monotonic() - started
+
+    async def _unload(self, model: str):
+        """Chờ mọi request đang chạy trên model xong rồi gỡ model."""
+        slots, parallel = self.loaded[model]
+        for _ in range(parallel):
+            await slots.acquire()
+        del self.loaded[model]
+        for _ in range(parallel):
+            slots.release()
+
+    async def unload(self, model: str):
+        """Gỡ model theo yêu cầu (`keep_alive: 0`)."""
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if model in self.loaded:
+                await self._unload(model)
+
+    async def acquire(self, model: str) -> Tuple[asyncio.Semaphore, float]:
+        """Chờ model được nạp và có slot trống; trả về slot và thời gian nạp (giây)."""
+        if self.queued >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise MockError(503, "server busy, please try again.  maximum pending requests exceeded")
+        self.queued += 1
+        try:
+            load_seconds = 0.0
+            while True:
+                if model not in self.loaded:
+                    load_seconds += await self._load(model)
+                    continue
+                slots, _ = self.loaded[model]
+                await slots.acquire()
+                if model in self.loaded and self.loaded[model][0] is slots:
+                    self.loaded.move_to_end(model)
+                    self.active += 1
+                    self.max_active = max(self.max_active, self.active)
+                    return slots, load_seconds
+                # Model bị gỡ trong lúc chờ slot: nạp lại
+                slots.release()
+        finally:
+            self.queued -= 1
+
+    def release(self, slots: asyncio.Semaphore):
+        self.active -= 1
+        slots.release()
+
+    # --- sinh output ---
+
+    def check_request(self, model: Optional[str]):
+        """Lỗi giống Ollama cho model thiếu/không có, và lỗi được inject."""
+        if not model:
+            raise MockError(400, "model is required")
+        if self.models and model not in self.models:
+            raise MockError(404, f"model '{model}' not found, try pulling it first")
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.stats["injected_failures"] += 1
+            raise MockError(self.failure_status, "injected failure")
+
+    def completion(self, payload: Dict[str, Any]) -> List[str]:
+        """Các token output: theo `format` nếu có, còn lại là text giả dài `output_tokens`."""
+        fmt = payload.get("format")
+        if fmt:
+            if self.structured_response is not None:
+                value = self.structured_response
+            else:
+                value = sample_from_schema(fmt) if isinstance(fmt, dict) else {"response": "mock"}
+            return [json.dumps(value)]
+        limit = (payload.get("options") or {}).get("num_predict")
+        count = self.output_tokens if limit is None or limit < 0 else min(limit, self.output_tokens)
+        return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(count)]
+
+    def timings(self, prompt_tokens: int, output_tokens: int, load_seconds: float) -> Dict[str, float]:
+        """Thời gian (giây) của từng pha theo tốc độ cấu hình."""
+        return {
+            "load": load_seconds,
+            "prompt_eval": prompt_tokens / self.prompt_tokens_per_second if self.prompt_tokens_per_second else 0.0,
+            "eval": output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0,
+        }
+
+    @staticmethod
+    def final_fields(timings: Dict[str, float], prompt_tokens: int, output_tokens: int) -> Dict[str, Any]:
+        """Các field thống kê của message cuối (duration tính bằng ns như Ollama)."""
+        ns = {name: int(seconds * 1e9) for name, seconds in timings.items()}
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": sum(ns.values()),
+            "load_duration": ns["load"],
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": ns["prompt_eval"],
+            "eval_count": output_tokens,
+            "eval_duration": ns["eval"],
+        }
+
+    @staticmethod
+    async def pace(tokens: List[str], eval_seconds: float) -> AsyncIterator[str]:
+        """Phát token theo tốc độ cấu hình, gom nhiều token một chunk khi tốc độ cao."""
+        per_token = eval_seconds / len(tokens) if tokens else 0.0
+        started = last_flush = time.monotonic()
+        batch: List[str] = []
+        for i, token in enumerate(tokens, 1):
+            batch.append(token)
+            due = started + per_token * i
+            if due - last_flush >= MIN_CHUNK_INTERVAL or i == len(tokens):
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                last_flush = due
+                yield "".join(batch)
+                batch = []
+
+    def embedding(self, text: str) -> List[float]:
+        """Vector chuẩn hóa, cố định theo nội dung (cùng input → cùng vector)."""
+        rng = random.Random(hashlib.sha256(text.encode()).digest())
+        vector = [rng.uniform(-1, 1) for _ in range(self.embedding_dim)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def known_models(self) -> List[str]:
+        return sorted(set(self.models) | set(self.loaded))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "config": {name: getattr(self, name) for name in TUNABLES},
+            "loaded": list(self.loaded),
+            "queued": self.queued,
+            "active": self.active,
+            "max_active": self.max_active,
+            "stats": dict(self.stats),
+            "ttft_ms": {name: value and round(value * 1000, 2) for name, value in percentiles(self.ttft).items()},
+        }
+
+    def reset_stats(self):
+        """Xóa số liệu (giữ cấu hình và model đã nạp), dùng giữa các kịch bản load test."""
+        self.stats.clear()
+        self.ttft.clear()
+        self.max_active = self.active
+
+    def configure(self, changes: Dict[str, Any]):
+        """Đổi cấu hình lúc đang chạy (`num_parallel` áp dụng cho model nạp sau đó)."""
+        unknown = set(changes) - set(TUNABLES)
+        if unknown:
+            raise MockError(400, f"unknown mock settings: {sorted(unknown)}")
+        for name, value in changes.items():
+            setattr(self, name, None if value is None else TUNABLES[name](value))
+
+
+def _model_info(name: str) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "model": name,
+        "modified_at": _now_iso(),
+        "size": MODEL_SIZE,
+        "digest": hashlib.sha256(name.encode()).hexdigest(),
+        "details": {"format": "gguf", "family": "mock", "parameter_size": "7B", "quantization_level": "Q4_0"},
+    }
+
+
+def _chat_prompt(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+class MockOllamaServer:
+    """Các handler aiohttp cho một `MockOllama`."""
+
+    def __init__(self, mock: MockOllama):
+        self.mock = mock
+
+    async def _generate_like(self, request: web.Request, chat: bool) -> web.StreamResponse:
+        mock = self.mock
+        arrived = time.monotonic()
+        payload = await request.json()
+        model = payload.get("model")
+        mock.check_request(model)
+        prompt = _chat_prompt(payload.get("messages") or []) if chat else payload.get("prompt", "")
+        mock.stats["chat" if chat else "generate"] += 1
+
+        def chunk(text: str, **extra: Any) -> Dict[str, Any]:
+            body = {"model": model, "created_at": _now_iso()}
+            if chat:
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+            body.update(extra)
+            return body
+
+        # Prompt rỗng: chỉ nạp (preload) hoặc gỡ model (keep_alive=0)
+        if not prompt:
+            if payload.get("keep_alive") in (0, "0"):
+                await mock.unload(model)
+                return web.json_response(chunk("", done=True, done_reason="unload"))
+            slots, load_seconds = await mock.acquire(model)
+            mock.release(slots)
+            return web.json_response(chunk("", done=True, done_reason="load", load_duration=int(load_seconds * 1e9)))
+
+        slots, load_seconds = await mock.acquire(model)
+        try:
+            tokens = mock.completion(payload)
+            prompt_tokens = count_tokens(prompt)
+            timings = mock.timings(prompt_tokens, len(tokens), load_seconds)
+            await asyncio.sleep(timings["prompt_eval"])
+            mock.ttft.append(time.monotonic() - arrived)
+            final = mock.final_fields(timings, prompt_tokens, len(tokens))
+            if not payload.get("stream", True):
+                await asyncio.sleep(timings["eval"])
+                return web.json_response(chunk("".join(tokens), **final))
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            async for text in mock.pace(tokens, timings["eval"]):
+                await response.write(json.dumps(chunk(text, done=False)).encode() + b"\n")
+            await response.write(json.dumps(chunk("", **final)).encode() + b"\n")
+            await response.write_eof()
+            return response
+        finally:
+            mock.release(slots)
+            if payload.get("keep_alive") in (0, "0"):
+                await mock.unload(model)
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        return await self._generate_like(request, chat=False)
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        return await self._generate_like(request, chat=True)
+
+    async def embed(self, request: web.Request) -> web.Response:
+        mock = self.mock
+        payload = await request.json()
+        model = payload.get("model")
+        mock.check_request(model)
+        mock.stats["embed"] += 1
+        inputs = payload.get("input", "")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        slots, load_seconds = await mock.acquire(model)
+        try:
+            prompt_tokens = sum(count_tokens(text) for text in inputs)
+            timings = mock.timings(prompt_tokens, 0, load_seconds)
+            await asyncio.sleep(timings["prompt_eval"])
+        finally:
+            mock.release(slots)
+        return web.json_response({
+            "model": model,
+            "embeddings": [mock.embedding(text) for text in inputs],
+            "total_duration": int(sum(timings.values()) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": prompt_tokens,
+        })
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [_model_info(name) for name in self.mock.known_models()]})
+
+    async def ps(self, request: web.Request) -> web.Response:
+        models = []
+        for name in self.mock.loaded:
+            info = _model_info(name)
+            info.update({"size_vram": MODEL_SIZE, "expires_at": _now_iso()})
+            models.append(info)
+        return web.json_response({"models": models})
+
+    async def version(self, request: web.Request) -> web.Response:
+        return web.json_response({"version": MOCK_VERSION})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.mock.snapshot())
+
+    async def configure(self, request: web.Request) -> web.Response:
+        self.mock.configure(await request.json())
+        return web.json_response(self.mock.snapshot())
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.mock.reset_stats()
+        return web.json_response(self.mock.snapshot())
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler):
+    try:
+        return await handler(request)
+    except MockError as e:
+        return web.json_response({"error": str(e)}, status=e.status)
+    except json.JSONDecodeError as e:
+        return web.json_response({"error": f"invalid JSON: {e}"}, status=400)
+
+
+MOCK_KEY = web.AppKey("mock", MockOllama)
+
+
+def create_app(mock: Optional[MockOllama] = None) -> web.Application:
+    """aiohttp app của mock server (dùng với `web.run_app` hoặc `aiohttp.test_utils.TestServer`)."""
+    server = MockOllamaServer(mock or MockOllama())
+    app = web.Application(middlewares=[error_middleware])
+    app[MOCK_KEY] = server.mock
+    app.router.add_post("/api/generate", server.generate)
+    app.router.add_post("/api/chat", server.chat)
+    app.router.add_post("/api/embed", server.embed)
+    app.router.add_get("/api/tags", server.tags)
+    app.router.add_get("/api/ps", server.ps)
+    app.router.add_get("/api/version", server.version)
+    app.router.add_get("/mock/stats", server.stats)
+    app.router.add_post("/mock/config", server.configure)
+    app.router.add_post("/mock/reset", server.reset)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default="", help="danh sách model, phân tách bằng dấu phẩy (rỗng = nhận mọi model)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=1000.0)
+    parser.add_argument("--load-delay", type=float, default=0.0)
+    parser.add_argument("--swap-penalty", type=float, default=0.0)
+    parser.add_argument("--num-parallel", type=int, default=1)
+    parser.add_argument("--max-loaded-models", type=int, default=3)
+    parser.add_argument("--max-queue", type=int, default=512)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    options = vars(args)
+    host, port = options.pop("host"), options.pop("port")
+    options["models"] = [name.strip() for name in options["models"].split(",") if name.strip()]
+    web.run_app(create_app(MockOllama(**options)), host=host, port=port)
@@ -14,6 +14,10 @@ def mock_ollama_client():
     """Mock Ollama client."""
     client = MagicMock()
     client.health_check = AsyncMock(return_value=True)
+    client.start = AsyncMock()
+    client.preload = AsyncMock()
+    client.refresh_residency = AsyncMock()
+    client.backend_status = MagicMock(return_value=[])
     client.close = AsyncMock()
     return client
 
@@ -23,6 +27,8 @@ def agent_manager(mock_ollama_client):
     """Agent manager with mocked dependencies."""
     with patch('core.agent_manager.OllamaClient', return_value=mock_ollama_client):
         manager = AgentManager()
+    # Không chạy warm-up nền; test readiness gọi warm_up trực tiếp
+    manager.residency.start = MagicMock()
     return manager
 
 
@@ -35,6 +41,30 @@ async def test_initialize_success(agent_manager):
     assert 'uidesigner' in agent_manager.agents
 
 
+@pytest.mark.asyncio
+async def test_initialize_profile_only_agent(agent_manager):
+    """Agent khai báo bằng profile trong cấu hình được khởi tạo và warm-up model của nó."""
+    overrides = {"sqlexpert": {"system_prompt": "You write SQL.", "model": "sqlcoder"}}
+    with patch('agents.profile.settings.AGENT_PROFILE_OVERRIDES', overrides), \
+            patch('core.agent_manager.settings.OLLAMA_WARMUP_ENABLED', False):
+        await agent_manager.initialize()
+
+    assert agent_manager.get_agent("sqlexpert").get_model_name() == "sqlcoder"
+    assert "sqlcoder:latest" in agent_manager.residency.warmup_models
+
+
+@pytest.mark.asyncio
+async def test_initialize_sets_preload_num_ctx(agent_manager):
+    """Warm-up dùng bucket num_ctx mà agent của model sẽ gửi."""
+    with patch('core.agent_manager.settings.OLLAMA_WARMUP_ENABLED', False):
+        await agent_manager.initialize()
+
+    system_prompt = agent_manager.agents.profiles()["aiengineer"].system_prompt
+    expected = agent_manager.token_budget.apply(f"{system_prompt}\n\nUser: ", "aiengineer").get("num_ctx")
+    model = agent_manager.agents.profiles()["aiengineer"].model_name()
+    assert agent_manager.residency.preload_options(model) == {"num_ctx": expected}
+
+
 @pytest.mark.asyncio
 async def test_process_request_success(agent_manager):
     """Test successful request processing."""
@@ -141,6 +171,31 @@ async def test_health_check_ollama_down(agent_manager, mock_ollama_client):
     assert result["ollama_connected"] is False
 
 
+@pytest.mark.asyncio
+async def test_is_ready_waits_for_critical_models(agent_manager):
+    """Manager chỉ ready khi agent đã khởi tạo và model critical đã warm."""
+    agent_manager.residency.critical_models = {"codellama:latest"}
+    assert agent_manager.is_ready is False
+
+    await agent_manager.initialize()
+    await agent_manager.residency.warm_up()
+
+    assert agent_manager.is_ready is True
+    await agent_manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_health_check_served_from_cache(agent_manager, mock_ollama_client):
+    """Health check đọc trạng thái cache, không probe lại Ollama."""
+    await agent_manager.health_monitor.refresh()
+    mock_ollama_client.health_check.reset_mock()
+
+    result = await agent_manager.health_check()
+
+    assert result["ollama_connected"] is True
+    mock_ollama_client.health_check.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_cleanup_success(agent_manager, mock_ollama_client):
     """Test successful cleanup."""
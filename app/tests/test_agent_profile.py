@@ -0,0 +1,100 @@
+"""Unit tests for declarative agent profiles."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from agents.ai_engineer_agent import AiEngineerAgent
+from agents.profile import AgentProfile, custom_profiles, load_profile_overrides, resolve_profile
+from agents.profile_agent import ProfileAgent
+from core.schemas import AgentRequest, OllamaResponse
+
+
+@pytest.fixture
+def mock_ollama_client():
+    """Mock Ollama client."""
+    client = MagicMock()
+    client.generate = AsyncMock(return_value=OllamaResponse(model="m", response="ok", done=True))
+    return client
+
+
+def test_profile_model_defaults_to_settings():
+    """Không khai báo model thì lấy MODEL_<AGENT_TYPE>."""
+    with patch("agents.profile.settings") as mock_settings:
+        mock_settings.MODEL_AIENGINEER = "codellama:13b"
+        assert AgentProfile(agent_type="aiengineer", system_prompt="p").model_name() == "codellama:13b"
+    assert AgentProfile(agent_type="x", system_prompt="p", model="llama3").model_name() == "llama3"
+
+
+def test_profile_merge_keeps_options():
+    """Override merge options theo key và không đổi agent_type."""
+    profile = AgentProfile(agent_type="a", system_prompt="p", options={"temperature": 0.7, "top_p": 0.9})
+    merged = profile.merged({"options": {"temperature": 0.2}, "num_predict": 256, "agent_type": "b"})
+    assert merged.agent_type == "a"
+    assert merged.generation_options() == {"temperature": 0.2, "top_p": 0.9, "num_predict": 256}
+
+
+def test_load_overrides_file_and_env(tmp_path):
+    """Env AGENT_PROFILE_OVERRIDES ghi đè từng field của file."""
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"aiengineer": {"num_predict": 512, "keep_alive": "10m"}}))
+    with patch("agents.profile.settings.AGENT_PROFILES_FILE", str(path)), \
+            patch("agents.profile.settings.AGENT_PROFILE_OVERRIDES", {"aiengineer": {"num_predict": 128}}):
+        overrides = load_profile_overrides()
+    assert overrides == {"aiengineer": {"num_predict": 128, "keep_alive": "10m"}}
+
+
+def test_invalid_override_keeps_default():
+    """Override sai kiểu bị bỏ qua."""
+    profile = AgentProfile(agent_type="a", system_prompt="p")
+    assert resolve_profile(profile, {"a": {"num_predict": "many"}}) is profile
+
+
+def test_custom_profiles_skip_known_and_invalid():
+    """Chỉ tạo agent mới cho profile hợp lệ chưa có class."""
+    overrides = {
+        "aiengineer": {"num_predict": 10},
+        "sqlexpert": {"system_prompt": "You write SQL.", "model": "sqlcoder"},
+        "broken": {"model": "llama2"},
+    }
+    profiles = custom_profiles(["aiengineer"], overrides)
+    assert [p.agent_type for p in profiles] == ["sqlexpert"]
+
+
+@pytest.mark.asyncio
+async def test_profile_agent_sends_generation_options(mock_ollama_client):
+    """ProfileAgent gửi options, num_predict và keep_alive của profile."""
+    profile = AgentProfile(agent_type="sqlexpert", system_prompt="You write SQL.", model="sqlcoder",
+                           options={"temperature": 0.1, "num_thread": 8}, num_predict=300, keep_alive="1h")
+    agent = ProfileAgent(mock_ollama_client, profile)
+    response = await agent.process(AgentRequest(agent_type="sqlexpert", message="Count users"))
+
+    request = mock_ollama_client.generate.call_args[0][0]
+    assert response.success is True
+    assert response.metadata == {"model": "sqlcoder"}
+    assert agent.agent_type == "sqlexpert"
+    assert request.model == "sqlcoder"
+    assert request.keep_alive == "1h"
+    assert request.options["temperature"] == 0.1
+    assert request.options["num_thread"] == 8
+    assert request.options["num_predict"] == 300
+
+
+def test_builtin_agent_applies_settings_override(mock_ollama_client):
+    """Agent có sẵn nhận override từ cấu hình."""
+    with patch("agents.profile.settings.AGENT_PROFILE_OVERRIDES", {"aiengineer": {"model": "qwen2.5-coder"}}):
+        agent = AiEngineerAgent(mock_ollama_client)
+    assert agent.get_model_name() == "qwen2.5-coder"
+    assert agent.agent_type == "aiengineer"
+
+
+@pytest.mark.asyncio
+async def test_profile_agent_error_response(mock_ollama_client):
+    """Lỗi từ Ollama trả về AgentResponse thất bại."""
+    mock_ollama_client.generate.side_effect = Exception("boom")
+    agent = ProfileAgent(mock_ollama_client, AgentProfile(agent_type="x", system_prompt="p", model="m"))
+    response = await agent.process(AgentRequest(agent_type="x", message="hi"))
+    assert response.success is False
+    assert response.error == "boom"
@@ -0,0 +1,119 @@
+"""Unit tests for the lazy agent registry."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importlib.metadata import EntryPoint
+from unittest.mock import MagicMock, patch
+from agents.profile import AgentProfile, load_profile_overrides
+from agents.registry import BUILTIN_AGENTS, ENTRY_POINT_GROUP, AgentRegistry, builtin_capabilities
+
+
+@pytest.fixture
+def registry():
+    """Registry đã nạp khai báo, không có plugin ngoài."""
+    registry = AgentRegistry(MagicMock())
+    with patch("agents.registry.entry_points", return_value=[]):
+        registry.discover()
+    return registry
+
+
+def test_discover_does_not_instantiate(registry):
+    """discover chỉ nạp khai báo, chưa khởi tạo agent nào."""
+    assert len(registry) == len(BUILTIN_AGENTS)
+    assert "aiengineer" in registry
+    assert registry.loaded() == []
+
+
+def test_instantiate_on_first_use(registry):
+    """Agent được khởi tạo khi truy cập lần đầu và được cache."""
+    agent = registry["backendarchitect"]
+    assert agent.agent_type == "backendarchitect"
+    assert registry["backendarchitect"] is agent
+    assert registry.loaded() == ["backendarchitect"]
+
+
+def test_unknown_and_broken_agents(registry):
+    """Agent không tồn tại hoặc import lỗi trả về None qua get."""
+    registry.register("broken", "agents.does_not_exist:Nothing")
+    assert registry.get("nonexistent") is None
+    assert registry.get("broken") is None
+
+
+def test_entry_point_and_config_plugins():
+    """Agent ngoài đăng ký qua entry point và AGENT_REGISTRY."""
+    entry_point = EntryPoint(name="plugin", value="agents.ai_engineer_agent:AiEngineerAgent", group=ENTRY_POINT_GROUP)
+    registry = AgentRegistry(MagicMock())
+    with patch("agents.registry.entry_points", return_value=[entry_point]), \
+            patch("agents.registry.settings.AGENT_REGISTRY", {"designer2": "agents.ui_designer_agent:UiDesignerAgent"}):
+        registry.discover()
+
+    assert "plugin" in registry and "designer2" in registry
+    assert type(registry["plugin"]).__name__ == "AiEngineerAgent"
+    assert type(registry["designer2"]).__name__ == "UiDesignerAgent"
+
+
+def test_profile_target_and_configured_models():
+    """Profile đăng ký trực tiếp chạy bằng ProfileAgent; model suy ra không cần khởi tạo."""
+    registry = AgentRegistry(MagicMock())
+    with patch("agents.registry.entry_points", return_value=[]), \
+            patch("agents.profile.settings.AGENT_PROFILE_OVERRIDES", {"uidesigner": {"model": "llava"}}):
+        registry.discover()
+    registry.register("sqlexpert", AgentProfile(agent_type="sqlexpert", system_prompt="SQL", model="sqlcoder"))
+    models = registry.configured_models()
+    assert {"sqlcoder", "llava", "codellama"} <= set(models)
+    assert registry.loaded() == []
+    assert registry["sqlexpert"].get_model_name() == "sqlcoder"
+
+
+def test_capabilities_from_profiles():
+    """Mô tả năng lực lấy từ profile (kể cả override và agent chỉ có profile) mà không khởi tạo agent."""
+    registry = AgentRegistry(MagicMock())
+    with patch("agents.registry.entry_points", return_value=[]), \
+            patch("agents.profile.settings.AGENT_PROFILE_OVERRIDES", {"uidesigner": {"description": "Figma mockups"}}):
+        registry.discover()
+    registry.register("sqlexpert", AgentProfile(agent_type="sqlexpert", system_prompt="SQL", description="SQL tuning", model="sqlcoder"))
+    registry.register("plugin", "agents.base:BaseAgent")
+    capabilities = registry.capabilities()
+
+    assert capabilities["aiengineer"].startswith("AI/ML features")
+    assert capabilities["uidesigner"] == "Figma mockups"
+    assert capabilities["sqlexpert"] == "SQL tuning"
+    assert capabilities["plugin"] == "Base class cho agent."
+    assert registry.loaded() == []
+    registry.register("other", AgentProfile(agent_type="other", system_prompt="x", model="m"))
+    assert "other" in registry.capabilities()
+
+
+def test_profile_file_read_once(tmp_path):
+    """AGENT_PROFILES_FILE được đọc một lần khi discover, không đọc lại mỗi lần khởi tạo agent."""
+    path = tmp_path / "profiles.json"
+    path.write_text('{"aiengineer": {"num_predict": 321}}')
+    registry = AgentRegistry(MagicMock())
+    with patch("agents.registry.entry_points", return_value=[]), \
+            patch("agents.profile.settings.AGENT_PROFILES_FILE", str(path)), \
+            patch("agents.registry.load_profile_overrides", wraps=load_profile_overrides) as loader:
+        registry.discover()
+        agents = [registry[agent_type] for agent_type in BUILTIN_AGENTS]
+        registry.configured_models()
+        registry.capabilities()
+
+    assert loader.call_count == 1
+    assert agents[0].profile.num_predict == 321
+
+
+def test_builtin_capabilities_match_profiles():
+    """Mô tả mặc định của planner chính là description trong profile của agent có sẵn."""
+    from agents.backend_architect_agent import PROFILE
+    capabilities = builtin_capabilities()
+    assert list(capabilities) == list(BUILTIN_AGENTS)
+    assert capabilities["backendarchitect"] == PROFILE.description
+
+
+def test_lazy_package_attributes():
+    """`agents` export class agent qua PEP 562 __getattr__."""
+    import agents
+    assert agents.GrowthHackerAgent.__name__ == "GrowthHackerAgent"
+    with pytest.raises(AttributeError):
+        agents.NotAnAgent
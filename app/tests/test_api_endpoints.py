@@ -17,6 +17,9 @@ def mock_agent_manager():
     manager = MagicMock()
     manager.process_request = AsyncMock()
     manager.list_agents = MagicMock(return_value=["aiengineer", "uidesigner"])
+    manager.result_cache = None
+    manager.run_store = None
+    manager.usage_store = None
     manager.health_check = AsyncMock(return_value={
         "agents_loaded": 2,
         "agent_types": ["aiengineer", "uidesigner"],
@@ -114,6 +117,22 @@ def test_list_agents_endpoint(client, mock_agent_manager):
     mock_agent_manager.list_agents.assert_called_once()
 
 
+def test_model_status_endpoint(client, mock_agent_manager):
+    """Test model residency status endpoint."""
+    mock_agent_manager.model_status = MagicMock(return_value={
+        "ready": True,
+        "warm_models": ["codellama:latest"],
+        "loaded_models": {"http://ollama:11434": ["codellama:latest"]}
+    })
+
+    response = client.get("/api/v1/models")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ready"] is True
+    assert data["warm_models"] == ["codellama:latest"]
+
+
 def test_health_check_endpoint_healthy(client, mock_agent_manager):
     """Test health check endpoint when healthy."""
     response = client.get("/api/v1/health")
@@ -142,6 +161,36 @@ def test_health_check_endpoint_degraded(client, mock_agent_manager):
     assert data["ollama_connected"] is False
 
 
+def test_liveness_endpoint(client, mock_agent_manager):
+    """Test liveness probe does not touch the agent manager."""
+    response = client.get("/api/v1/livez")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+    mock_agent_manager.health_check.assert_not_called()
+
+
+def test_readiness_endpoint_ready(client, mock_agent_manager):
+    """Test readiness probe when manager is serving."""
+    mock_agent_manager.is_serving = True
+
+    response = client.get("/api/v1/readyz")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    mock_agent_manager.health_check.assert_not_called()
+
+
+def test_readiness_endpoint_not_ready(client, mock_agent_manager):
+    """Test readiness probe returns 503 before critical models are warm."""
+    mock_agent_manager.is_serving = False
+
+    response = client.get("/api/v1/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+
+
 def test_health_check_endpoint_exception(client, mock_agent_manager):
     """Test health check endpoint with exception."""
     mock_agent_manager.health_check.side_effect = Exception("Health check error")
@@ -173,6 +222,7 @@ def test_process_user_request_success(client, mock_agent_manager):
     with patch('router.api.TaskOrchestrator') as mock_orchestrator_class:
         mock_orchestrator = MagicMock()
         mock_orchestrator.analyze_and_split_request = AsyncMock(return_value=mock_tasks)
+        mock_orchestrator.last_plan_error = None
         mock_orchestrator_class.return_value = mock_orchestrator
         
         response = client.post("/api/v1/process", json={
@@ -201,9 +251,11 @@ def test_process_user_request_task_failure(client, mock_agent_manager):
     
     mock_agent_manager.process_request.return_value = mock_response
     
-    with patch('router.api.TaskOrchestrator') as mock_orchestrator_class:
+    with patch('router.api.TaskOrchestrator') as mock_orchestrator_class, \
+            patch('core.task_pipeline.settings.TASK_RETRY_ATTEMPTS', 0):
         mock_orchestrator = MagicMock()
         mock_orchestrator.analyze_and_split_request = AsyncMock(return_value=mock_tasks)
+        mock_orchestrator.last_plan_error = None
         mock_orchestrator_class.return_value = mock_orchestrator
         
         response = client.post("/api/v1/process", json={
@@ -216,6 +268,21 @@ def test_process_user_request_task_failure(client, mock_agent_manager):
     assert "Some tasks failed" in data["error"]
 
 
+def test_process_reports_plan_error(client, mock_agent_manager):
+    """Plan không parse được thì /process trả plan_error cùng task fallback."""
+    fallback = [{"task_description": "Build a web app", "agent_type": "aiengineer", "priority": 1, "dependencies": []}]
+    mock_agent_manager.process_request.return_value = AgentResponse(agent_type="aiengineer", response="done")
+
+    with patch('router.api.TaskOrchestrator') as mock_orchestrator_class:
+        mock_orchestrator_class.return_value.analyze_and_split_request = AsyncMock(return_value=fallback)
+        mock_orchestrator_class.return_value.last_plan_error = "Planner output is not valid JSON"
+        data = client.post("/api/v1/process", json={"message": "Build a web app"}).json()
+
+    assert data["success"] is True
+    assert data["plan_error"] == "Planner output is not valid JSON"
+    assert data["tasks"] == fallback
+
+
 def test_process_user_request_exception(client, mock_agent_manager):
     """Test process user request with exception."""
     with patch('router.api.TaskOrchestrator', side_effect=Exception("Orchestrator error")):
@@ -235,4 +302,166 @@ def test_process_user_request_invalid_input(client):
         "message": ""  # Empty message should fail validation
     })
     
-    assert response.status_code == 422  # Validation error
\ No newline at end of file
+    assert response.status_code == 422  # Validation error
+
+
+def test_cache_endpoints(client, mock_agent_manager, tmp_path):
+    """GET /cache trả số liệu, DELETE /cache xóa cache; cả hai cần admin token."""
+    import asyncio
+    from core.result_cache import SqliteResultCache
+    assert client.delete("/api/v1/cache").status_code == 404
+    headers = {"X-Admin-Token": "s3cret"}
+    with patch('router.api.settings.ADMIN_TOKEN', "s3cret"):
+        assert client.delete("/api/v1/cache").status_code == 403
+        assert client.get("/api/v1/cache", headers=headers).json() == {"enabled": False}
+
+        mock_agent_manager.result_cache = SqliteResultCache(str(tmp_path / "results.sqlite3"))
+        asyncio.run(mock_agent_manager.result_cache.put("k", AgentResponse(agent_type="aiengineer", response="x")))
+        assert client.get("/api/v1/cache", headers=headers).json()["entries"] == 1
+        assert client.delete("/api/v1/cache", headers=headers).json() == {"cleared": 1}
+
+
+def test_process_checkpoints_and_resume(client, mock_agent_manager, tmp_path):
+    """/process trả run_id và lưu checkpoint; resume chạy lại task còn thiếu."""
+    from core.run_store import RunStore
+    mock_agent_manager.run_store = RunStore(str(tmp_path / "runs.sqlite3"))
+    mock_agent_manager.process_request.return_value = AgentResponse(agent_type="aiengineer", response="done")
+    mock_tasks = [{"task_description": "Test task", "agent_type": "aiengineer", "priority": 1, "dependencies": []}]
+
+    with patch('router.api.TaskOrchestrator') as mock_orchestrator_class:
+        mock_orchestrator_class.return_value.analyze_and_split_request = AsyncMock(return_value=mock_tasks)
+        mock_orchestrator_class.return_value.last_plan_error = None
+        data = client.post("/api/v1/process", json={"message": "Build a web app"}).json()
+
+    run_id = data["run_id"]
+    run = client.get(f"/api/v1/runs/{run_id}").json()
+    assert run["status"] == "completed"
+    assert run["completed"] == [0]
+
+    resumed = client.post(f"/api/v1/runs/{run_id}/resume").json()
+    assert resumed["success"] is True
+    assert resumed["results"][0]["response"] == "done"
+    assert mock_agent_manager.process_request.await_count == 1
+
+
+def test_resume_unknown_run(client, mock_agent_manager, tmp_path):
+    """Run không tồn tại hoặc checkpoint tắt trả 404."""
+    assert client.post("/api/v1/runs/nope/resume").status_code == 404
+    from core.run_store import RunStore
+    mock_agent_manager.run_store = RunStore(str(tmp_path / "runs.sqlite3"))
+    assert client.get("/api/v1/runs/nope").status_code == 404
+
+
+def test_retry_failed_reruns_failed_subgraph(client, mock_agent_manager, tmp_path):
+    """retry-failed giữ task thành công, chạy lại task lỗi và task con bị bỏ qua."""
+    import asyncio
+    from core.run_store import RunStore
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    mock_agent_manager.run_store = store
+    tasks = [
+        {"task_description": "a", "agent_type": "aiengineer", "priority": 1, "dependencies": []},
+        {"task_description": "b", "agent_type": "aiengineer", "priority": 1, "dependencies": []},
+        {"task_description": "c", "agent_type": "aiengineer", "priority": 1, "dependencies": [1]},
+    ]
+    asyncio.run(store.create_run("r1", "msg", tasks))
+    asyncio.run(store.save_result("r1", 0, AgentResponse(agent_type="aiengineer", response="ok-a")))
+    asyncio.run(store.save_result("r1", 1, AgentResponse(agent_type="aiengineer", response="", success=False, error="boom")))
+    asyncio.run(store.set_status("r1", "failed"))
+    mock_agent_manager.process_request.return_value = AgentResponse(agent_type="aiengineer", response="ok")
+
+    data = client.post("/api/v1/runs/r1/retry-failed").json()
+
+    assert data["success"] is True
+    assert mock_agent_manager.process_request.await_count == 2
+    assert data["results"][0]["response"] == "ok-a"
+    assert client.get("/api/v1/runs/r1").json()["status"] == "completed"
+
+
+def test_resume_refuses_running_run(client, mock_agent_manager, tmp_path):
+    """Run đang chạy trên worker khác trả 409; lease quá hạn thì được resume."""
+    import asyncio
+    import time
+    from core.run_store import RunStore
+    store = RunStore(str(tmp_path / "runs.sqlite3"), lease_timeout=60)
+    mock_agent_manager.run_store = store
+    tasks = [{"task_description": "a", "agent_type": "aiengineer", "priority": 1, "dependencies": []}]
+    asyncio.run(store.create_run("r1", "msg", tasks))
+    mock_agent_manager.process_request.return_value = AgentResponse(agent_type="aiengineer", response="ok")
+
+    assert client.post("/api/v1/runs/r1/resume").status_code == 409
+    assert client.post("/api/v1/runs/r1/retry-failed").status_code == 409
+    assert mock_agent_manager.process_request.await_count == 0
+
+    with patch("core.run_store.time.time", return_value=time.time() + 120):
+        data = client.post("/api/v1/runs/r1/resume").json()
+    assert data["success"] is True
+    assert mock_agent_manager.process_request.await_count == 1
+
+
+def test_usage_report(client, mock_agent_manager, tmp_path):
+    """/usage tổng hợp usage theo nhóm; group_by sai trả 400."""
+    import asyncio
+    from core.usage import UsageStore
+    store = UsageStore(str(tmp_path / "usage.sqlite3"))
+    usage = {"calls": 1, "prompt_tokens": 5, "output_tokens": 20, "load_ms": 0.0,
+             "prompt_eval_ms": 10.0, "eval_ms": 1000.0, "total_ms": 1010.0, "models": ["m"]}
+    asyncio.run(store.record("coder", usage, tenant="acme"))
+    mock_agent_manager.usage_store = store
+
+    data = client.get("/api/v1/usage", params={"group_by": "tenant"}).json()
+
+    assert data["rows"][0]["key"] == "acme"
+    assert data["total"]["output_tokens"] == 20
+    assert client.get("/api/v1/usage", params={"group_by": "color"}).status_code == 400
+
+
+def test_debug_loop_disabled_by_default(client):
+    """/debug/loop trả 404 khi chưa bật debug endpoints."""
+    assert client.get("/api/v1/debug/loop").status_code == 404
+
+
+def test_debug_loop_enabled(client, mock_agent_manager):
+    """Bật debug endpoints thì trả snapshot của loop monitor."""
+    mock_agent_manager.loop_monitor.snapshot.return_value = {"slow_callbacks": 2, "events": []}
+    with patch('router.api.settings.DEBUG_ENDPOINTS_ENABLED', True):
+        response = client.get("/api/v1/debug/loop")
+
+    assert response.json()["slow_callbacks"] == 2
+
+
+def test_profiling_requires_admin_token(client):
+    """Không cấu hình ADMIN_TOKEN thì ẩn endpoint; sai token trả 403."""
+    assert client.post("/api/v1/debug/profile/cpu").status_code == 404
+    with patch('router.api.settings.ADMIN_TOKEN', "s3cret"):
+        assert client.post("/api/v1/debug/profile/cpu").status_code == 403
+        assert client.post("/api/v1/debug/profile/cpu", headers={"X-Admin-Token": "nope"}).status_code == 403
+
+
+def test_cpu_profile_download(client, mock_agent_manager):
+    """Kết quả CPU profiling trả về dạng file tải xuống."""
+    mock_agent_manager.cpu_profiler.profile = AsyncMock(return_value="MainThread;main (main.py:1) 3\n")
+    with patch('router.api.settings.ADMIN_TOKEN', "s3cret"):
+        response = client.post(
+            "/api/v1/debug/profile/cpu", params={"seconds": 1}, headers={"X-Admin-Token": "s3cret"}
+        )
+
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    assert response.headers["x-worker-pid"] == str(os.getpid())
+    assert response.text.endswith(" 3\n")
+    mock_agent_manager.cpu_profiler.profile.assert_awaited_once_with(1.0, 0.005)
+
+
+def test_memory_profile_single_request(client, mock_agent_manager):
+    """Memory profiling chạy trọn trong một request và trả diff kèm pid của worker."""
+    from core.profiler import MemoryProfiler
+    mock_agent_manager.memory_profiler = MemoryProfiler()
+    headers = {"X-Admin-Token": "s3cret"}
+    with patch('router.api.settings.ADMIN_TOKEN', "s3cret"):
+        response = client.post("/api/v1/debug/profile/memory", params={"seconds": 0.05, "limit": 5}, headers=headers)
+        status = client.get("/api/v1/debug/profile/memory", headers=headers).json()
+
+    assert response.status_code == 200
+    assert response.headers["x-worker-pid"] == str(os.getpid())
+    assert response.text.startswith(f"# pid {os.getpid()}:")
+    assert status["pid"] == os.getpid() and status["running"] is False
@@ -152,4 +152,18 @@ async def test_full_prompt_construction(test_agent, mock_ollama_client):
     full_prompt = call_args.prompt
     
     assert "Test system prompt" in full_prompt
-    assert "User: User message" in full_prompt
\ No newline at end of file
+    assert "User: User message" in full_prompt
+
+@pytest.mark.asyncio
+async def test_call_ollama_sizes_context(test_agent, mock_ollama_client):
+    """call_ollama tự điền num_ctx theo độ dài prompt; num_predict chỉ đặt khi có giới hạn."""
+    await test_agent.call_ollama("User message", options={"temperature": 0})
+
+    options = mock_ollama_client.generate.call_args[0][0].options
+    assert options["temperature"] == 0
+    assert options["num_ctx"] in test_agent.token_budget.buckets
+    assert "num_predict" not in options
+
+    test_agent.token_budget.num_predict_limits = {test_agent.agent_type: 300}
+    await test_agent.call_ollama("User message")
+    assert mock_ollama_client.generate.call_args[0][0].options["num_predict"] == 300
@@ -0,0 +1,98 @@
+"""Unit tests for dependency-output compaction."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import AsyncMock, MagicMock
+from core.context_compaction import DependencyCompactor, allocate, head_tail
+from core.schemas import OllamaResponse
+from core.token_budget import TokenBudget
+
+
+@pytest.fixture
+def mock_ollama_client():
+    """Mock Ollama client trả về bản tóm tắt ngắn."""
+    client = MagicMock()
+    client.generate = AsyncMock(return_value=OllamaResponse(model="small", response="<think>x</think>short summary", done=True))
+    return client
+
+
+def make_compactor(client, **kwargs):
+    """Compactor với budget nhỏ cho test."""
+    return DependencyCompactor(client, token_budget=TokenBudget(chars_per_token=4.0), budget_tokens=1000,
+                               summary_model="small", chunk_tokens=2000, **kwargs)
+
+
+def test_head_tail_keeps_both_ends():
+    """Giữ đầu và cuối, đánh dấu phần bị lược bỏ."""
+    text = "A" * 500 + "B" * 500
+    result = head_tail(text, 100, head_ratio=0.5)
+    assert result.startswith("A" * 50) and result.endswith("B" * 50)
+    assert "900" in result
+    assert head_tail("short", 100) == "short"
+
+
+def test_allocate_keeps_small_outputs():
+    """Output nhỏ giữ nguyên, phần còn lại chia cho output lớn."""
+    assert allocate({0: 100, 1: 5000, 2: 5000}, 1000) == {0: 100, 1: 450, 2: 450}
+    assert allocate({0: 100, 1: 200}, 1000) == {0: 100, 1: 200}
+
+
+@pytest.mark.asyncio
+async def test_under_budget_is_unchanged(mock_ollama_client):
+    """Tổng nhỏ hơn budget thì không thu gọn."""
+    outputs = {0: "small output"}
+    compacted, stats = await make_compactor(mock_ollama_client).compact("aiengineer", "task", outputs)
+    assert compacted == outputs
+    assert stats["compacted"] == []
+
+
+@pytest.mark.asyncio
+async def test_truncate_fits_budget(mock_ollama_client):
+    """Truncate đưa tổng output về gần budget."""
+    outputs = {0: "x" * 200, 1: "y" * 40000, 2: "z" * 40000}
+    compactor = make_compactor(mock_ollama_client)
+    compacted, stats = await compactor.compact("aiengineer", "task", outputs)
+
+    assert compacted[0] == outputs[0]
+    assert stats["compacted"] == [1, 2]
+    assert stats["input_tokens"] > 20000
+    assert stats["output_tokens"] <= 1100
+    mock_ollama_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_summarize_per_agent_policy(mock_ollama_client):
+    """Agent có policy summarize được tóm tắt map-reduce theo chunk."""
+    compactor = make_compactor(mock_ollama_client, agent_policies={"uidesigner": {"policy": "summarize", "budget_tokens": 500}})
+    outputs = {0: "y" * 20000}
+    compacted, stats = await compactor.compact("uidesigner", "Design the page", outputs)
+
+    assert stats["policy"] == "summarize"
+    assert stats["budget_tokens"] == 500
+    # 20000 ký tự / chunk ~7272 ký tự → 3 chunk được tóm tắt song song
+    assert mock_ollama_client.generate.await_count == 3
+    assert compacted[0] == "\n\n".join(["short summary"] * 3)
+    request = mock_ollama_client.generate.call_args[0][0]
+    assert request.model == "small"
+    assert "Design the page" in request.prompt
+
+
+@pytest.mark.asyncio
+async def test_summarize_failure_falls_back_to_truncate(mock_ollama_client):
+    """Lỗi khi tóm tắt thì quay về truncate."""
+    mock_ollama_client.generate.side_effect = Exception("model not found")
+    compactor = make_compactor(mock_ollama_client, policy="summarize")
+    compacted, stats = await compactor.compact("aiengineer", "task", {0: "y" * 20000})
+    assert "đã được lược bỏ" in compacted[0]
+    assert stats["output_tokens"] <= 1100
+
+
+@pytest.mark.asyncio
+async def test_policy_none_keeps_outputs(mock_ollama_client):
+    """Policy none giữ nguyên output dù vượt budget."""
+    compactor = make_compactor(mock_ollama_client, agent_policies={"aiengineer": {"policy": "none"}})
+    outputs = {0: "y" * 20000}
+    compacted, _ = await compactor.compact("aiengineer", "task", outputs)
+    assert compacted == outputs
@@ -0,0 +1,69 @@
+"""Unit tests for HealthMonitor."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from core.health_monitor import HealthMonitor
+
+
+@pytest.fixture
+def mock_ollama_client():
+    """Mock Ollama client với hai backend."""
+    client = MagicMock()
+    client.health_check = AsyncMock(return_value=True)
+    client.refresh_residency = AsyncMock()
+    client.backend_status = MagicMock(return_value=[
+        {"url": "http://a", "healthy": True, "last_probe_latency": 0.02, "loaded_models": ["llama2:13b"]},
+        {"url": "http://b", "healthy": True, "last_probe_latency": 0.01, "loaded_models": ["codellama:13b"]},
+        {"url": "http://c", "healthy": False, "last_probe_latency": None, "loaded_models": []},
+    ])
+    return client
+
+
+def test_snapshot_empty_before_refresh(mock_ollama_client):
+    """Chưa probe lần nào thì snapshot rỗng."""
+    monitor = HealthMonitor(mock_ollama_client)
+    assert monitor.snapshot() is None
+    assert monitor.ollama_connected is False
+
+
+@pytest.mark.asyncio
+async def test_refresh_caches_state(mock_ollama_client):
+    """Refresh lưu latency, model đang nạp và trạng thái backend."""
+    monitor = HealthMonitor(mock_ollama_client)
+    await monitor.refresh()
+
+    state = monitor.snapshot()
+    assert state["ollama_connected"] is True
+    assert state["ollama_latency_ms"] == 10.0
+    assert state["loaded_models"] == ["codellama:13b", "llama2:13b"]
+    assert len(state["backends"]) == 3
+    assert monitor.ollama_connected is True
+    mock_ollama_client.refresh_residency.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_skips_residency_when_disconnected(mock_ollama_client):
+    """Ollama không khả dụng thì không discover residency."""
+    mock_ollama_client.health_check.return_value = False
+    monitor = HealthMonitor(mock_ollama_client)
+    await monitor.refresh()
+
+    assert monitor.ollama_connected is False
+    mock_ollama_client.refresh_residency.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_background_loop_refreshes_and_survives_errors(mock_ollama_client):
+    """Vòng nền vẫn chạy tiếp sau một lần probe lỗi."""
+    mock_ollama_client.health_check.side_effect = [RuntimeError("boom"), True, True, True]
+    monitor = HealthMonitor(mock_ollama_client, interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert mock_ollama_client.health_check.call_count >= 2
+    assert monitor.ollama_connected is True
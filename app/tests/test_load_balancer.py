@@ -0,0 +1,163 @@
+"""Unit tests for LoadBalancer and multi-backend OllamaClient."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest_asyncio
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.load_balancer import LoadBalancer, STRATEGY_EWMA
+from core.ollama_client import OllamaClient
+from core.schemas import OllamaRequest
+
+
+def make_ollama_app(name, delay=0.0, fail=False):
+    """Mock Ollama app trả về tên server trong response."""
+    state = {"generate_calls": 0, "fail": fail}
+
+    async def version(request):
+        if state["fail"]:
+            return web.Response(status=503)
+        return web.json_response({"version": "0.0.0"})
+
+    async def generate(request):
+        state["generate_calls"] += 1
+        if state["fail"]:
+            return web.Response(status=503)
+        body = await request.json()
+        await asyncio.sleep(delay)
+        return web.json_response({"model": body["model"], "response": name, "done": True})
+
+    app = web.Application()
+    app.router.add_get("/api/version", version)
+    app.router.add_post("/api/generate", generate)
+    return app, state
+
+
+@pytest_asyncio.fixture
+async def mock_servers():
+    """Ba mock Ollama server chạy local."""
+    servers = []
+    states = []
+    for i in range(3):
+        app, state = make_ollama_app(f"node{i}", delay=0.05)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+        states.append(state)
+    yield servers, states
+    for server in servers:
+        await server.close()
+
+
+def test_select_least_outstanding():
+    """Backend ít request đang chạy nhất được chọn."""
+    balancer = LoadBalancer(["http://a", "http://b", "http://c"])
+    balancer.backends[0].in_flight = 2
+    balancer.backends[1].in_flight = 0
+    balancer.backends[2].in_flight = 1
+
+    assert balancer.select().url == "http://b"
+
+
+def test_select_rotates_on_ties():
+    """Khi hòa điểm, các backend được chọn luân phiên."""
+    balancer = LoadBalancer(["http://a", "http://b"])
+    chosen = {balancer.select().url for _ in range(4)}
+    assert chosen == {"http://a", "http://b"}
+
+
+def test_select_ewma_prefers_fast_backend():
+    """Chiến lược EWMA ưu tiên backend có latency thấp."""
+    balancer = LoadBalancer(["http://slow", "http://fast"], strategy=STRATEGY_EWMA)
+    balancer.backends[0].record_success(2.0)
+    balancer.backends[1].record_success(0.1)
+
+    assert balancer.select().url == "http://fast"
+
+
+def test_invalid_strategy():
+    """Chiến lược không hợp lệ bị từ chối."""
+    with pytest.raises(ValueError):
+        LoadBalancer(["http://a"], strategy="random")
+
+
+def test_probe_ejects_and_reinstates():
+    """Backend bị eject sau nhiều probe lỗi và được đưa lại khi khỏe."""
+    balancer = LoadBalancer(["http://a", "http://b"], unhealthy_threshold=2)
+    backend = balancer.backends[0]
+
+    balancer.mark_probe_result(backend, False)
+    assert backend.healthy is True
+    balancer.mark_probe_result(backend, False)
+    assert backend.healthy is False
+    assert all(balancer.select().url == "http://b" for _ in range(3))
+
+    balancer.mark_probe_result(backend, True, 0.01)
+    assert backend.healthy is True
+
+
+def test_select_panic_mode_when_all_ejected():
+    """Tất cả backend bị eject thì vẫn route thay vì lỗi."""
+    balancer = LoadBalancer(["http://a"], unhealthy_threshold=1)
+    balancer.mark_probe_result(balancer.backends[0], False)
+
+    assert balancer.select().url == "http://a"
+
+
+@pytest.mark.asyncio
+async def test_track_ejects_after_request_failures():
+    """Request lỗi liên tiếp làm backend bị eject."""
+    balancer = LoadBalancer(["http://a", "http://b"], unhealthy_threshold=2)
+    backend = balancer.backends[0]
+
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientError):
+            async with balancer.track(backend):
+                raise aiohttp.ClientError("boom")
+
+    assert backend.healthy is False
+    assert backend.in_flight == 0
+    assert backend.total_failures == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_spreads_concurrent_requests(mock_servers):
+    """Request đồng thời được phân bổ đều cho các mock server."""
+    servers, states = mock_servers
+    client = OllamaClient([str(server.make_url("")) for server in servers])
+    try:
+        request = OllamaRequest(model="test-model", prompt="hi")
+        responses = await asyncio.gather(*(client.generate(request) for _ in range(9)))
+    finally:
+        await client.close()
+
+    assert {r.response for r in responses} == {"node0", "node1", "node2"}
+    assert [state["generate_calls"] for state in states] == [3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_probe_ejects_failing_server(mock_servers):
+    """Server lỗi bị eject và không nhận traffic đến khi khỏe lại."""
+    servers, states = mock_servers
+    states[1]["fail"] = True
+    client = OllamaClient([str(server.make_url("")) for server in servers])
+    threshold = client.balancer.unhealthy_threshold
+    try:
+        for _ in range(threshold):
+            await client.probe_backends()
+        assert client.balancer.backends[1].healthy is False
+
+        request = OllamaRequest(model="test-model", prompt="hi")
+        responses = [await client.generate(request) for _ in range(4)]
+        assert "node1" not in {r.response for r in responses}
+        assert states[1]["generate_calls"] == 0
+
+        states[1]["fail"] = False
+        assert await client.health_check() is True
+        assert client.balancer.backends[1].healthy is True
+    finally:
+        await client.close()
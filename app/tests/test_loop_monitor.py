@@ -0,0 +1,57 @@
+"""Unit tests for the event loop monitor."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+
+from core.loop_monitor import LoopMonitor
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_measures_lag_without_blocking():
+    """Loop rảnh thì lag nhỏ và không có event."""
+    monitor = LoopMonitor(interval=0.01, threshold=0.2)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_avg_ms"] is not None
+    assert snapshot["slow_callbacks"] == 0
+    assert snapshot["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_recorded_with_stack():
+    """Callback chặn loop quá ngưỡng được ghi lại cùng stack của đoạn code đang chặn."""
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.03)
+    blocking_call(0.3)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    snapshot = monitor.snapshot()
+    assert snapshot["slow_callbacks"] == 1
+    event = snapshot["events"][0]
+    assert event["duration_ms"] >= 200
+    assert any("blocking_call" in line for line in event["stack"])
+    assert snapshot["lag_max_ms"] >= 200
+
+
+def test_disabled_monitor_does_not_start():
+    """interval=0 thì không chạy watchdog."""
+    monitor = LoopMonitor(interval=0)
+
+    async def scenario():
+        monitor.start()
+
+    asyncio.run(scenario())
+    assert monitor.snapshot()["running"] is False
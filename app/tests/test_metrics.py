@@ -0,0 +1,72 @@
+"""Unit tests for Prometheus metrics."""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from core import metrics
+from core.schemas import OllamaResponse
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_observe_generation_records_ollama_timings():
+    """Timing Ollama trả về được đổi sang giây và tính tokens/s."""
+    before_tokens = sample("aio_ollama_generated_tokens_total", model="m-metrics")
+    before_tps = sample("aio_ollama_tokens_per_second_count", model="m-metrics")
+    result = OllamaResponse(
+        model="m-metrics", response="ok", done=True,
+        total_duration=3_000_000_000, load_duration=1_000_000_000,
+        prompt_eval_count=40, prompt_eval_duration=500_000_000,
+        eval_count=100, eval_duration=2_000_000_000
+    )
+
+    metrics.observe_generation("m-metrics", "http://a:11434", 3.2, result)
+
+    assert sample("aio_ollama_generated_tokens_total", model="m-metrics") - before_tokens == 100
+    assert sample("aio_ollama_tokens_per_second_count", model="m-metrics") - before_tps == 1
+    # 100 tokens / 2s = 50 tokens/s
+    assert sample("aio_ollama_tokens_per_second_bucket", model="m-metrics", le="50.0") >= 1
+    assert sample("aio_ollama_load_duration_seconds_sum", model="m-metrics") >= 1.0
+    assert sample("aio_ollama_generate_total", model="m-metrics", backend="http://a:11434", status="success") >= 1
+
+
+def test_observe_generation_without_timings():
+    """Response thiếu timing (ví dụ từ cache của proxy) không làm lỗi."""
+    metrics.observe_generation("m-bare", "http://a:11434", 0.1, OllamaResponse(model="m-bare", response="", done=True))
+
+    assert sample("aio_ollama_tokens_per_second_count", model="m-bare") == 0
+
+
+def test_middleware_uses_route_template():
+    """Label route là template, không phải path thật."""
+    app = FastAPI()
+    app.middleware("http")(metrics.metrics_middleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    before = sample("aio_http_requests_total", method="GET", route="/items/{item_id}", status="200")
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    assert sample("aio_http_requests_total", method="GET", route="/items/{item_id}", status="200") - before == 2
+    assert sample("aio_http_requests_total", method="GET", route="unmatched", status="404") >= 1
+
+
+def test_render_latest_exposes_metrics():
+    """Output là text exposition của Prometheus."""
+    metrics.observe_agent("aiengineer", 0.5, True)
+
+    body, content_type = metrics.render_latest()
+
+    assert content_type.startswith("text/plain")
+    assert b"aio_agent_request_duration_seconds_bucket" in body
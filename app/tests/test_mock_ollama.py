@@ -0,0 +1,204 @@
+"""Integration tests: OllamaClient against the mock Ollama server over real HTTP."""
+import pytest
+import pytest_asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp.test_utils import TestServer
+from unittest.mock import MagicMock
+
+from core.ollama_client import OllamaClient
+from core.plan_parser import parse_plan, plan_json_schema
+from core.resilience import RetryPolicy
+from core.schemas import AgentRequest, AgentResponse, OllamaRequest
+from core.task_pipeline import TaskPipeline
+from mock_ollama import MOCK_KEY, MockOllama, create_app
+
+
+@pytest_asyncio.fixture
+async def mock_server():
+    """Mock Ollama chạy trên port ngẫu nhiên; test chỉnh cấu hình qua `server.app[MOCK_KEY]`."""
+    server = TestServer(create_app(MockOllama(tokens_per_second=1000, output_tokens=20, seed=1)))
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest_asyncio.fixture
+async def client(mock_server):
+    client = OllamaClient([str(mock_server.make_url("")).rstrip("/")])
+    client.retry = RetryPolicy(attempts=0)
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_generate_reports_ollama_timings(client, mock_server):
+    """Generate trả response và các duration như Ollama, kể cả thời gian nạp model."""
+    mock_server.app[MOCK_KEY].load_delay = 0.05
+
+    first = await client.generate(OllamaRequest(model="m", prompt="x" * 400))
+    second = await client.generate(OllamaRequest(model="m", prompt="x" * 400))
+
+    assert first.eval_count == 20 and first.prompt_eval_count == 100
+    assert first.load_duration >= 50_000_000
+    assert second.load_duration == 0
+    assert first.eval_duration == pytest.approx(20_000_000)
+
+
+@pytest.mark.asyncio
+async def test_streaming_generate_emits_ndjson_chunks(mock_server):
+    """stream=true trả nhiều dòng NDJSON, dòng cuối có done và thống kê."""
+    mock_server.app[MOCK_KEY].tokens_per_second = 200
+    async with aiohttp.ClientSession() as session:
+        async with session.post(mock_server.make_url("/api/generate"), json={"model": "m", "prompt": "hi"}) as response:
+            lines = [json.loads(line) async for line in response.content if line.strip()]
+
+    assert len(lines) > 2
+    assert all(not line["done"] for line in lines[:-1])
+    assert lines[-1]["done"] and lines[-1]["eval_count"] == 20
+    assert "".join(line["response"] for line in lines).startswith("lorem ipsum")
+
+
+@pytest.mark.asyncio
+async def test_num_parallel_queues_requests(client, mock_server):
+    """Với num_parallel=1 các request cùng model bị xếp hàng, không chạy song song."""
+    mock = mock_server.app[MOCK_KEY]
+    mock.tokens_per_second = 200  # 20 token = 0.1s
+
+    started = time.monotonic()
+    await asyncio.gather(*(client.generate(OllamaRequest(model="m", prompt="p")) for _ in range(3)))
+
+    assert mock.max_active == 1
+    assert time.monotonic() - started >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_model_swap_penalty(client, mock_server):
+    """Vượt max_loaded_models thì model cũ bị gỡ và phải chịu swap penalty."""
+    mock = mock_server.app[MOCK_KEY]
+    mock.configure({"max_loaded_models": 1, "swap_penalty": 0.05})
+
+    await client.generate(OllamaRequest(model="a", prompt="p"))
+    swapped = await client.generate(OllamaRequest(model="b", prompt="p"))
+    running = await client.list_running_models()
+
+    assert mock.stats["swaps"] == 1
+    assert swapped.load_duration >= 50_000_000
+    assert [model["name"] for model in running["models"]] == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_failure_injection_and_queue_limit(client, mock_server):
+    """Lỗi inject trả HTTP lỗi cấu hình; hàng đợi đầy trả 503."""
+    mock = mock_server.app[MOCK_KEY]
+    mock.configure({"failure_rate": 1.0, "failure_status": 502})
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        await client.generate(OllamaRequest(model="m", prompt="p"))
+    assert error.value.status == 502
+
+    mock.configure({"failure_rate": 0.0, "max_queue": 0})
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        await client.generate(OllamaRequest(model="m", prompt="p"))
+    assert error.value.status == 503
+
+
+@pytest.mark.asyncio
+async def test_structured_output_parses_as_plan(client):
+    """`format` là JSON schema thì output là JSON hợp lệ theo schema."""
+    agents = ["coder", "writer"]
+    result = await client.generate(OllamaRequest(model="m", prompt="plan", format=plan_json_schema(agents)))
+
+    tasks = parse_plan(result.response, agents)
+
+    assert tasks[0]["agent_type"] == "coder"
+
+
+@pytest.mark.asyncio
+async def test_chat_embed_and_metadata_endpoints(client, mock_server):
+    """chat, embed, tags, ps và version có dạng response của Ollama."""
+    mock_server.app[MOCK_KEY].models = ["m"]
+    async with aiohttp.ClientSession() as session:
+        async with session.post(mock_server.make_url("/api/chat"), json={
+            "model": "m", "stream": False, "messages": [{"role": "user", "content": "hi"}]
+        }) as response:
+            chat = await response.json()
+        async with session.post(mock_server.make_url("/api/embed"), json={"model": "m", "input": ["a", "b"]}) as response:
+            embed = await response.json()
+        async with session.post(mock_server.make_url("/api/generate"), json={"model": "missing", "prompt": "p"}) as response:
+            missing = response.status
+        async with session.get(mock_server.make_url("/api/version")) as response:
+            version = await response.json()
+
+    assert chat["message"]["role"] == "assistant" and chat["done"]
+    assert len(embed["embeddings"]) == 2 and len(embed["embeddings"][0]) == 384
+    assert missing == 404
+    assert version["version"]
+    assert (await client.list_models())["models"][0]["name"] == "m"
+    assert await client.health_check() is True
+
+
+@pytest.mark.asyncio
+async def test_preload_and_unload(client, mock_server):
+    """Prompt rỗng nạp model; keep_alive=0 gỡ model."""
+    mock = mock_server.app[MOCK_KEY]
+
+    await client.preload("m", "5m")
+    assert list(mock.loaded) == ["m"]
+    await client.preload("m", 0)
+    assert list(mock.loaded) == []
+
+
+@pytest.mark.asyncio
+async def test_structured_response_and_ttft_stats(client, mock_server):
+    """structured_response thay output có format; TTFT gồm thời gian chờ slot, reset xóa số liệu."""
+    mock = mock_server.app[MOCK_KEY]
+    plan = {"tasks": [{"task_description": "t", "agent_type": "writer", "priority": 1, "dependencies": []}]}
+    mock.configure({"structured_response": plan, "tokens_per_second": 200})
+
+    result = await client.generate(OllamaRequest(model="m", prompt="plan", format=plan_json_schema(["writer"])))
+    await asyncio.gather(*(client.generate(OllamaRequest(model="m", prompt="p")) for _ in range(2)))
+    stats = mock.snapshot()
+
+    assert json.loads(result.response) == plan
+    assert stats["ttft_ms"]["p99"] >= 100  # request thứ hai chờ request đầu sinh xong 20 token
+    mock.reset_stats()
+    assert mock.snapshot()["ttft_ms"]["p50"] is None and mock.stats == {}
+
+
+@pytest.mark.asyncio
+async def test_failing_task_does_not_stack_client_and_task_retries(client, mock_server):
+    """Task có retry: client không retry thêm, mỗi lần thử của task chỉ gửi một generate."""
+    mock = mock_server.app[MOCK_KEY]
+    mock.configure({"failure_rate": 1.0, "failure_status": 503})
+    client.retry = RetryPolicy(attempts=1, backoff_base=0.0)
+
+    async def process_request(request: AgentRequest):
+        try:
+            await client.generate(OllamaRequest(model="m", prompt=request.message))
+        except aiohttp.ClientError as e:
+            return AgentResponse(agent_type=request.agent_type, response="", success=False, error=str(e))
+        return AgentResponse(agent_type=request.agent_type, response="ok", success=True)
+
+    manager = MagicMock()
+    manager.process_request = process_request
+    pipeline = TaskPipeline(manager, default_retry=RetryPolicy(attempts=1, backoff_base=0.0))
+    tasks = [{"task_description": "a", "agent_type": "coder", "priority": 1, "dependencies": []}]
+
+    run = await pipeline.run(tasks)
+
+    assert run.results[0].success is False
+    assert run.results[0].metadata["attempts"] == 2
+    assert mock.stats["injected_failures"] == 2  # không phải 2 × 2
+
+    # Gọi trực tiếp (ngoài pipeline) thì client vẫn tự retry
+    mock.reset_stats()
+    with pytest.raises(aiohttp.ClientError):
+        await client.generate(OllamaRequest(model="m", prompt="p"))
+    assert mock.stats["injected_failures"] == 2
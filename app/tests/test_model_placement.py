@@ -0,0 +1,108 @@
+"""Unit tests for ModelPlacement."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.load_balancer import LoadBalancer
+from core.model_placement import ModelPlacement, normalize_model_name
+from core.ollama_client import OllamaClient
+
+
+def make_balancer(rules=None, max_in_flight=2):
+    """Balancer với ba node a, b, c."""
+    return LoadBalancer(
+        ["http://a", "http://b", "http://c"],
+        placement=ModelPlacement(rules, max_in_flight=max_in_flight)
+    )
+
+
+def test_normalize_model_name():
+    """Tên model không có tag được gán tag latest."""
+    assert normalize_model_name("llama2") == "llama2:latest"
+    assert normalize_model_name("llama2:13b") == "llama2:13b"
+
+
+def test_static_rule_routes_to_assigned_nodes():
+    """Rule tĩnh chỉ route model đến các node được gán."""
+    balancer = make_balancer({"codellama:13b": ["http://b"], "llama2:13b": ["http://a", "http://c"]})
+
+    assert {balancer.select("codellama:13b").url for _ in range(4)} == {"http://b"}
+    assert {balancer.select("llama2:13b").url for _ in range(4)} == {"http://a", "http://c"}
+
+
+def test_resident_node_preferred():
+    """Không có rule thì ưu tiên node đang giữ model trong bộ nhớ."""
+    balancer = make_balancer()
+    balancer.update_residency(balancer.backends[2], {"llama2:13b"}, {"llama2:13b"})
+
+    assert balancer.select("llama2:13b").url == "http://c"
+
+
+def test_available_node_preferred_when_not_loaded():
+    """Model chưa nạp thì ưu tiên node đã pull model."""
+    balancer = make_balancer()
+    balancer.update_residency(balancer.backends[1], set(), {"llama2:13b"})
+
+    assert balancer.select("llama2").url != "http://b"
+    assert balancer.select("llama2:13b").url == "http://b"
+
+
+def test_spill_over_when_preferred_saturated():
+    """Node ưu tiên bão hòa thì spill-over sang node có thể phục vụ model."""
+    balancer = make_balancer({"codellama:13b": ["http://a"]}, max_in_flight=2)
+    balancer.backends[0].in_flight = 2
+    balancer.update_residency(balancer.backends[1], set(), {"llama2:13b"})
+    balancer.update_residency(balancer.backends[2], set(), {"codellama:13b"})
+
+    assert balancer.select("codellama:13b").url == "http://c"
+
+
+def test_no_spill_over_when_all_saturated():
+    """Mọi node đều bận thì vẫn xếp hàng trên node ưu tiên."""
+    balancer = make_balancer({"codellama:13b": ["http://a"]}, max_in_flight=1)
+    for backend in balancer.backends:
+        backend.in_flight = 1
+
+    assert balancer.select("codellama:13b").url == "http://a"
+
+
+def test_unknown_model_uses_all_nodes():
+    """Model chưa biết được phân bổ trên tất cả node."""
+    balancer = make_balancer()
+    assert {balancer.select("mistral").url for _ in range(6)} == {"http://a", "http://b", "http://c"}
+
+
+@pytest_asyncio.fixture
+async def residency_server():
+    """Mock Ollama server trả về /api/ps và /api/tags."""
+    async def ps(request):
+        return web.json_response({"models": [{"name": "codellama:13b", "model": "codellama:13b"}]})
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": "codellama:13b"}, {"name": "llama2:13b"}]})
+
+    app = web.Application()
+    app.router.add_get("/api/ps", ps)
+    app.router.add_get("/api/tags", tags)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_residency_discovers_models(residency_server):
+    """Residency được discover từ /api/ps và /api/tags."""
+    client = OllamaClient([str(residency_server.make_url(""))])
+    try:
+        await client.refresh_residency()
+    finally:
+        await client.close()
+
+    backend = client.balancer.backends[0]
+    assert backend.loaded_models == {"codellama:13b"}
+    assert backend.available_models == {"codellama:13b", "llama2:13b"}
@@ -0,0 +1,165 @@
+"""Unit tests for ModelResidencyManager."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import AsyncMock, MagicMock
+import aiohttp
+from core.model_residency import ModelResidencyManager
+
+
+@pytest.fixture
+def mock_ollama_client():
+    """Mock Ollama client."""
+    client = MagicMock()
+    client.preload = AsyncMock()
+    client.refresh_residency = AsyncMock()
+    client.backend_status = MagicMock(return_value=[
+        {"url": "http://ollama:11434", "loaded_models": ["codellama:13b"]}
+    ])
+    return client
+
+
+def make_manager(client, **kwargs):
+    """Residency manager với cấu hình test."""
+    params = {
+        "warmup_models": ["codellama:13b", "llama2"],
+        "critical_models": ["codellama:13b"],
+        "keep_alive_hot": "30m",
+        "keep_alive_default": "5m",
+        "hot_min_requests": 2,
+    }
+    params.update(kwargs)
+    return ModelResidencyManager(client, **params)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_preloads_models_and_flips_ready(mock_ollama_client):
+    """Warm-up nạp tất cả model và bật ready khi critical đã warm."""
+    manager = make_manager(mock_ollama_client)
+    assert manager.is_ready is False
+
+    await manager.warm_up()
+
+    assert manager.is_ready is True
+    assert manager.warm_models == {"codellama:13b", "llama2:latest"}
+    calls = {call.args for call in mock_ollama_client.preload.call_args_list}
+    assert calls == {("codellama:13b", "30m"), ("llama2:latest", "5m")}
+
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_keeps_not_ready(mock_ollama_client):
+    """Model critical warm-up lỗi thì chưa ready."""
+    mock_ollama_client.preload.side_effect = aiohttp.ClientError("down")
+    manager = make_manager(mock_ollama_client)
+
+    await manager.warm_up()
+
+    assert manager.is_ready is False
+    assert "codellama:13b" in manager.status()["failed_models"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_until_ollama_recovers(mock_ollama_client):
+    """Ollama chưa chạy lúc startup: vòng bảo trì thử lại với backoff và bật ready khi Ollama hồi phục."""
+    import asyncio
+    mock_ollama_client.preload.side_effect = aiohttp.ClientError("connection refused")
+    manager = make_manager(
+        mock_ollama_client, warmup_models=["codellama:13b"], check_interval=0, warmup_retry_base=0.02, warmup_retry_max=0.05
+    )
+    manager.start()
+    try:
+        await asyncio.sleep(0.1)
+        assert manager.is_ready is False
+        failed_calls = mock_ollama_client.preload.await_count
+        assert 2 <= failed_calls <= 5  # backoff 0.02s, 0.04s, 0.05s...
+
+        mock_ollama_client.preload.side_effect = None
+        await asyncio.sleep(0.1)
+
+        assert manager.is_ready is True
+        assert manager.status()["failed_models"] == {}
+        recovered_calls = mock_ollama_client.preload.await_count
+        await asyncio.sleep(0.06)
+        assert mock_ollama_client.preload.await_count == recovered_calls
+    finally:
+        await manager.stop()
+
+
+def test_ready_without_critical_models(mock_ollama_client):
+    """Không cấu hình model critical thì ready ngay."""
+    manager = make_manager(mock_ollama_client, critical_models=[])
+    assert manager.is_ready is True
+
+
+def test_keep_alive_follows_traffic(mock_ollama_client):
+    """Model đủ traffic gần đây được giữ với keep_alive dài."""
+    manager = make_manager(mock_ollama_client)
+    assert manager.keep_alive_for("llama2") == "5m"
+
+    manager.record_use("llama2")
+    manager.record_use("llama2:latest")
+
+    assert manager.is_hot("llama2") is True
+    assert manager.keep_alive_for("llama2") == "30m"
+    assert manager.keep_alive_for("codellama:13b") == "30m"
+
+
+@pytest.mark.asyncio
+async def test_release_idle_models(mock_ollama_client):
+    """Model hết hot được hạ keep_alive, model critical vẫn được giữ."""
+    mock_ollama_client.backend_status.return_value = [
+        {"url": "http://ollama:11434", "loaded_models": ["codellama:13b", "llama2:latest"]}
+    ]
+    manager = make_manager(mock_ollama_client)
+    manager.record_use("llama2")
+    manager.record_use("llama2")
+    manager.record_use("codellama:13b")
+    assert manager.status()["pinned_models"] == ["codellama:13b", "llama2:latest"]
+    manager._usage["llama2:latest"].clear()
+
+    await manager.release_idle_models()
+
+    mock_ollama_client.refresh_residency.assert_awaited_once()
+    mock_ollama_client.preload.assert_called_once_with("llama2:latest", "5m", options=None)
+    assert manager.status()["pinned_models"] == ["codellama:13b"]
+
+
+@pytest.mark.asyncio
+async def test_release_skips_evicted_models(mock_ollama_client):
+    """Model Ollama đã gỡ không bị preload lại chỉ để hạ keep_alive."""
+    manager = make_manager(mock_ollama_client)
+    manager.record_use("llama2")
+    manager.record_use("llama2")
+    manager._usage["llama2:latest"].clear()
+
+    await manager.release_idle_models()
+    await manager.release_idle_models()
+
+    mock_ollama_client.preload.assert_not_called()
+    mock_ollama_client.refresh_residency.assert_awaited_once()
+    assert manager.status()["pinned_models"] == []
+
+
+@pytest.mark.asyncio
+async def test_preload_uses_request_num_ctx(mock_ollama_client):
+    """Preload gửi num_ctx mà request thật dùng để Ollama không nạp lại runner."""
+    manager = make_manager(mock_ollama_client, default_num_ctx=2048)
+    manager.set_num_ctx({"codellama:13b": 4096})
+
+    await manager.warm_up()
+    manager.record_use("llama2", num_ctx=8192)
+
+    options = {call.args[0]: call.kwargs["options"] for call in mock_ollama_client.preload.call_args_list}
+    assert options == {"codellama:13b": {"num_ctx": 4096}, "llama2:latest": {"num_ctx": 2048}}
+    assert manager.preload_options("llama2") == {"num_ctx": 8192}
+
+
+def test_status_reports_loaded_models(mock_ollama_client):
+    """Status trả về model đang nạp trên từng backend."""
+    manager = make_manager(mock_ollama_client)
+    status = manager.status()
+
+    assert status["loaded_models"] == {"http://ollama:11434": ["codellama:13b"]}
+    assert status["critical_models"] == ["codellama:13b"]
@@ -44,11 +44,9 @@ async def test_get_session_reuse(ollama_client):
 async def test_generate_success(ollama_client):
     """Test successful generation."""
     mock_response = MagicMock()
-    mock_response.json = AsyncMock(return_value={
-        "model": "test-model",
-        "response": "Test response",
-        "done": True
-    })
+    mock_response.read = AsyncMock(
+        return_value=b'{"model": "test-model", "response": "Test response", "done": true}'
+    )
     mock_response.raise_for_status = MagicMock()
     
     mock_session = MagicMock()
@@ -65,6 +63,49 @@ async def test_generate_success(ollama_client):
         assert response.done is True
 
 
+@pytest.mark.asyncio
+async def test_generate_sends_orjson_payload(ollama_client):
+    """Test generate sends pre-encoded JSON bytes without null fields."""
+    import orjson
+    mock_response = MagicMock()
+    mock_response.read = AsyncMock(
+        return_value=b'{"model": "test-model", "response": "ok", "done": true}'
+    )
+    mock_response.raise_for_status = MagicMock()
+    
+    mock_session = MagicMock()
+    mock_session.post.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+    mock_session.post.return_value.__aexit__ = AsyncMock(return_value=None)
+    
+    with patch.object(ollama_client, '_get_session', return_value=mock_session):
+        await ollama_client.generate(OllamaRequest(model="test-model", prompt="Test prompt"))
+    
+    kwargs = mock_session.post.call_args.kwargs
+    payload = orjson.loads(kwargs["data"])
+    assert kwargs["headers"]["Content-Type"] == "application/json"
+    assert payload["model"] == "test-model"
+    assert "options" not in payload
+
+
+@pytest.mark.asyncio
+async def test_preload_sends_num_ctx(ollama_client):
+    """Preload gửi options num_ctx để model được nạp đúng context của request thật."""
+    import orjson
+    mock_response = MagicMock()
+    mock_response.read = AsyncMock(return_value=b'{"model": "m", "response": "", "done": true}')
+    mock_response.raise_for_status = MagicMock()
+
+    mock_session = MagicMock()
+    mock_session.post.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+    mock_session.post.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    with patch.object(ollama_client, '_get_session', return_value=mock_session):
+        await ollama_client.preload("m", "30m", options={"num_ctx": 4096})
+
+    payload = orjson.loads(mock_session.post.call_args.kwargs["data"])
+    assert payload == {"model": "m", "prompt": "", "stream": False, "keep_alive": "30m", "options": {"num_ctx": 4096}}
+
+
 @pytest.mark.asyncio
 async def test_generate_connection_error(ollama_client):
     """Test generation with connection error."""
@@ -166,4 +207,53 @@ async def test_close_session_already_closed(ollama_client):
     ollama_client._session = mock_session
     
     await ollama_client.close()
-    mock_session.close.assert_not_called()
\ No newline at end of file
+    mock_session.close.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_session_concurrent_creates_single_session(ollama_client):
+    """Test concurrent first calls share one session."""
+    import asyncio
+    sessions = await asyncio.gather(*(ollama_client._get_session() for _ in range(10)))
+    assert all(session is sessions[0] for session in sessions)
+    await ollama_client.close()
+
+
+@pytest.mark.asyncio
+async def test_session_connector_tuned(ollama_client):
+    """Test connector uses configured pool, keepalive and DNS cache settings."""
+    from config import settings
+    session = await ollama_client._get_session()
+    connector = session.connector
+    assert connector.limit_per_host == settings.OLLAMA_POOL_SIZE_PER_HOST
+    assert connector.limit == settings.OLLAMA_POOL_SIZE_PER_HOST * len(ollama_client.balancer.backends)
+    assert connector.use_dns_cache is True
+    await ollama_client.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_tracks_connection_reuse():
+    """Test pool metrics count new and reused connections."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def generate(request):
+        return web.json_response({"model": "test-model", "response": "ok", "done": True})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    server = TestServer(app)
+    await server.start_server()
+    client = OllamaClient([str(server.make_url(""))])
+    try:
+        request = OllamaRequest(model="test-model", prompt="Test prompt")
+        for _ in range(3):
+            await client.generate(request)
+        stats = client.pool_stats()
+    finally:
+        await client.close()
+        await server.close()
+
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["utilisation"] == 0
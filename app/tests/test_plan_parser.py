@@ -0,0 +1,60 @@
+"""Unit tests for planner output parsing."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.plan_parser import PlanParseError, parse_plan, plan_json_schema
+
+AGENTS = ["aiengineer", "backendarchitect"]
+TASK = '{"task_description": "Build API", "agent_type": "backendarchitect", "priority": 1, "dependencies": []}'
+
+
+def test_parse_structured_object():
+    """Output theo schema {"tasks": [...]} được parse trực tiếp."""
+    tasks = parse_plan('{"tasks": [' + TASK + ']}', AGENTS)
+    assert tasks == [{"task_description": "Build API", "agent_type": "backendarchitect",
+                      "priority": 1, "dependencies": []}]
+
+
+def test_parse_bare_array():
+    """Model cũ trả mảng trần vẫn được chấp nhận."""
+    assert len(parse_plan("[" + TASK + "]", AGENTS)) == 1
+
+
+def test_parse_fenced_block_and_think():
+    """Bỏ qua khối <think> và code fence khi model không tôn trọng format."""
+    text = "<think>hmm [x]</think>Here is the plan:\n```json\n[" + TASK + "]\n```"
+    assert parse_plan(text, AGENTS)[0]["agent_type"] == "backendarchitect"
+
+
+def test_parse_defaults_priority_and_dependencies():
+    """Priority ngoài khoảng và dependencies sai kiểu được đưa về mặc định."""
+    text = '[{"task_description": "X", "agent_type": "aiengineer", "priority": 9, "dependencies": "0"}]'
+    task = parse_plan(text, AGENTS)[0]
+    assert task["priority"] == 3
+    assert task["dependencies"] == []
+
+
+def test_parse_invalid_agent_type_reports_errors():
+    """agent_type không hợp lệ và thiếu description được liệt kê trong errors."""
+    text = '[{"task_description": "", "agent_type": "wizard"}]'
+    with pytest.raises(PlanParseError) as exc_info:
+        parse_plan(text, AGENTS)
+    assert len(exc_info.value.errors) == 2
+    assert "wizard" in str(exc_info.value)
+
+
+@pytest.mark.parametrize("text", ["This is not JSON", '{"tasks": []}', '{"plan": "x"}'])
+def test_parse_rejects_non_plan(text):
+    """Text không phải JSON hoặc plan rỗng đều bị từ chối."""
+    with pytest.raises(PlanParseError):
+        parse_plan(text, AGENTS)
+
+
+def test_plan_json_schema_enumerates_agents():
+    """Schema giới hạn agent_type trong danh sách agent."""
+    schema = plan_json_schema(AGENTS)
+    item = schema["properties"]["tasks"]["items"]
+    assert item["properties"]["agent_type"]["enum"] == AGENTS
+    assert set(item["required"]) == {"task_description", "agent_type", "priority", "dependencies"}
@@ -0,0 +1,106 @@
+"""Unit tests for on-demand CPU and memory profiling."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from core.profiler import CpuProfiler, MemoryProfiler, ProfilerBusyError
+
+
+def busy_worker(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_cpu_profile_collapsed_stacks():
+    """Stack của thread đang chạy xuất hiện trong output collapsed."""
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_worker, args=(stop,), name="busy")
+    thread.start()
+    try:
+        collapsed = await CpuProfiler().profile(0.1, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+
+    busy = [line for line in collapsed.splitlines() if line.startswith("busy;")]
+    assert busy
+    assert "busy_worker (test_profiler.py:" in busy[0]
+    assert int(busy[0].rsplit(" ", 1)[1]) > 0
+
+
+def test_cpu_profile_skips_idle_threads():
+    """Thread đang chờ Event/queue không xuất hiện trong CPU profile."""
+    stop = threading.Event()
+    waiter = threading.Thread(target=stop.wait, name="waiter")
+    busy = threading.Thread(target=busy_worker, args=(stop,), name="busy")
+    waiter.start()
+    busy.start()
+    try:
+        result = CpuProfiler().sample(0.1, interval=0.005)
+    finally:
+        stop.set()
+        waiter.join()
+        busy.join()
+
+    threads = {stack.split(";", 1)[0] for stack in result["stacks"]}
+    assert "busy" in threads
+    assert "waiter" not in threads
+    assert result["idle"] > 0
+    assert not any("sample (profiler.py:" in stack for stack in result["stacks"])
+
+
+def test_cpu_profiler_rejects_concurrent_sessions():
+    """Chỉ một phiên CPU profiling mỗi worker."""
+    profiler = CpuProfiler()
+    thread = threading.Thread(target=profiler.sample, args=(0.2,))
+    thread.start()
+    time.sleep(0.02)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.sample(0.01)
+    finally:
+        thread.join()
+
+
+@pytest.mark.asyncio
+async def test_memory_profile_reports_growth():
+    """Một phiên profiling chỉ ra dòng cấp phát trong khoảng đo và tắt tracemalloc sau đó."""
+    profiler = MemoryProfiler()
+    was_tracing = tracemalloc.is_tracing()
+    retained = []
+
+    async def allocate():
+        await asyncio.sleep(0.01)
+        retained.extend(bytearray(1024) for _ in range(200))
+
+    task = asyncio.create_task(allocate())
+    base, target = await profiler.profile(0.05)
+    await task
+
+    diff = profiler.diff(base, target)
+    assert len(retained) == 200
+    assert diff.startswith(f"# pid {os.getpid()}:")
+    assert "test_profiler.py" in diff.splitlines()[1]
+    assert len(profiler.dump(target)) > 0
+    assert tracemalloc.is_tracing() == was_tracing
+    assert profiler.status()["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_memory_profiler_rejects_concurrent_sessions():
+    """Chỉ một phiên memory profiling mỗi worker."""
+    profiler = MemoryProfiler()
+    session = asyncio.create_task(profiler.profile(0.1))
+    await asyncio.sleep(0.02)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            await profiler.profile(0.01)
+    finally:
+        await session
@@ -0,0 +1,137 @@
+"""Unit tests for Ollama record & replay."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core import json_codec
+from core.ollama_client import OllamaClient
+from core.recording import MATCH_MODEL, MATCH_SEQUENCE, OllamaRecorder, OllamaReplay, ReplayMissError, request_key
+from core.schemas import OllamaRequest
+
+
+def response_body(model="m", text="ok"):
+    return json_codec.dumps({"model": model, "response": text, "done": True, "context": [1, 2, 3], "eval_count": 5})
+
+
+async def record_calls(path, calls):
+    recorder = OllamaRecorder(path)
+    for request, text in calls:
+        await recorder.record(request, response_body(request.model, text), 0.2, 0.05, [(0.05, 10), (0.2, 20)])
+    return recorder
+
+
+def test_request_key_ignores_keep_alive():
+    """Key chỉ phụ thuộc các field quyết định output."""
+    a = OllamaRequest(model="m", prompt="p", options={"temperature": 0}, keep_alive="5m")
+    b = OllamaRequest(model="m", prompt="p", options={"temperature": 0})
+
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(OllamaRequest(model="m", prompt="q"))
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_round_trip(tmp_path):
+    """Bản ghi được đọc lại và phát lại đúng response, không kèm context."""
+    path = str(tmp_path / "rec.jsonl")
+    request = OllamaRequest(model="m", prompt="hello")
+    recorder = await record_calls(path, [(request, "first")])
+
+    replay = OllamaReplay.load(path, time_scale=0)
+    result = await replay.generate(request)
+
+    assert recorder.recorded == 1
+    assert result.response == "first"
+    assert result.context is None
+    assert replay.entries[0]["chunks"] == [[0.05, 10], [0.2, 20]]
+    assert replay.models() == ["m"]
+
+
+@pytest.mark.asyncio
+async def test_replay_match_modes(tmp_path):
+    """request khớp đúng prompt; model và sequence quay vòng."""
+    path = str(tmp_path / "rec.jsonl")
+    a = OllamaRequest(model="m", prompt="a")
+    b = OllamaRequest(model="m", prompt="b")
+    await record_calls(path, [(a, "A"), (b, "B")])
+    other = OllamaRequest(model="m", prompt="other")
+
+    by_request = OllamaReplay.load(path, time_scale=0)
+    by_model = OllamaReplay.load(path, time_scale=0, match=MATCH_MODEL)
+    by_sequence = OllamaReplay.load(path, time_scale=0, match=MATCH_SEQUENCE)
+
+    assert (await by_request.generate(b)).response == "B"
+    assert [(await by_model.generate(other)).response for _ in range(3)] == ["A", "B", "A"]
+    assert (await by_sequence.generate(OllamaRequest(model="x", prompt="y"))).response == "A"
+    with pytest.raises(ReplayMissError):
+        await by_request.generate(other)
+    assert by_request.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_scales_recorded_time(tmp_path):
+    """Thời gian chờ bằng thời gian gốc nhân time_scale."""
+    path = str(tmp_path / "rec.jsonl")
+    request = OllamaRequest(model="m", prompt="p")
+    await record_calls(path, [(request, "ok")])
+
+    replay = OllamaReplay.load(path, time_scale=0.5)
+    started = time.monotonic()
+    await replay.generate(request)
+
+    assert time.monotonic() - started >= 0.09
+
+
+def test_invalid_match_mode():
+    with pytest.raises(ValueError):
+        OllamaReplay([], match="bogus")
+
+
+@pytest.mark.asyncio
+async def test_client_records_generate(tmp_path):
+    """OllamaClient ghi lại generate thật khi bật recorder."""
+    body = response_body(text="recorded")
+
+    async def iter_any():
+        yield body[:10]
+        yield body[10:]
+
+    mock_response = MagicMock()
+    mock_response.raise_for_status = MagicMock()
+    mock_response.content.iter_any = iter_any
+    mock_session = MagicMock()
+    mock_session.post.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+    mock_session.post.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    client = OllamaClient()
+    client.recorder = OllamaRecorder(str(tmp_path / "rec.jsonl"))
+    request = OllamaRequest(model="m", prompt="p")
+    with patch.object(client, "_get_session", return_value=mock_session):
+        result = await client.generate(request)
+
+    replay = OllamaReplay.load(client.recorder.path, time_scale=0)
+    assert result.response == "recorded"
+    assert len(replay.entries[0]["chunks"]) == 2
+    assert (await replay.generate(request)).response == "recorded"
+
+
+@pytest.mark.asyncio
+async def test_client_uses_replay_without_ollama(tmp_path):
+    """Khi replay, client không gọi Ollama và báo các model trong bản ghi."""
+    path = str(tmp_path / "rec.jsonl")
+    request = OllamaRequest(model="m", prompt="p")
+    await record_calls(path, [(request, "replayed")])
+
+    client = OllamaClient()
+    client.replay = OllamaReplay.load(path, time_scale=0)
+    with patch.object(client, "_get_session", side_effect=AssertionError("no network in replay")):
+        result = await client.generate(request)
+        models = await client.list_models()
+        healthy = await client.health_check()
+
+    assert result.response == "replayed"
+    assert models["models"][0]["name"] == "m"
+    assert healthy is True
@@ -0,0 +1,188 @@
+"""Unit tests for retry, hedging and circuit breaking."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import pytest_asyncio
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from unittest.mock import patch
+from core.ollama_client import OllamaClient
+from core.resilience import (CircuitBreaker, CircuitOpenError, LatencyTracker, RetryPolicy,
+                             is_retryable, CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN)
+from core.schemas import OllamaRequest
+
+
+def make_app(name, state):
+    """Mock Ollama app với độ trễ và lỗi điều khiển qua state."""
+    async def generate(request):
+        state["calls"] += 1
+        if state.get("status", 200) != 200:
+            return web.Response(status=state["status"])
+        try:
+            await asyncio.sleep(state.get("delay", 0.0))
+        except asyncio.CancelledError:
+            state["cancelled"] = state.get("cancelled", 0) + 1
+            raise
+        return web.json_response({"model": "test-model", "response": name, "done": True})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    return app
+
+
+@pytest_asyncio.fixture
+async def two_servers():
+    """Hai mock Ollama server với state riêng."""
+    states = [{"calls": 0}, {"calls": 0}]
+    servers = [TestServer(make_app(f"node{i}", states[i])) for i in range(2)]
+    for server in servers:
+        await server.start_server()
+    yield servers, states
+    for server in servers:
+        await server.close()
+
+
+def make_client(servers):
+    """OllamaClient trỏ đến các mock server, backoff ngắn cho test."""
+    client = OllamaClient([str(server.make_url("")) for server in servers])
+    client.retry = RetryPolicy(attempts=2, backoff_base=0.01, backoff_max=0.01)
+    return client
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    """Circuit mở sau ngưỡng lỗi, half-open sau reset_timeout và đóng khi thử thành công."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.is_available() is False
+
+    time.sleep(0.06)
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert breaker.is_available() is True
+    breaker.on_request_start()
+    assert breaker.is_available() is False
+
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_circuit_breaker_reopens_on_failed_trial():
+    """Request thử nghiệm half-open lỗi thì circuit mở lại."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    breaker.on_request_start()
+    breaker.record_failure()
+    assert breaker._state == CIRCUIT_OPEN
+
+
+def test_retry_backoff_bounds():
+    """Backoff có jitter nằm trong [0, min(max, base * 2^attempt)]."""
+    policy = RetryPolicy(attempts=3, backoff_base=0.5, backoff_max=1.0)
+    for attempt in range(5):
+        delay = policy.backoff(attempt)
+        assert 0 <= delay <= min(1.0, 0.5 * 2 ** attempt)
+
+
+def test_is_retryable():
+    """Chỉ lỗi tạm thời mới được retry."""
+    request_info = aiohttp.RequestInfo(url="http://x", method="POST", headers={}, real_url="http://x")
+    assert is_retryable(aiohttp.ClientResponseError(request_info, (), status=503)) is True
+    assert is_retryable(aiohttp.ClientResponseError(request_info, (), status=404)) is False
+    assert is_retryable(asyncio.TimeoutError()) is True
+    assert is_retryable(CircuitOpenError("open")) is False
+
+
+def test_latency_percentile():
+    """Percentile chỉ có khi đủ mẫu."""
+    tracker = LatencyTracker()
+    for value in range(1, 11):
+        tracker.record("m", float(value))
+    assert tracker.percentile("m", 90, min_samples=5) == 9.0
+    assert tracker.percentile("m", 50, min_samples=20) is None
+    assert tracker.percentile("other", 50) is None
+
+
+@pytest.mark.asyncio
+async def test_generate_retries_on_other_backend(two_servers):
+    """Backend trả 503 thì request được retry sang backend còn lại."""
+    servers, states = two_servers
+    states[0]["status"] = 503
+    client = make_client(servers)
+    try:
+        response = await client.generate(OllamaRequest(model="test-model", prompt="hi"))
+    finally:
+        await client.close()
+
+    assert response.response == "node1"
+    assert states[0]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_does_not_retry_client_errors(two_servers):
+    """Lỗi 4xx không được retry."""
+    servers, states = two_servers
+    for state in states:
+        state["status"] = 404
+    client = make_client(servers)
+    try:
+        with pytest.raises(aiohttp.ClientResponseError):
+            await client.generate(OllamaRequest(model="test-model", prompt="hi"))
+    finally:
+        await client.close()
+
+    assert states[0]["calls"] + states[1]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_open_fails_fast(two_servers):
+    """Khi mọi circuit đều mở, request bị từ chối ngay mà không gọi backend."""
+    servers, states = two_servers
+    for state in states:
+        state["status"] = 500
+    client = make_client(servers)
+    for backend in client.balancer.backends:
+        backend.circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    try:
+        with pytest.raises(aiohttp.ClientError):
+            await client.generate(OllamaRequest(model="test-model", prompt="hi"))
+        assert states[0]["calls"] == 1 and states[1]["calls"] == 1
+        calls_before = states[0]["calls"] + states[1]["calls"]
+
+        started = time.monotonic()
+        with pytest.raises(CircuitOpenError):
+            await client.generate(OllamaRequest(model="test-model", prompt="hi"))
+        assert time.monotonic() - started < 0.5
+        assert states[0]["calls"] + states[1]["calls"] == calls_before
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cancels_slow_backend(two_servers):
+    """Request chậm hơn percentile được hedge sang backend khác, bên thua bị hủy."""
+    servers, states = two_servers
+    states[0]["delay"] = 2.0
+    client = make_client(servers)
+    for _ in range(5):
+        client.latency.record("test-model", 0.05)
+    try:
+        with patch("core.ollama_client.settings.OLLAMA_HEDGE_ENABLED", True), \
+                patch("core.ollama_client.settings.OLLAMA_HEDGE_MIN_SAMPLES", 5):
+            started = time.monotonic()
+            response = await client.generate(OllamaRequest(model="test-model", prompt="hi"))
+            elapsed = time.monotonic() - started
+        await asyncio.sleep(0.05)
+    finally:
+        await client.close()
+
+    assert response.response == "node1"
+    assert elapsed < 1.0
+    assert client.balancer.backends[0].in_flight == 0
@@ -0,0 +1,97 @@
+"""Unit tests for the content-addressed task result cache."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from unittest.mock import MagicMock, patch
+from agents.profile import AgentProfile
+from agents.profile_agent import ProfileAgent
+from core.result_cache import ResultCache, SqliteResultCache, content_hash
+from core.schemas import AgentResponse
+
+
+def make_response(text="ok", success=True):
+    """AgentResponse mẫu."""
+    return AgentResponse(agent_type="aiengineer", response=text, success=success)
+
+
+def test_key_is_stable_and_content_addressed():
+    """Key không phụ thuộc thứ tự key của context, đổi bất kỳ thành phần nào thì key đổi."""
+    base = ResultCache.make_key("aiengineer", "fp", "task", [content_hash("a")], {"x": 1, "y": 2})
+    assert base == ResultCache.make_key("aiengineer", "fp", "task", [content_hash("a")], {"y": 2, "x": 1})
+    assert base != ResultCache.make_key("aiengineer", "fp2", "task", [content_hash("a")], {"x": 1, "y": 2})
+    assert base != ResultCache.make_key("aiengineer", "fp", "task", [content_hash("b")], {"x": 1, "y": 2})
+    assert base != ResultCache.make_key("aiengineer", "fp", "task!", [content_hash("a")], {"x": 1, "y": 2})
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    """Tạo cache theo từng backend với cùng tham số."""
+    def factory(**kwargs):
+        if request.param == "memory":
+            return ResultCache(**kwargs)
+        return SqliteResultCache(str(tmp_path / "data" / "results.sqlite3"), **kwargs)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_get_put_and_lru_eviction(make_cache):
+    """Entry ít dùng gần đây nhất bị loại khi đầy, kết quả lỗi không được cache."""
+    cache = make_cache(max_entries=2)
+    await cache.put("a", make_response("A"))
+    await cache.put("b", make_response("B"))
+    with patch("core.result_cache.time.time", return_value=time.time() + 1):
+        assert (await cache.get("a")).response == "A"
+        await cache.put("c", make_response("C"))
+    assert await cache.get("b") is None
+    await cache.put("d", make_response("", success=False))
+    assert await cache.get("d") is None
+    stats = await cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry(make_cache):
+    """Entry hết hạn sau TTL."""
+    cache = make_cache(ttl=10)
+    await cache.put("a", make_response())
+    with patch("core.result_cache.time.monotonic", return_value=time.monotonic() + 11), \
+            patch("core.result_cache.time.time", return_value=time.time() + 11):
+        assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_get_returns_copy(make_cache):
+    """Sửa kết quả lấy ra không ảnh hưởng entry trong cache."""
+    cache = make_cache()
+    await cache.put("a", make_response())
+    (await cache.get("a")).metadata = {"cached": True}
+    assert (await cache.get("a")).metadata is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_shared_between_workers(tmp_path):
+    """Worker khác (instance khác cùng file) thấy kết quả đã cache; clear xóa cho mọi worker."""
+    path = str(tmp_path / "results.sqlite3")
+    await SqliteResultCache(path).put("a", make_response("A"))
+    other = SqliteResultCache(path)
+
+    assert (await other.get("a")).response == "A"
+    assert await other.clear() == 1
+    assert await SqliteResultCache(path).get("a") is None
+
+
+def test_profile_fingerprint_tracks_prompt_model_and_options():
+    """Đổi prompt, model hoặc options thì fingerprint đổi."""
+    def fingerprint(**fields):
+        profile = AgentProfile(**{"agent_type": "x", "system_prompt": "p", "model": "m", **fields})
+        return ProfileAgent(MagicMock(), profile).fingerprint()
+
+    base = fingerprint()
+    assert base == fingerprint()
+    assert base != fingerprint(system_prompt="p2")
+    assert base != fingerprint(model="m2")
+    assert base != fingerprint(options={"temperature": 0.1})
@@ -0,0 +1,76 @@
+"""Unit tests for the SQLite run checkpoint store."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+from unittest.mock import patch
+from core.run_store import RUN_COMPLETED, RUN_RUNNING, RunStore
+from core.schemas import AgentResponse
+
+TASKS = [{"task_description": "t0", "agent_type": "aiengineer", "priority": 1, "dependencies": []}]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Store trong thư mục tạm."""
+    return RunStore(str(tmp_path / "data" / "runs.sqlite3"))
+
+
+@pytest.mark.asyncio
+async def test_create_save_and_load(store):
+    """Plan, kết quả task và trạng thái được lưu và đọc lại."""
+    await store.create_run("r1", "build app", TASKS, {"user": "u1"})
+    await store.save_result("r1", 0, AgentResponse(agent_type="aiengineer", response="done", metadata={"model": "m"}))
+
+    saved = await store.load_run("r1")
+    assert saved["status"] == RUN_RUNNING
+    assert saved["tasks"] == TASKS
+    assert saved["context"] == {"user": "u1"}
+    assert saved["results"][0].response == "done"
+    assert saved["results"][0].metadata == {"model": "m"}
+
+    await store.set_status("r1", RUN_COMPLETED)
+    assert (await store.load_run("r1"))["status"] == RUN_COMPLETED
+    assert await store.load_run("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_survives_new_instance(store):
+    """Checkpoint đọc được từ instance khác (worker khác hoặc sau restart)."""
+    await store.create_run("r1", "m", TASKS)
+    await store.save_result("r1", 0, AgentResponse(agent_type="aiengineer", response="x"))
+    assert (await RunStore(store.path).load_run("r1"))["results"][0].response == "x"
+
+
+@pytest.mark.asyncio
+async def test_prune_old_runs(store):
+    """Run cũ hơn retention bị xóa; store chưa tồn tại thì bỏ qua."""
+    assert await store.prune(3600) == 0
+    await store.create_run("old", "m", TASKS)
+    with patch("core.run_store.time.time", return_value=time.time() + 7200):
+        await store.create_run("new", "m", TASKS)
+        assert await store.prune(3600) == 1
+    assert await store.load_run("old") is None
+    assert await store.load_run("new") is not None
+
+
+@pytest.mark.asyncio
+async def test_claim_respects_lease(tmp_path):
+    """Chỉ một worker claim được run; run RUNNING quá lease_timeout được claim lại, heartbeat gia hạn lease."""
+    store = RunStore(str(tmp_path / "runs.sqlite3"), lease_timeout=0.2)
+    await store.create_run("r1", "m", TASKS)
+    assert await store.claim("r1") is False
+
+    await store.set_status("r1", RUN_COMPLETED)
+    assert await store.claim("r1") is True
+    assert await store.claim("r1") is False
+
+    async with store.heartbeat("r1"):
+        await asyncio.sleep(0.3)
+        assert await store.claim("r1") is False
+    await asyncio.sleep(0.25)
+    assert await store.claim("r1") is True
+    assert await store.claim("missing") is False
@@ -107,6 +107,49 @@ async def test_analyze_and_split_request_invalid_json(orchestrator):
         assert result[0]["task_description"] == "Test request"
 
 
+@pytest.mark.asyncio
+async def test_analyze_and_split_request_uses_json_schema(orchestrator):
+    """Planner gửi JSON schema qua format và parse object {"tasks": [...]}."""
+    structured = '{"tasks": [{"task_description": "API", "agent_type": "backendarchitect", "priority": 2, "dependencies": []}]}'
+
+    with patch.object(orchestrator, 'call_ollama', return_value=structured) as mock_call:
+        result = await orchestrator.analyze_and_split_request("Test request")
+
+    schema = mock_call.call_args.kwargs["format"]
+    assert "backendarchitect" in schema["properties"]["tasks"]["items"]["properties"]["agent_type"]["enum"]
+    assert mock_call.call_args.kwargs["options"]["temperature"] == 0
+    assert result[0]["agent_type"] == "backendarchitect"
+    assert orchestrator.last_plan_error is None
+
+
+@pytest.mark.asyncio
+async def test_planner_uses_registered_capabilities(mock_ollama_client):
+    """Agent truyền vào qua capabilities (plugin, profile) được đưa vào prompt, schema và allow-list."""
+    orchestrator = TaskOrchestrator(mock_ollama_client, {"sqlexpert": "SQL tuning", "aiengineer": "AI"})
+    structured = '{"tasks": [{"task_description": "Index", "agent_type": "sqlexpert", "priority": 1, "dependencies": []}]}'
+
+    with patch.object(orchestrator, 'call_ollama', return_value=structured) as mock_call:
+        result = await orchestrator.analyze_and_split_request("Speed up queries")
+
+    schema = mock_call.call_args.kwargs["format"]
+    assert schema["properties"]["tasks"]["items"]["properties"]["agent_type"]["enum"] == ["sqlexpert", "aiengineer"]
+    assert "- sqlexpert: SQL tuning" in orchestrator.get_system_prompt()
+    assert result[0]["agent_type"] == "sqlexpert"
+    assert orchestrator.last_plan_error is None
+
+
+@pytest.mark.asyncio
+async def test_analyze_and_split_request_invalid_agent_falls_back(orchestrator):
+    """agent_type ngoài danh sách thì fallback và ghi lại lý do."""
+    invalid_agent = '{"tasks": [{"task_description": "X", "agent_type": "wizard", "priority": 1, "dependencies": []}]}'
+
+    with patch.object(orchestrator, 'call_ollama', return_value=invalid_agent):
+        result = await orchestrator.analyze_and_split_request("Test request")
+
+    assert result[0]["agent_type"] == "aiengineer"
+    assert "wizard" in orchestrator.last_plan_error
+
+
 @pytest.mark.asyncio
 async def test_analyze_and_split_request_ollama_exception(orchestrator):
     """Test request analysis when Ollama throws exception."""
@@ -0,0 +1,147 @@
+"""Unit tests for the dependency-aware task pipeline."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import AsyncMock, MagicMock
+from core.context_compaction import DependencyCompactor
+from core.resilience import RetryPolicy
+from core.result_cache import ResultCache
+from core.run_store import RUN_COMPLETED, RunStore
+from core.schemas import AgentResponse
+from core.task_pipeline import TaskPipeline
+from core.token_budget import TokenBudget
+
+
+@pytest.fixture
+def mock_agent_manager():
+    """Agent manager trả output theo agent_type."""
+    manager = MagicMock()
+
+    async def process_request(request):
+        return AgentResponse(agent_type=request.agent_type, response=f"out-{request.agent_type}", success=True)
+
+    manager.process_request = AsyncMock(side_effect=process_request)
+    manager.get_agent = MagicMock(side_effect=lambda agent_type: MagicMock(fingerprint=MagicMock(return_value=f"fp-{agent_type}")))
+    return manager
+
+
+def make_tasks(*dependencies):
+    """Task list với dependencies cho trước."""
+    return [
+        {"task_description": f"task {i}", "agent_type": f"agent{i}", "priority": 1, "dependencies": list(deps)}
+        for i, deps in enumerate(dependencies)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_runs_in_dependency_order(mock_agent_manager):
+    """Task chạy sau dependency và nhận output của dependency trong message."""
+    run = await TaskPipeline(mock_agent_manager).run(make_tasks([1], []), {"user": "u1"})
+
+    assert run.success is True
+    assert [r.agent_type for r in run.results] == ["agent1", "agent0"]
+    request = mock_agent_manager.process_request.call_args_list[1][0][0]
+    assert "--- Output from previous task 1 ---\nout-agent1" in request.message
+    assert request.context["user"] == "u1"
+    assert request.context["dependencies"] == [1]
+    assert "previous_outputs" not in request.context
+
+
+@pytest.mark.asyncio
+async def test_large_dependency_outputs_are_compacted(mock_agent_manager):
+    """Output dependency vượt budget được thu gọn trước khi chèn vào message."""
+    async def process_request(request):
+        return AgentResponse(agent_type=request.agent_type, response="x" * 40000, success=True)
+
+    mock_agent_manager.process_request.side_effect = process_request
+    compactor = DependencyCompactor(MagicMock(), token_budget=TokenBudget(chars_per_token=4.0), budget_tokens=1000)
+    run = await TaskPipeline(mock_agent_manager, compactor).run(make_tasks([], [], [0, 1]))
+
+    request = mock_agent_manager.process_request.call_args_list[2][0][0]
+    assert run.success is True
+    assert len(request.message) < 5000
+    assert request.context["compaction"]["compacted"] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_cache_reruns_only_changed_tasks(mock_agent_manager):
+    """Chạy lại plan đã sửa một task: chỉ task đó và task con gọi agent."""
+    async def process_request(request):
+        return AgentResponse(agent_type=request.agent_type, response=f"out-{request.message}", success=True)
+
+    mock_agent_manager.process_request.side_effect = process_request
+    pipeline = TaskPipeline(mock_agent_manager, cache=ResultCache())
+    tasks = make_tasks([], [], [1])
+    await pipeline.run(tasks)
+    assert mock_agent_manager.process_request.await_count == 3
+
+    tasks[1]["task_description"] = "task 1 (edited)"
+    run = await pipeline.run(tasks)
+
+    assert mock_agent_manager.process_request.await_count == 5
+    assert run.cache_hits == {0}
+    assert run.results[0].metadata == {"cached": True}
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_and_resume(mock_agent_manager, tmp_path):
+    """Kết quả được checkpoint; resume chỉ chạy task chưa hoàn thành."""
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    tasks = make_tasks([], [0], [1])
+    await store.create_run("r1", "msg", tasks)
+    await store.save_result("r1", 0, AgentResponse(agent_type="agent0", response="saved-0"))
+
+    saved = await store.load_run("r1")
+    run = await TaskPipeline(mock_agent_manager, store=store).run(tasks, run_id="r1", completed_results=saved["results"])
+
+    assert run.success is True
+    assert run.restored == {0}
+    assert mock_agent_manager.process_request.await_count == 2
+    first = mock_agent_manager.process_request.call_args_list[0][0][0]
+    assert "saved-0" in first.message
+    saved = await store.load_run("r1")
+    assert saved["status"] == RUN_COMPLETED
+    assert sorted(saved["results"]) == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_task_is_retried(mock_agent_manager):
+    """Task lỗi được retry theo policy của agent."""
+    responses = [
+        AgentResponse(agent_type="agent0", response="", success=False, error="timeout"),
+        AgentResponse(agent_type="agent0", response="ok", success=True),
+    ]
+    mock_agent_manager.process_request.side_effect = responses
+    pipeline = TaskPipeline(mock_agent_manager, retry_policies={"agent0": RetryPolicy(attempts=2, backoff_base=0.0)})
+    run = await pipeline.run(make_tasks([]))
+
+    assert run.success is True
+    assert run.results[0].metadata == {"attempts": 2}
+
+
+@pytest.mark.asyncio
+async def test_terminal_failure_skips_descendants(mock_agent_manager):
+    """Task lỗi hẳn thì toàn bộ task con bị bỏ qua, nhánh độc lập vẫn chạy."""
+    async def process_request(request):
+        failed = request.agent_type == "agent0"
+        return AgentResponse(agent_type=request.agent_type, response="" if failed else "ok", success=not failed, error="boom" if failed else None)
+
+    mock_agent_manager.process_request.side_effect = process_request
+    pipeline = TaskPipeline(mock_agent_manager, default_retry=RetryPolicy(attempts=0))
+    run = await pipeline.run(make_tasks([], [0], [1], []))
+
+    assert run.failed == {0, 1, 2}
+    assert run.skipped == {1, 2}
+    assert mock_agent_manager.process_request.await_count == 2
+    skipped = next(r for r in run.results if r.agent_type == "agent2")
+    assert skipped.metadata == {"skipped": True, "failed_dependencies": [1]}
+
+
+@pytest.mark.asyncio
+async def test_circular_dependency_stops(mock_agent_manager):
+    """Dependency vòng thì dừng và run không thành công."""
+    run = await TaskPipeline(mock_agent_manager).run(make_tasks([1], [0]))
+    assert run.results == []
+    assert run.success is False
@@ -0,0 +1,65 @@
+"""Unit tests for num_ctx / num_predict sizing."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.token_budget import MIN_NUM_PREDICT, TokenBudget
+
+
+@pytest.fixture
+def budget():
+    """TokenBudget với bucket nhỏ cho test."""
+    return TokenBudget(buckets=[2048, 4096, 8192], chars_per_token=4.0, default_num_predict=1024,
+                       num_predict_limits={"contentcreator": 512})
+
+
+def test_short_prompt_uses_smallest_bucket(budget):
+    """Prompt ngắn dùng bucket nhỏ nhất thay vì context mặc định lớn."""
+    options = budget.apply("hello" * 10, "aiengineer")
+    assert options == {"num_ctx": 2048, "num_predict": 1024}
+
+
+def test_long_prompt_rounds_up_to_bucket(budget):
+    """Prompt dài được làm tròn lên bucket chứa đủ prompt và output."""
+    prompt = "x" * 4 * 3000
+    options = budget.apply(prompt, "aiengineer")
+    assert options["num_ctx"] == 8192
+    assert budget.estimate_tokens(prompt) + options["num_predict"] <= options["num_ctx"]
+
+
+def test_oversized_prompt_shrinks_output(budget):
+    """Prompt vượt bucket lớn nhất: giữ bucket lớn nhất và thu nhỏ num_predict."""
+    options = budget.apply("x" * 4 * 6800, "aiengineer")
+    assert options["num_ctx"] == 8192
+    assert options["num_predict"] == 8192 - budget.estimate_tokens("x" * 4 * 6800)
+
+    options = budget.apply("x" * 4 * 20000, "aiengineer")
+    assert options["num_predict"] == MIN_NUM_PREDICT
+
+
+def test_per_agent_num_predict_and_caller_overrides(budget):
+    """Giới hạn theo agent được áp dụng, options của caller được giữ nguyên."""
+    assert budget.apply("hi", "contentcreator")["num_predict"] == 512
+    options = budget.apply("hi", "contentcreator", {"num_ctx": 32768, "num_predict": 64, "temperature": 0})
+    assert options == {"num_ctx": 32768, "num_predict": 64, "temperature": 0}
+
+
+def test_explicit_num_predict_is_never_shrunk(budget):
+    """num_predict của profile (kể cả 0 = không giới hạn) giữ nguyên khi prompt tràn bucket."""
+    prompt = "x" * 4 * 6800
+    assert budget.apply(prompt, "aiengineer", {"num_predict": 0}) == {"num_ctx": 8192, "num_predict": 0}
+    assert budget.apply(prompt, "aiengineer", {"num_predict": 4000}) == {"num_ctx": 8192, "num_predict": 4000}
+
+
+def test_no_output_cap_by_default():
+    """Không cấu hình giới hạn thì không đặt num_predict; num_ctx chừa output_reserve cho output."""
+    budget = TokenBudget(buckets=[2048, 4096, 8192], chars_per_token=4.0, output_reserve=1024)
+    assert budget.apply("x" * 4 * 1500, "aiengineer") == {"num_ctx": 4096}
+    assert budget.apply("x" * 4 * 6800, "aiengineer") == {"num_ctx": 8192}
+
+
+def test_auto_num_ctx_disabled():
+    """Tắt auto num_ctx thì chỉ còn giới hạn num_predict."""
+    budget = TokenBudget(auto_num_ctx=False, default_num_predict=256)
+    assert budget.apply("hi", "aiengineer") == {"num_predict": 256}
@@ -0,0 +1,94 @@
+"""Unit tests for tracing and the Server-Timing header."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from core import tracing
+from core.schemas import AgentResponse, OllamaResponse
+from core.task_pipeline import TaskPipeline
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    """Exporter trong bộ nhớ gắn vào provider toàn cục."""
+    exporter = InMemorySpanExporter()
+    tracing.setup_tracing().add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+@pytest.fixture
+def spans(exporter):
+    exporter.clear()
+    return exporter
+
+
+def test_server_timing_header_summarises_spans(spans):
+    """Header gộp thời lượng span plan/ollama và breakdown Ollama báo về."""
+    app = FastAPI()
+    app.middleware("http")(tracing.server_timing_middleware)
+    tracer = tracing.get_tracer(__name__)
+
+    @app.get("/work/{item_id}")
+    async def work(item_id: int):
+        with tracer.start_as_current_span(tracing.SPAN_PLAN):
+            pass
+        with tracer.start_as_current_span(tracing.SPAN_GENERATE) as span:
+            tracing.annotate_generation(span, OllamaResponse(
+                model="m", response="", done=True, load_duration=1_500_000_000, eval_count=10, eval_duration=500_000_000
+            ))
+        return {"id": item_id}
+
+    response = TestClient(app).get("/work/1")
+
+    header = response.headers["Server-Timing"]
+    for metric in ("plan;dur=", "ollama;dur=", "load;dur=1500.0", "eval;dur=500.0", "total;dur="):
+        assert metric in header
+    names = [span.name for span in spans.get_finished_spans()]
+    assert "GET /work/{item_id}" in names
+    generate = next(span for span in spans.get_finished_spans() if span.name == tracing.SPAN_GENERATE)
+    assert generate.attributes["ollama.tokens_per_second"] == 20.0
+    assert generate.parent is not None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_queue_wait_per_task(spans):
+    """Mỗi task có span chờ (từ lúc đủ dependency) và span thực thi."""
+    manager = MagicMock()
+    manager.process_request = AsyncMock(side_effect=lambda request: AgentResponse(
+        agent_type=request.agent_type, response="ok", success=True
+    ))
+    tasks = [
+        {"task_description": "a", "agent_type": "agent0", "priority": 1, "dependencies": []},
+        {"task_description": "b", "agent_type": "agent1", "priority": 1, "dependencies": [0]},
+    ]
+
+    run = await TaskPipeline(manager).run(tasks)
+
+    finished = spans.get_finished_spans()
+    queue = [span for span in finished if span.name == tracing.SPAN_TASK_QUEUE]
+    executed = [span for span in finished if span.name == tracing.SPAN_TASK]
+    assert [span.attributes["task.index"] for span in queue] == [0, 1]
+    assert all(span.attributes["task.success"] for span in executed)
+    # Task 1 chỉ bắt đầu chờ khi task 0 xong
+    assert queue[1].start_time == run.finished_at[0]
+
+
+def test_json_lines_exporter(tmp_path, spans):
+    """File exporter ghi mỗi span một dòng JSON."""
+    tracer = tracing.get_tracer(__name__)
+    with tracer.start_as_current_span("one"):
+        pass
+    path = tmp_path / "traces" / "spans.jsonl"
+
+    tracing.JsonLinesSpanExporter(str(path)).export(spans.get_finished_spans())
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    assert '"name": "one"' in lines[0]
@@ -0,0 +1,142 @@
+"""Unit tests for usage accounting."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+from core.resilience import RetryPolicy
+from core.schemas import AgentRequest, AgentResponse, OllamaResponse
+from core.task_pipeline import TaskPipeline
+from core.usage import UsageStore, empty_usage, record_generation, summarize, tenant_of, track_usage
+
+
+def ollama_response(model="m", prompt_tokens=10, output_tokens=50):
+    return OllamaResponse(
+        model=model, response="ok", done=True,
+        prompt_eval_count=prompt_tokens, eval_count=output_tokens,
+        load_duration=100_000_000, prompt_eval_duration=200_000_000,
+        eval_duration=1_000_000_000, total_duration=1_500_000_000
+    )
+
+
+def test_nested_scopes_and_child_tasks_accumulate():
+    """Generate trong scope con và task asyncio con được cộng vào mọi scope đang mở."""
+    async def child():
+        record_generation(ollama_response("b"))
+
+    async def scenario():
+        with track_usage() as outer:
+            record_generation(ollama_response("a"))
+            with track_usage() as inner:
+                await asyncio.gather(child())
+        return outer, inner
+
+    outer, inner = asyncio.run(scenario())
+
+    assert outer["calls"] == 2 and inner["calls"] == 1
+    assert outer["models"] == ["a", "b"]
+    assert outer["output_tokens"] == 100
+
+
+def test_record_outside_scope_is_noop():
+    """Không có scope thì không ghi nhận gì."""
+    record_generation(ollama_response())
+
+
+def test_summarize_computes_tokens_per_second():
+    """tokens/s tính từ output tokens và eval duration."""
+    with track_usage() as usage:
+        record_generation(ollama_response(output_tokens=50))
+
+    summary = summarize(usage)
+
+    assert summary["tokens_per_second"] == 50.0
+    assert summary["load_ms"] == 100.0
+    assert summarize(empty_usage())["tokens_per_second"] is None
+
+
+def test_tenant_of_prefers_header():
+    """Header ưu tiên hơn context."""
+    assert tenant_of({"tenant": "acme"}, "globex") == "globex"
+    assert tenant_of({"tenant": "acme"}) == "acme"
+    assert tenant_of(None) == "default"
+
+
+@pytest.mark.asyncio
+async def test_usage_store_groups_and_filters(tmp_path):
+    """Usage được tổng hợp theo agent/tenant, lọc theo tenant và thời gian."""
+    store = UsageStore(str(tmp_path / "usage.sqlite3"))
+    with track_usage() as usage:
+        record_generation(ollama_response(output_tokens=50))
+    await store.record("coder", usage, tenant="acme", run_id="r1")
+    await store.record("coder", usage, tenant="globex", run_id="r2")
+    await store.record("writer", usage, tenant="acme", run_id="r1")
+    await store.record("writer", empty_usage(), tenant="acme")
+
+    by_agent = await store.query("agent")
+    by_tenant = await store.query("tenant", tenant="acme")
+
+    assert {row["key"]: row["output_tokens"] for row in by_agent} == {"coder": 100, "writer": 50}
+    assert by_agent[0]["key"] == "coder"
+    assert by_agent[0]["tokens_per_second"] == 50.0
+    assert [(row["key"], row["calls"]) for row in by_tenant] == [("acme", 2)]
+    assert await store.query("agent", since=time.time() + 60) == []
+
+
+@pytest.mark.asyncio
+async def test_usage_store_prune(tmp_path):
+    """Usage cũ bị xóa; store chưa tạo thì không làm gì."""
+    store = UsageStore(str(tmp_path / "usage.sqlite3"))
+    assert await store.prune(60) == 0
+    with track_usage() as usage:
+        record_generation(ollama_response())
+    await store.record("coder", usage)
+
+    assert await store.prune(1e-9) == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_counts_usage_of_failed_attempts(tmp_path):
+    """Usage của task gồm cả lần thử lỗi và được lưu theo run/tenant."""
+    outcomes = iter([False, True])
+
+    async def process_request(request: AgentRequest):
+        record_generation(ollama_response())
+        success = next(outcomes)
+        return AgentResponse(agent_type=request.agent_type, response="ok" if success else "", success=success, error=None if success else "boom")
+
+    manager = MagicMock()
+    manager.process_request = process_request
+    store = UsageStore(str(tmp_path / "usage.sqlite3"))
+    pipeline = TaskPipeline(manager, usage_store=store, default_retry=RetryPolicy(attempts=1, backoff_base=0.0))
+    tasks = [{"task_description": "a", "agent_type": "coder", "priority": 1, "dependencies": []}]
+
+    run = await pipeline.run(tasks, {"tenant": "acme"}, run_id="r1")
+
+    assert run.results[0].metadata["usage"]["calls"] == 2
+    rows = await store.query("run", tenant="acme")
+    assert [(row["key"], row["calls"]) for row in rows] == [("r1", 2)]
+
+
+@pytest.mark.asyncio
+async def test_usage_store_groups_multi_model_run_by_model(tmp_path):
+    """Run dùng hai model được ghi mỗi model một dòng với token và thời lượng của chính model đó."""
+    store = UsageStore(str(tmp_path / "usage.sqlite3"))
+    with track_usage() as usage:
+        record_generation(ollama_response("codellama:13b", output_tokens=50))
+        record_generation(ollama_response("codellama:13b", output_tokens=30))
+        record_generation(ollama_response("llama2:13b", output_tokens=20))
+    await store.record("orchestrator", summarize(usage), tenant="acme", run_id="r1")
+
+    by_model = {row["key"]: row for row in await store.query("model")}
+    by_run = await store.query("run")
+
+    assert set(by_model) == {"codellama:13b", "llama2:13b"}
+    assert (by_model["codellama:13b"]["calls"], by_model["codellama:13b"]["output_tokens"]) == (2, 80)
+    assert (by_model["llama2:13b"]["calls"], by_model["llama2:13b"]["output_tokens"]) == (1, 20)
+    assert by_model["llama2:13b"]["total_ms"] == 1500.0
+    assert [(row["key"], row["calls"], row["output_tokens"]) for row in by_run] == [("r1", 3, 100)]
@@ -0,0 +1,95 @@
+"""Unit tests for logging helpers in core.utils."""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import queue
+import time
+
+from core.utils import BoundedQueueHandler, SamplingFilter, setup_logging, stop_logging
+
+
+def make_record(name="core.ollama_client", level=logging.DEBUG, msg="hello %s", args=("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+@pytest.fixture
+def restore_root_logger():
+    """Khôi phục root logger sau test."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    stop_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_sampling_filter_by_logger_prefix():
+    """Record dưới WARNING của logger bị sample; WARNING và logger khác luôn giữ."""
+    sampling = SamplingFilter({"core.ollama_client": 0.0, "core": 1.0})
+
+    assert sampling.filter(make_record("core.ollama_client")) is False
+    assert sampling.filter(make_record("core.ollama_client.sub")) is False
+    assert sampling.filter(make_record("core.ollama_client", logging.WARNING)) is True
+    assert sampling.filter(make_record("core.agent_manager")) is True
+    assert sampling.filter(make_record("core.ollama_clientx")) is True
+
+
+def test_queue_handler_truncates_long_messages():
+    """Message dài bị cắt trước khi vào queue, args được format một lần."""
+    handler = BoundedQueueHandler(queue.Queue(), max_message_chars=10)
+
+    handler.handle(make_record(msg="payload: %s", args=("x" * 100,)))
+
+    record = handler.queue.get_nowait()
+    assert record.msg == "payload: x... [+99 ký tự]"
+    assert record.args is None
+
+
+def test_queue_handler_drops_when_full():
+    """Queue đầy thì bỏ record thay vì chặn caller."""
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_setup_logging_writes_in_background(tmp_path, restore_root_logger):
+    """Record đi qua queue và được thread nền ghi ra file."""
+    log_file = tmp_path / "app.log"
+    setup_logging("INFO", log_file=str(log_file), sample_rates={"noisy": 0.0})
+
+    logging.getLogger("core.test").info("ghi %d dòng", 1)
+    logging.getLogger("noisy").info("bị sample")
+    logging.getLogger("core.test").debug("dưới level")
+    stop_logging()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "core.test - INFO - ghi 1 dòng" in content
+    assert "bị sample" not in content
+    assert "dưới level" not in content
+
+
+def test_setup_logging_reopens_file_after_external_rotation(tmp_path, restore_root_logger):
+    """File bị logrotate đổi tên thì handler mở file mới thay vì ghi tiếp vào file cũ."""
+    log_file = tmp_path / "app.log"
+    queue_handler = setup_logging("INFO", log_file=str(log_file))
+    logging.getLogger("core.test").info("trước rotate")
+    while not queue_handler.queue.empty():
+        time.sleep(0.01)
+    time.sleep(0.05)
+    log_file.rename(tmp_path / "app.log.1")
+
+    logging.getLogger("core.test").info("sau rotate")
+    stop_logging()
+
+    assert "trước rotate" in (tmp_path / "app.log.1").read_text(encoding="utf-8")
+    assert "sau rotate" in log_file.read_text(encoding="utf-8")